@@ -0,0 +1,449 @@
+"""
+Benchmarks of the contact, geometry, polynomial and I/O hot paths.
+
+Nothing here plots or needs a display. Results are written as JSON (one record per benchmark and problem size), so that
+runs on different commits can be compared:
+
+    python -m benchmarks.bench run --output bench_<commit>.json
+    python -m benchmarks.bench compare bench_old.json bench_new.json
+
+(from the repository root). Fixtures are the P8 .sto files and the .osim models under contact_model/tests; the pipeline
+benchmarks replay the P8 body kinematics on the punching_bag.osim fixture, or a trial given with --model/--states.
+Synthetic trials are scaled from 10^3 up to --max-frames frames (10^7 at most). Per-frame Python loops are capped with
+--max-loop-frames so that a run stays short; benchmarks that need OpenSim are recorded as skipped when it isn't
+available, and a benchmark that fails is recorded as an error without stopping the run.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import numpy as np
+from numpy import ndarray
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+REPO_ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR: str = os.path.join(REPO_ROOT, "contact_model", "tests")
+STATES_FILE: str = os.path.join(TESTS_DIR, "files", "P8_StatesReporter_states.sto")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+
+SIZES: List[int] = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+# contact parameters of the P8 drivers
+SPHERE_R: float = 0.025
+CYLINDER_R: float = 0.1702085
+K: float = 2300832.0
+C: float = 2.5
+
+
+class Skip(Exception):
+    pass
+
+
+class BenchmarkSpec(NamedTuple):
+    name: str
+    group: str
+    setup: Callable[[int], Any]         # size -> argument passed to run
+    run: Callable[[Any], Any]
+    sizes: Optional[List[int]]          # None: fixture benchmark, run once with size 0
+    loop: bool                          # per-frame Python loop, capped by --max-loop-frames
+
+
+_registry: List[BenchmarkSpec] = []
+
+
+def benchmark(name: str, group: str, setup: Callable[[int], Any], sizes: Optional[List[int]] = SIZES,
+              loop: bool = False):
+    def register(run: Callable[[Any], Any]):
+        _registry.append(BenchmarkSpec(name, group, setup, run, sizes, loop))
+        return run
+
+    return register
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------------------------------------------------------
+def synthetic_penetration(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    x: ndarray = rng.uniform(-0.01, 0.01, n)
+    x_dot: ndarray = rng.uniform(-2.0, 2.0, n)
+    return x, x_dot
+
+
+def synthetic_geometry(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    sphere_com: ndarray = rng.normal([-0.2, 0.5, 0.0], 0.05, (n, 3))
+    cylinder_bottom: ndarray = rng.normal(0.0, 0.01, (n, 3))
+    cylinder_top: ndarray = cylinder_bottom + np.array([0.0, 1.0, 0.0])
+    cylinder_vel: ndarray = rng.normal(0.0, 1.0, (n, 3))
+    return sphere_com, cylinder_bottom, cylinder_top, cylinder_vel
+
+
+def synthetic_sto(directory: str, n_frames: int) -> str:
+    """
+    P8 BodyKinematics position file tiled up to n_frames rows.
+    """
+
+    from utils.sto_reader import read_sto_header, read_sto_columns
+
+    header = read_sto_header(POS_FILE)
+    data, _ = read_sto_columns(POS_FILE, cache=False)
+    reps: int = -(-n_frames // len(data))
+    tiled: ndarray = np.tile(data, (reps, 1))[:n_frames]
+    tiled[:, 0] = np.arange(n_frames) * (data[1, 0] - data[0, 0])
+
+    path: str = os.path.join(directory, f"synthetic_{n_frames}.sto")
+    with open(POS_FILE, "r") as src, open(path, "w") as dst:
+        for n in range(header.header_lines):
+            line: str = src.readline()
+            dst.write(f"nRows={n_frames}\n" if line.startswith("nRows") else line)
+        dst.write("\t".join(header.columns) + "\n")
+        np.savetxt(dst, tiled, fmt="%.8f", delimiter="\t")
+
+    return path
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Forces
+# ----------------------------------------------------------------------------------------------------------------------
+@benchmark("smooth_hunt_crossley.loop", "forces", synthetic_penetration, loop=True)
+def _(args):
+    from contact_model.contact_forces.smooth_forces import smooth_hunt_crossley
+    x, x_dot = args
+    R: float = SPHERE_R * CYLINDER_R / (SPHERE_R + CYLINDER_R)
+    for a, b in zip(x.tolist(), x_dot.tolist()):
+        smooth_hunt_crossley(a, b, R, K, C)
+
+
+@benchmark("smooth_hunt_crossley_batch", "forces", synthetic_penetration)
+def _(args):
+    from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+    x, x_dot = args
+    R: float = SPHERE_R * CYLINDER_R / (SPHERE_R + CYLINDER_R)
+    smooth_hunt_crossley_batch(x, x_dot, R, K, C)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Geometry and vector algebra
+# ----------------------------------------------------------------------------------------------------------------------
+@benchmark("geometry.per_frame", "geometry", synthetic_geometry, loop=True)
+def _(args):
+    from utils.geometry import find_point_projection_along_a_line, get_distance_between_edges
+    from utils.vector_algebra import unit_vector
+    for com, bottom, top, vel in zip(*(a[:, :, None] for a in args)):
+        Q: ndarray = find_point_projection_along_a_line(com, bottom, top) + bottom
+        get_distance_between_edges(Q, com, SPHERE_R, CYLINDER_R, unit_vector(vel))
+
+
+@benchmark("geometry.compute_penetrations", "geometry", synthetic_geometry)
+def _(args):
+    from utils.geometry import compute_penetrations
+    compute_penetrations(*args, SPHERE_R, CYLINDER_R)
+
+
+@benchmark("vector_algebra.unit_vector+dot_product.loop", "vector_algebra", synthetic_geometry, loop=True)
+def _(args):
+    from utils.vector_algebra import unit_vector, dot_product
+    for com, bottom in zip(args[0][:, :, None], args[1][:, :, None]):
+        dot_product(com, unit_vector(bottom))
+
+
+@benchmark("vector_algebra.unit_vectors+dot_products", "vector_algebra", synthetic_geometry)
+def _(args):
+    from utils.vector_algebra import unit_vectors, dot_products
+    dot_products(args[0], unit_vectors(args[1]))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Polynomials
+# ----------------------------------------------------------------------------------------------------------------------
+def _polynomial_samples(n: int):
+    rng = np.random.default_rng(0)
+    q: ndarray = rng.uniform(-1.0, 1.0, (n, 3))
+    y: ndarray = np.stack([np.sin(q[:, 0]) * q[:, 1], np.cos(q[:, 2]), q[:, 0] * q[:, 1] * q[:, 2]], axis=-1)
+    return q, y
+
+
+@benchmark("polynomials.fit_cubic.loop", "polynomials", lambda n: np.random.default_rng(0).uniform(0, 1, (n, 2, 4)),
+           loop=True)
+def _(args):
+    from utils.polynomials import fit_cubic
+    for x, y in args:
+        fit_cubic(np.sort(x), y)
+
+
+@benchmark("polynomial_fitting.fit_degree5", "polynomials", _polynomial_samples, sizes=SIZES[:4])
+def _(args):
+    from utils.polynomial_fitting import PolynomialApproximation
+    PolynomialApproximation.fit(args[0], args[1], 5)
+
+
+@benchmark("polynomial_fitting.evaluate_degree5", "polynomials",
+           lambda n: (_fitted_polynomial(), _polynomial_samples(n)[0]), sizes=SIZES[:4])
+def _(args):
+    args[0].evaluate(args[1])
+
+
+def _fitted_polynomial():
+    from utils.polynomial_fitting import PolynomialApproximation
+    q, y = _polynomial_samples(2000)
+    return PolynomialApproximation.fit(q, y, 5)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# I/O
+# ----------------------------------------------------------------------------------------------------------------------
+_io_dir: List[str] = []
+
+
+def _scratch_dir() -> str:
+    if not _io_dir:
+        _io_dir.append(tempfile.mkdtemp(prefix="bench_io_"))
+
+    return _io_dir[0]
+
+
+def _io_file(n: int) -> str:
+    if n == 0:
+        path: str = os.path.join(_scratch_dir(), os.path.basename(STATES_FILE))
+        shutil.copy(STATES_FILE, path)
+        return path
+
+    return synthetic_sto(_scratch_dir(), n)
+
+
+@benchmark("read_sto_columns.states.cold", "io", _io_file, sizes=None)
+def _(path):
+    from utils.sto_reader import read_sto_columns
+    read_sto_columns(path, cache=False)
+
+
+@benchmark("read_sto_columns.kinematics.cold", "io", _io_file, sizes=SIZES[:4])
+def _(path):
+    from utils.sto_reader import read_sto_columns
+    read_sto_columns(path, ["time", "punching_bag_X", "punching_bag_Y", "punching_bag_Z"], cache=False)
+
+
+@benchmark("read_sto_columns.kinematics.warm", "io", lambda n: _warm(_io_file(n)), sizes=SIZES[:4])
+def _(path):
+    from utils.sto_reader import read_sto_columns
+    read_sto_columns(path, ["time", "punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+
+
+def _warm(path: str) -> str:
+    from utils.sto_reader import load_numeric_block
+    load_numeric_block(path)
+    return path
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Full pipeline
+# ----------------------------------------------------------------------------------------------------------------------
+# model and states of the pipeline benchmarks. states None: P8 body kinematics replayed on the fixture model
+_pipeline_trial: Dict[str, Optional[str]] = {"model": MODEL_FILE, "states": None}
+
+
+def _pipeline_setup(_: int):
+    try:
+        from opensim import Model
+    except ImportError:
+        raise Skip("opensim is not installed")
+
+    from contact_model.state_replay import StateReplay
+    from utils.sto_reader import read_sto_columns
+
+    model_file: str = _pipeline_trial["model"]
+    model = Model(model_file)
+    s = model.initSystem()
+    for body in ("rclavicle", "punching_bag"):
+        if not model.getBodySet().contains(body):
+            raise ValueError(f"{model_file} has no {body} body")
+
+    states_file: Optional[str] = _pipeline_trial["states"]
+    if states_file is None:
+        from contact_model.body_kinematics import write_free_joint_states
+        states_file = write_free_joint_states(os.path.join(_scratch_dir(), "P8_fixture_states.sto"), MODEL_FILE,
+                                              POS_FILE, VEL_FILE)
+
+    replay = StateReplay(model, states_file, s)
+    vel, _ = read_sto_columns(VEL_FILE, ["punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+    return model, replay, vel
+
+
+@benchmark("compute_x_and_x_dot.trial", "pipeline", _pipeline_setup, sizes=None)
+def _(args):
+    from contact_model.sphere_to_cylinder import compute_x_and_x_dot
+    model, replay, vel = args
+    clavicle = model.getBodySet().get("rclavicle")
+    sphere_loc: ndarray = np.array([[-0.05], [0.015], [0.1]])
+    for n, s in replay:
+        compute_x_and_x_dot(model, sphere_loc, vel[n][:, None], clavicle, SPHERE_R, CYLINDER_R, s)
+
+
+@benchmark("ContactPair.evaluate_many.trial", "pipeline", _pipeline_setup, sizes=None)
+def _(args):
+    from contact_model.sphere_to_cylinder import ContactPair
+    model, replay, vel = args
+    pair = ContactPair(model, np.array([-0.05, 0.015, 0.1]), SPHERE_R, CYLINDER_R)
+    pair.evaluate_many((s for _, s in replay), vel)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------------------------------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _time(run: Callable[[Any], Any], args: Any, repeats: int, min_time: float) -> List[float]:
+    timings: List[float] = []
+    start: float = time.perf_counter()
+    while len(timings) < repeats or (time.perf_counter() - start < min_time and len(timings) < 100):
+        t0: float = time.perf_counter()
+        run(args)
+        timings.append(time.perf_counter() - t0)
+
+    return timings
+
+
+def run_benchmarks(groups: Optional[List[str]] = None, max_frames: int = 10 ** 6, max_loop_frames: int = 10 ** 4,
+                   repeats: int = 3, min_time: float = 0.2, verbose: bool = True, model_file: Optional[str] = None,
+                   states_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the registered benchmarks and return the results as a JSON-serialisable dict.
+
+    :param model_file: model of the pipeline benchmarks (with rclavicle and punching_bag bodies and the cylinder_top
+                       and cylinder_bottom markers). None uses the fixture model.
+    :param states_file: states of the pipeline benchmarks, required with model_file.
+    """
+
+    if model_file is not None:
+        if states_file is None:
+            raise ValueError("states_file is required with model_file")
+        for path in (model_file, states_file):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+
+    _pipeline_trial.update(model=model_file or MODEL_FILE, states=states_file)
+
+    records: List[Dict[str, Any]] = []
+
+    for spec in _registry:
+        if groups and spec.group not in groups:
+            continue
+
+        sizes: List[int] = [0] if spec.sizes is None else [n for n in spec.sizes if n <= max_frames]
+        if spec.loop:
+            sizes = [n for n in sizes if n <= max_loop_frames]
+
+        for n in sizes:
+            record: Dict[str, Any] = {"name": spec.name, "group": spec.group, "frames": n}
+            try:
+                args = spec.setup(n)
+                timings: List[float] = _time(spec.run, args, repeats, min_time)
+            except Skip as e:
+                record.update(status="skipped", reason=str(e))
+            except Exception as e:
+                record.update(status="error", reason=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+            else:
+                record.update(status="ok", repeats=len(timings), min=min(timings), median=float(np.median(timings)),
+                              mean=float(np.mean(timings)))
+                if n:
+                    record["per_frame"] = record["min"] / n
+
+            records.append(record)
+            if verbose:
+                timing: str = f"{record['min'] * 1e3:12.3f} ms" if record["status"] == "ok" else record["reason"]
+                print(f"{spec.group:>15} {spec.name:<45} {n:>10} {timing}")
+
+    for directory in _io_dir:
+        shutil.rmtree(directory, ignore_errors=True)
+    _io_dir.clear()
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": records,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Benchmarks whose best time got slower than baseline by more than tolerance (relative).
+    """
+
+    key = lambda r: (r["name"], r["frames"])
+    base: Dict[Any, Dict[str, Any]] = {key(r): r for r in baseline["results"] if r["status"] == "ok"}
+
+    regressions: List[Dict[str, Any]] = []
+    for r in current["results"]:
+        if r["status"] != "ok" or key(r) not in base:
+            continue
+
+        ratio: float = r["min"] / base[key(r)]["min"]
+        if ratio > 1 + tolerance:
+            regressions.append({"name": r["name"], "frames": r["frames"], "baseline": base[key(r)]["min"],
+                                "current": r["min"], "ratio": ratio})
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    run_parser.add_argument("--group", action="append", default=None,
+                            help="only run this group (forces, geometry, vector_algebra, polynomials, io, pipeline)")
+    run_parser.add_argument("--max-frames", type=float, default=1e6)
+    run_parser.add_argument("--max-loop-frames", type=float, default=1e4)
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--model", default=None, help="model of the pipeline benchmarks (default: fixture)")
+    run_parser.add_argument("--states", default=None, help="states file of the pipeline benchmarks, with --model")
+
+    compare_parser = sub.add_parser("compare", help="compare 2 result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results: Dict[str, Any] = run_benchmarks(args.group, int(args.max_frames), int(args.max_loop_frames),
+                                                 args.repeats, model_file=args.model, states_file=args.states)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return 1 if any(r["status"] == "error" for r in results["results"]) else 0
+
+    with open(args.baseline) as f:
+        baseline: Dict[str, Any] = json.load(f)
+    with open(args.current) as f:
+        current: Dict[str, Any] = json.load(f)
+
+    regressions: List[Dict[str, Any]] = compare(baseline, current, args.tolerance)
+    for r in regressions:
+        print(f"{r['name']:<45} {r['frames']:>10} {r['baseline'] * 1e3:10.3f} ms -> {r['current'] * 1e3:10.3f} ms "
+              f"(x{r['ratio']:.2f})")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.parameters import ContactParameters
+from contact_model.screening import ScreeningReport, screen_trial
+from contact_model.sphere_to_cylinder import ContactPair, ContactKinematics
+from contact_model.state_replay import StateReplay
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from utils.geometry import compute_effective_radius
+from utils.sto_reader import read_sto_columns
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# type hint imports
+from opensim import Model, State
+
+
+class Trial(NamedTuple):
+    model_file: str
+    states_file: str
+    kinematics_file: str    # BodyKinematics velocity file (global), for the cylinder velocity
+    name: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return self.name if self.name is not None else os.path.basename(self.states_file)
+
+
+class TrialResult(NamedTuple):
+    time: ndarray
+    penetration: ndarray
+    penetration_rate: ndarray
+    force: ndarray
+
+
+class BatchResult:
+    """
+    Results of run_trials. Successful trials are in results, failed ones in failures (trial key -> traceback), so a
+    broken trial never aborts the rest of the batch.
+    """
+
+    def __init__(self, trials: Sequence[Trial]):
+        self.trials: List[Trial] = list(trials)
+        self.results: Dict[str, TrialResult] = {}
+        self.failures: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __getitem__(self, key: str) -> TrialResult:
+        return self.results[key]
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [trial.key for trial in self.trials if trial.key in self.results]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Worker side: every process keeps its own models, loaded and initialised the 1st time a trial needs them
+# ----------------------------------------------------------------------------------------------------------------------
+_models: Dict[str, Tuple[Model, State]] = {}
+_pairs: Dict[Tuple[str, ContactParameters], ContactPair] = {}
+
+
+def get_model(model_file: str) -> Tuple[Model, State]:
+    if model_file not in _models:
+        model: Model = Model(model_file)
+        s: State = model.initSystem()
+        _models[model_file] = (model, s)
+
+    return _models[model_file]
+
+
+def get_pair(model_file: str, model: Model, params: ContactParameters) -> ContactPair:
+    key: Tuple[str, ContactParameters] = (model_file, params)
+    if key not in _pairs:
+        _pairs[key] = ContactPair(model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+
+    return _pairs[key]
+
+
+def _init_worker(model_files: Sequence[str]):
+    for model_file in model_files:
+        get_model(model_file)
+
+
+def run_trial(trial: Trial, params: ContactParameters = ContactParameters()) -> TrialResult:
+    """
+    Penetration, its rate and the smooth Hunt-Crossley force for every frame of one trial. Models are cached in the
+    calling process, so consecutive trials on the same model only pay for the states.
+    """
+
+    model, s0 = get_model(trial.model_file)
+
+    # every trial starts from a copy of the initial state, so unset state variables don't leak between trials
+    replay: StateReplay = StateReplay(model, trial.states_file, State(s0))
+
+    cylinder_vel, _ = read_sto_columns(trial.kinematics_file, ["punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+    if len(cylinder_vel) != len(replay):
+        raise ValueError(f"{trial.kinematics_file} has {len(cylinder_vel)} frames, "
+                         f"{trial.states_file} has {len(replay)}")
+
+    pair: ContactPair = get_pair(trial.model_file, model, params)
+    kin: ContactKinematics = pair.evaluate_many((s for _, s in replay), cylinder_vel)
+
+    R: float = compute_effective_radius(params.sphere_r, params.cylinder_r)
+    force: ndarray = smooth_hunt_crossley_batch(kin.penetration, kin.penetration_rate, R, params.k, params.c,
+                                                params.bc, params.cf)
+
+    return TrialResult(replay.time, kin.penetration, kin.penetration_rate, force)
+
+
+def _run_trial_safe(trial: Trial, params: ContactParameters) -> Tuple[str, Optional[TrialResult], Optional[str]]:
+    try:
+        return trial.key, run_trial(trial, params), None
+    except Exception:
+        return trial.key, None, traceback.format_exc()
+
+
+def run_trials(trials: Sequence[Trial], params: ContactParameters = ContactParameters(),
+               max_workers: Optional[int] = None, preload: bool = False) -> BatchResult:
+    """
+    Fan trials out over a process pool.
+
+    :param trials: trials to process. Trial keys (name, or states file name) must be unique.
+    :param params: contact parameters shared by all the trials.
+    :param max_workers: number of processes. None uses os.cpu_count().
+    :param preload: load and initialise every model of the batch in every worker when it starts, instead of on first
+                    use. Only worth it when there are few models and many trials per model.
+    :return: BatchResult
+    """
+
+    keys: List[str] = [trial.key for trial in trials]
+    if len(set(keys)) != len(keys):
+        raise ValueError("trial keys must be unique")
+
+    batch: BatchResult = BatchResult(trials)
+
+    # submit trials grouped by model, so that a worker tends to receive trials of a model it already loaded
+    ordered: List[Trial] = sorted(trials, key=lambda trial: trial.model_file)
+    model_files: Tuple[str, ...] = tuple(dict.fromkeys(trial.model_file for trial in ordered)) if preload else ()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(model_files,)) as pool:
+        futures = {pool.submit(_run_trial_safe, trial, params): trial for trial in ordered}
+
+        for future in as_completed(futures):
+            try:
+                key, result, error = future.result()
+            except Exception:
+                # the worker itself died (e.g. a crash inside OpenSim)
+                key, result, error = futures[future].key, None, traceback.format_exc()
+
+            if result is None:
+                batch.failures[key] = error
+            else:
+                batch.results[key] = result
+
+    return batch
+
+
+def run_screened_trial(trial: Trial, pos_file: str, params: ContactParameters = ContactParameters(),
+                       margin: float = 0.05, pad: int = 2,
+                       use_orientation: bool = False) -> Tuple[TrialResult, ScreeningReport]:
+    """
+    run_trial, with the OpenSim path only inside the contact windows. Outside them the force is 0 and penetration and
+    rate are nan (they were never computed). The screen itself (contact_model.screening) runs without OpenSim.
+
+    :param trial: model, states and BodyKinematics velocity file of the trial.
+    :param pos_file: BodyKinematics position file of the trial (same frames as the states).
+    """
+
+    indices, report = screen_trial(pos_file, trial.model_file, params, margin, pad, use_orientation)
+
+    model, s0 = get_model(trial.model_file)
+
+    replay: StateReplay = StateReplay(model, trial.states_file, State(s0))
+    if len(replay) != report.n_frames:
+        raise ValueError(f"{pos_file} has {report.n_frames} frames, {trial.states_file} has {len(replay)}")
+
+    T: int = len(replay)
+    penetration: ndarray = np.full(T, np.nan)
+    rate: ndarray = np.full(T, np.nan)
+    force: ndarray = np.zeros(T, dtype=float64)
+
+    if len(indices):
+        cylinder_vel, _ = read_sto_columns(trial.kinematics_file, ["punching_bag_X", "punching_bag_Y",
+                                                                   "punching_bag_Z"])
+        kin: ContactKinematics = get_pair(trial.model_file, model, params).evaluate_many(
+            (s for _, s in replay.frames(indices)), cylinder_vel[indices])
+
+        penetration[indices] = kin.penetration
+        rate[indices] = kin.penetration_rate
+        force[indices] = smooth_hunt_crossley_batch(kin.penetration, kin.penetration_rate,
+                                                    compute_effective_radius(params.sphere_r, params.cylinder_r),
+                                                    params.k, params.c, params.bc, params.cf)
+
+    return TrialResult(replay.time, penetration, rate, force), report
@@ -0,0 +1,157 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.kinematics import ContactKinematics
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_penetrations
+from contact_model.model_metadata import model_metadata, ModelMetadata
+from utils.osim_xml import BodyInfo, MarkerInfo
+from utils.sto_reader import read_sto_columns, write_sto
+from utils.vector_algebra import dot_products
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# BodyKinematics stores the centre of mass in ground and the body-fixed X-Y-Z angles of every body (positions), and the
+# centre of mass and angular velocities in ground (velocities): enough to rebuild the body frames without OpenSim.
+
+
+class BodyTrajectory(NamedTuple):
+    com: ndarray        # (T, 3) centre of mass in ground
+    R: ndarray          # (T, 3, 3) rotation from body to ground
+    com_vel: ndarray    # (T, 3) centre of mass velocity in ground
+    w: ndarray          # (T, 3) angular velocity in ground
+
+
+def euler_xyz_to_matrix(angles: ndarray) -> ndarray:
+    """
+    Rotation matrices of body-fixed X-Y-Z Euler angles (radians): R = Rx(a) @ Ry(b) @ Rz(c). (T, 3) -> (T, 3, 3).
+    """
+
+    ca, sa = np.cos(angles[:, 0]), np.sin(angles[:, 0])
+    cb, sb = np.cos(angles[:, 1]), np.sin(angles[:, 1])
+    cc, sc = np.cos(angles[:, 2]), np.sin(angles[:, 2])
+
+    R: ndarray = np.empty((len(angles), 3, 3), dtype=float64)
+    R[:, 0, 0] = cb * cc
+    R[:, 0, 1] = -cb * sc
+    R[:, 0, 2] = sb
+    R[:, 1, 0] = sa * sb * cc + ca * sc
+    R[:, 1, 1] = -sa * sb * sc + ca * cc
+    R[:, 1, 2] = -sa * cb
+    R[:, 2, 0] = -ca * sb * cc + sa * sc
+    R[:, 2, 1] = ca * sb * sc + sa * cc
+    R[:, 2, 2] = ca * cb
+    return R
+
+
+def body_columns(body: str) -> List[str]:
+    return [f"{body}_{axis}" for axis in ("X", "Y", "Z", "Ox", "Oy", "Oz")]
+
+
+def load_body_trajectory(pos_file: str, vel_file: Optional[str], body: str) -> BodyTrajectory:
+    """
+    :param pos_file: BodyKinematics position file (global).
+    :param vel_file: BodyKinematics velocity file (global). If None, velocities are set to 0.
+    :param body: body name.
+    """
+
+    pos, _ = read_sto_columns(pos_file, body_columns(body), to_radians=True)
+    if vel_file is None:
+        vel: ndarray = np.zeros_like(pos)
+    else:
+        vel, _ = read_sto_columns(vel_file, body_columns(body), to_radians=True)
+
+    return BodyTrajectory(pos[:, :3], euler_xyz_to_matrix(pos[:, 3:]), vel[:, :3], vel[:, 3:])
+
+
+def station_positions(traj: BodyTrajectory, mass_center: ndarray, station: ndarray) -> ndarray:
+    """
+    (T, 3) ground positions of a point fixed to the body, given in the body frame.
+    """
+
+    return traj.com + np.einsum("tij,j->ti", traj.R, np.asarray(station, dtype=float64) - mass_center)
+
+
+def point_velocities(traj: BodyTrajectory, points: ndarray) -> ndarray:
+    """
+    (T, 3) ground velocities of the body-fixed points that are at points (T, 3) in ground: v = v_com + w x (p - com).
+    """
+
+    return traj.com_vel + np.cross(traj.w, points - traj.com)
+
+
+def write_free_joint_states(path: str, model_file: str, pos_file: str, vel_file: str,
+                            bodies: Sequence[str] = ("rclavicle", "punching_bag")) -> str:
+    """
+    States file of a model with a free joint ground_<body> (coordinates <body>_rx ... <body>_tz) per body, from
+    BodyKinematics files: Euler angles and body origin for the values, angular velocity and origin velocity in ground
+    for the speeds. The punching_bag.osim test fixture has this layout.
+
+    :return: path
+    """
+
+    bodies_info: Dict[str, BodyInfo] = model_metadata(model_file).bodies()
+    time, _ = read_sto_columns(pos_file, ["time"])
+    angles, _ = read_sto_columns(pos_file, [f"{body}_O{axis}" for body in bodies for axis in "xyz"], to_radians=True)
+
+    columns: List[str] = ["time"]
+    data: List[ndarray] = [time]
+    for i, body in enumerate(bodies):
+        traj: BodyTrajectory = load_body_trajectory(pos_file, vel_file, body)
+        origin: ndarray = station_positions(traj, bodies_info[body].mass_center, np.zeros(3))
+        paths: List[str] = [f"/jointset/ground_{body}/{body}_{axis}" for axis in ("rx", "ry", "rz", "tx", "ty", "tz")]
+
+        columns += [f"{p}/value" for p in paths] + [f"{p}/speed" for p in paths]
+        data += [angles[:, 3 * i:3 * i + 3], origin, traj.w, point_velocities(traj, origin)]
+
+    write_sto(path, np.concatenate(data, axis=1), columns, name="ModelStates")
+    return path
+
+
+class BodyKinematicsContact:
+    """
+    Sphere-to-cylinder contact computed from BodyKinematics files instead of a live Model/State: same outputs as
+    ContactPair.evaluate_many, for a whole trial at once and without importing opensim.
+
+    The static model data (mass centres of the 2 bodies and the cylinder end markers) comes from the cached model
+    metadata snapshot (see contact_model.model_metadata).
+    """
+
+    def __init__(self, model_file: str, params: ContactParameters = ContactParameters(),
+                 sphere_body: str = "rclavicle", cylinder_body: str = "punching_bag",
+                 cylinder_top: str = "cylinder_top", cylinder_bottom: str = "cylinder_bottom"):
+
+        metadata: ModelMetadata = model_metadata(model_file)
+        bodies: Dict[str, BodyInfo] = metadata.bodies()
+        markers: Dict[str, MarkerInfo] = metadata.markers()
+
+        self.params: ContactParameters = params
+        self.sphere_body: str = sphere_body
+        self.cylinder_body: str = cylinder_body
+        self.sphere_loc: ndarray = np.asarray(params.sphere_loc, dtype=float64).reshape(3)
+        self.sphere_mass_center: ndarray = bodies[sphere_body].mass_center
+        self.cylinder_mass_center: ndarray = bodies[cylinder_body].mass_center
+
+        for name in (cylinder_top, cylinder_bottom):
+            if markers[name].body != cylinder_body:
+                raise ValueError(f"marker {name} is attached to {markers[name].body}, not to {cylinder_body}")
+
+        self.cylinder_top: ndarray = markers[cylinder_top].location
+        self.cylinder_bottom: ndarray = markers[cylinder_bottom].location
+
+    def evaluate(self, pos_file: str, vel_file: str) -> ContactKinematics:
+        sphere: BodyTrajectory = load_body_trajectory(pos_file, vel_file, self.sphere_body)
+        cylinder: BodyTrajectory = load_body_trajectory(pos_file, vel_file, self.cylinder_body)
+        return self.evaluate_trajectories(sphere, cylinder)
+
+    def evaluate_trajectories(self, sphere: BodyTrajectory, cylinder: BodyTrajectory) -> ContactKinematics:
+        sphere_com: ndarray = station_positions(sphere, self.sphere_mass_center, self.sphere_loc)
+        cylinder_bottom: ndarray = station_positions(cylinder, self.cylinder_mass_center, self.cylinder_bottom)
+        cylinder_top: ndarray = station_positions(cylinder, self.cylinder_mass_center, self.cylinder_top)
+
+        d, cylinder_edge, sphere_edge, n = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top,
+                                                                cylinder.com_vel, self.params.sphere_r,
+                                                                self.params.cylinder_r)
+
+        vel: ndarray = point_velocities(cylinder, cylinder_edge) - point_velocities(sphere, sphere_edge)
+        rate: ndarray = dot_products(vel, n)
+
+        return ContactKinematics(sphere_com, cylinder_bottom, cylinder_top, cylinder_edge, sphere_edge, n, d, rate)
@@ -0,0 +1,189 @@
+import os
+import numpy as np
+from numpy import ndarray, float64
+from numpy.polynomial import legendre
+from scipy.interpolate import CubicSpline
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.contact_forces.identification import box_average
+from contact_model.kinematics import ContactKinematics
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_effective_radius
+from utils.sto_reader import read_sto_columns, read_sto_header
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Collocation grids of the ocp pipeline (ocp/track_sim.m): d points per mesh interval. All the columns of a trial are
+# fitted with one batched CubicSpline, so another N (mesh refinement) only evaluates the polynomials.
+SCHEMES: Tuple[str, ...] = ("radau", "legendre")
+
+_resamplers: Dict[Tuple, "CollocationResampler"] = {}
+
+
+def collocation_points(d: int, scheme: str = "radau") -> ndarray:
+    """
+    The d collocation points in (0, 1] of a scheme (tau_root without the leading 0). Radau points are the roots of
+    P_d - P_(d-1) (they include 1), Legendre points the roots of P_d, with P_n the Legendre polynomials on [0, 1].
+    """
+
+    if scheme not in SCHEMES:
+        raise ValueError(f"scheme must be one of {SCHEMES}, not {scheme}")
+
+    coefficients: ndarray = np.zeros(d + 1, dtype=float64)
+    coefficients[d] = 1.0
+    if scheme == "radau":
+        coefficients[d - 1] = -1.0
+
+    roots: ndarray = np.sort(np.real(legendre.legroots(coefficients)))
+    return 0.5 * (roots + 1.0)
+
+
+def collocation_grid(t0: float, tf: float, N: int, d: int = 3, scheme: str = "radau") -> ndarray:
+    """
+    (N * d, ) times of the collocation points, ordered as time_grid in track_sim.m: interval by interval, point by point.
+    """
+
+    step: float = (tf - t0) / N
+    starts: ndarray = t0 + step * np.arange(N)
+    return (starts[:, None] + step * collocation_points(d, scheme)[None, :]).ravel()
+
+
+class CollocationSample(NamedTuple):
+    time: ndarray                           # (N * d, )
+    coordinates: ndarray                    # (N * d, n_coordinates)
+    speeds: ndarray                         # (N * d, n_coordinates)
+    penetration: ndarray                    # (N * d, )
+    penetration_rate: ndarray               # (N * d, )
+    force: ndarray                          # (N * d, ) smooth Hunt-Crossley force
+    measured_force: Optional[ndarray]       # (N * d, ) window averages of the measured force, if any
+
+
+class CollocationResampler:
+
+    def __init__(self, time: ndarray, coordinates: ndarray, coordinate_names: Sequence[str], penetration: ndarray,
+                 penetration_rate: Optional[ndarray] = None, speeds: Optional[ndarray] = None,
+                 measured_time: Optional[ndarray] = None, measured_force: Optional[ndarray] = None,
+                 params: ContactParameters = ContactParameters()):
+        """
+        :param time: (T, ) frame times.
+        :param coordinates: (T, n_coordinates) coordinate values (radians/meters).
+        :param coordinate_names: labels of the coordinate columns.
+        :param penetration: (T, ) penetration.
+        :param penetration_rate: (T, ) penetration rate. None uses the derivative of the penetration spline.
+        :param speeds: (T, n_coordinates) coordinate speeds. None uses the derivative of the coordinate splines.
+        :param measured_time: (M, ) times of the measured force (e.g. 2000 Hz).
+        :param measured_force: (M, ) measured force.
+        :param params: contact parameters of the force.
+        """
+
+        self.time: ndarray = np.asarray(time, dtype=float64)
+        self.coordinate_names: List[str] = list(coordinate_names)
+        self.params: ContactParameters = params
+        self.R: float = compute_effective_radius(params.sphere_r, params.cylinder_r)
+        self.n_coordinates: int = len(self.coordinate_names)
+        self.has_speeds: bool = speeds is not None
+        self.has_rate: bool = penetration_rate is not None
+
+        # all the columns in one spline: [coordinates | speeds | penetration | rate]
+        columns: List[ndarray] = [np.asarray(coordinates, dtype=float64).reshape(len(self.time), -1)]
+        if self.has_speeds:
+            columns.append(np.asarray(speeds, dtype=float64).reshape(len(self.time), -1))
+        columns.append(np.asarray(penetration, dtype=float64).reshape(-1, 1))
+        if self.has_rate:
+            columns.append(np.asarray(penetration_rate, dtype=float64).reshape(-1, 1))
+
+        self.spline: CubicSpline = CubicSpline(self.time, np.concatenate(columns, axis=1), axis=0)
+
+        self.measured_time: Optional[ndarray] = None if measured_time is None else np.asarray(measured_time, float64)
+        self.measured_force: Optional[ndarray] = None if measured_force is None else np.asarray(measured_force,
+                                                                                                 float64)
+        self._samples: Dict[Tuple, CollocationSample] = {}
+
+    @classmethod
+    def from_ik_file(cls, ik_file: str, time: ndarray, kin: ContactKinematics,
+                     coordinate_names: Optional[Sequence[str]] = None, measured_file: Optional[str] = None,
+                     measured_columns: Sequence[str] = (), params: ContactParameters = ContactParameters(),
+                     cache: bool = True) -> "CollocationResampler":
+        """
+        Resampler of an IK .mot (angles converted to radians) and of the contact kinematics of the same trial.
+
+        :param ik_file: IK .mot file.
+        :param time: (T, ) times of the contact kinematics frames.
+        :param kin: ContactKinematics of the trial (penetration and rate are used).
+        :param coordinate_names: IK columns to resample. None takes all of them.
+        :param measured_file: optional measured force file (e.g. <trial>grf.mot).
+        :param measured_columns: columns of measured_file; several columns are combined into the force magnitude.
+        :param cache: reuse the resampler (and its splines) built in this process for the same files and parameters.
+        """
+
+        if coordinate_names is None:
+            coordinate_names = [c for c in read_sto_header(ik_file).columns if c != "time"]
+
+        files: Tuple[str, ...] = (ik_file,) if measured_file is None else (ik_file, measured_file)
+        key: Tuple = (tuple((os.path.abspath(f), os.path.getmtime(f)) for f in files), tuple(coordinate_names),
+                      tuple(measured_columns), np.asarray(time, dtype=float64).tobytes(),
+                      np.asarray(kin.penetration, dtype=float64).tobytes(),
+                      np.asarray(kin.penetration_rate, dtype=float64).tobytes(), params)
+        if cache and key in _resamplers:
+            return _resamplers[key]
+
+        ik, _ = read_sto_columns(ik_file, ["time", *coordinate_names], to_radians=True)
+        penetration: ndarray = np.interp(ik[:, 0], time, kin.penetration)
+        rate: ndarray = np.interp(ik[:, 0], time, kin.penetration_rate)
+
+        measured_time: Optional[ndarray] = None
+        measured_force: Optional[ndarray] = None
+        if measured_file is not None:
+            measured, _ = read_sto_columns(measured_file, ["time", *measured_columns])
+            measured_time = measured[:, 0]
+            measured_force = measured[:, 1] if len(measured_columns) == 1 else np.linalg.norm(measured[:, 1:], axis=1)
+
+        resampler: CollocationResampler = cls(ik[:, 0], ik[:, 1:], coordinate_names, penetration, rate,
+                                              measured_time=measured_time, measured_force=measured_force,
+                                              params=params)
+        if cache:
+            _resamplers[key] = resampler
+
+        return resampler
+
+    def __call__(self, t: ndarray) -> CollocationSample:
+        """
+        Everything at arbitrary times t (within the trial).
+        """
+
+        t = np.asarray(t, dtype=float64)
+        values: ndarray = self.spline(t)
+        n: int = self.n_coordinates
+
+        coordinates: ndarray = values[:, :n]
+        if self.has_speeds:
+            speeds: ndarray = values[:, n:2 * n]
+            penetration: ndarray = values[:, 2 * n]
+        else:
+            speeds = self.spline(t, 1)[:, :n]
+            penetration = values[:, n]
+
+        rate: ndarray = values[:, -1] if self.has_rate else self.spline(t, 1)[:, -1]
+
+        p: ContactParameters = self.params
+        force: ndarray = smooth_hunt_crossley_batch(penetration, rate, self.R, p.k, p.c, p.bc, p.cf)
+
+        measured: Optional[ndarray] = None
+        if self.measured_force is not None:
+            measured = box_average(self.measured_time, self.measured_force, t)
+
+        return CollocationSample(t, coordinates, speeds, penetration, rate, force, measured)
+
+    def resample(self, N: int, d: int = 3, scheme: str = "radau", t0: Optional[float] = None,
+                 tf: Optional[float] = None) -> CollocationSample:
+        """
+        Sample on the collocation grid of N intervals of d points, between t0 and tf (the trial ends by default).
+        Results are cached per grid.
+        """
+
+        t0 = float(self.time[0]) if t0 is None else t0
+        tf = float(self.time[-1]) if tf is None else tf
+        key: Tuple = (N, d, scheme, t0, tf)
+
+        if key not in self._samples:
+            self._samples[key] = self(collocation_grid(t0, tf, N, d, scheme))
+
+        return self._samples[key]
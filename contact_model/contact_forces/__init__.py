@@ -1,4 +1,6 @@
 from . import (
 contact_forces,
-smooth_forces
+smooth_forces,
+batch_forces,
+sweep
 )
\ No newline at end of file
@@ -0,0 +1,120 @@
+from numpy import (
+    asarray, empty, float64, power, sqrt, tanh, multiply, add, shape, broadcast_shapes
+)
+from contact_model.instrumentation import instrumented
+from typing import Optional, Union
+
+# type hint imports
+from numpy import ndarray
+
+ArrayLike = Union[float, ndarray]
+
+
+def compute_fp_batch(x: ArrayLike, out: Optional[ndarray] = None) -> ndarray:
+    """
+    Array version of compute_fp.
+
+    :param x: penetration between the 2 geometries. Any shape.
+    :param out: optional buffer the result is written into.
+    :return:
+    """
+
+    return power(asarray(x, dtype=float64), 1.5, out=out)
+
+
+def compute_fv_batch(x_dot: ArrayLike, c: ArrayLike, out: Optional[ndarray] = None) -> ndarray:
+    """
+    Array version of compute_fv.
+
+    :param x_dot: rate of change of the penetration. Any shape broadcastable with c.
+    :param c: damping.
+    :param out: optional buffer the result is written into.
+    :return:
+    """
+
+    out = multiply(1.5 * asarray(c, dtype=float64), x_dot, out=out)
+    out += 1
+    return out
+
+
+def hunt_crossley_batch(f_p: ArrayLike, f_v: ArrayLike, sphere_r: ArrayLike, k: ArrayLike,
+                        out: Optional[ndarray] = None) -> ndarray:
+    """
+    Array version of hunt_crossley.
+
+    :param sphere_r:  radius of sphere.
+    :param k: stiffness.
+    :param out: optional buffer the result is written into.
+    :return: force: array of scalar forces to be projected on the normal vectors.
+    """
+
+    gain: ndarray = (4/3) * power(k, 1.5) * sqrt(sphere_r)
+    out = multiply(gain, f_p, out=out)
+    out *= f_v
+    return out
+
+
+@instrumented("force.smooth_hunt_crossley_batch")
+def smooth_hunt_crossley_batch(x: ArrayLike, x_dot: ArrayLike, sphere_r: ArrayLike, k: ArrayLike, c: ArrayLike,
+                               bc: ArrayLike = 50.0, cf: ArrayLike = 1e-8,
+                               out: Optional[ndarray] = None) -> ndarray:
+    """
+    NumPy-native version of smooth_hunt_crossley. All the inputs are broadcast against each other, so x and x_dot can
+    be a whole trial (T, ), many trials stacked together (n_trials, T) or anything else, and the contact parameters can
+    either be scalars or arrays (e.g. a column of stiffness values against a row of frames).
+
+    :param x: penetration between the 2 geometries.
+    :param x_dot: rate of change of the penetration.
+    :param sphere_r: (effective) radius of the sphere.
+    :param k: stiffness.
+    :param c: damping.
+    :param bc: smoothing factor of the tanh steps.
+    :param cf: smoothing constant that keeps the penetration power differentiable at 0.
+    :param out: optional float64 buffer with the broadcast shape of the inputs. It's filled in place and returned.
+    :return: force array with the broadcast shape of the inputs.
+    """
+
+    x = asarray(x, dtype=float64)
+    x_dot = asarray(x_dot, dtype=float64)
+
+    # parameter-only terms: these are as small as the parameters, not as the frames
+    k_new: ndarray = 0.5 * power(k, 2 / 3)
+    r_new: ndarray = sphere_r * k_new
+    gain: ndarray = (4/3) * power(power(k_new, 2 / 3), 1.5) * sqrt(r_new)
+    v_shift: ndarray = 2 / (3 * asarray(c, dtype=float64))
+
+    out_shape = broadcast_shapes(x.shape, x_dot.shape, shape(gain), shape(c), shape(bc), shape(cf))
+    if out is None:
+        out = empty(out_shape, dtype=float64)
+
+    elif out.shape != out_shape:
+        raise ValueError(f"out must have shape {out_shape}. Current array has: {out.shape}")
+
+    # single work buffer shared by the 2 smooth steps
+    tmp: ndarray = empty(out_shape, dtype=float64)
+
+    # smooth penetration term: (x^2 + cf)^0.75 * (0.5 + 0.5 * tanh(bc * x))
+    multiply(x, x, out=out)
+    out += cf
+    sqrt(out, out=out)
+    compute_fp_batch(out, out=out)
+
+    multiply(bc, x, out=tmp)
+    tanh(tmp, out=tmp)
+    tmp *= 0.5
+    tmp += 0.5
+    out *= tmp
+
+    # smooth velocity term: (1 + 1.5 * c * x_dot) * (0.5 + 0.5 * tanh(bc * (x_dot + 2 / (3 * c))))
+    compute_fv_batch(x_dot, c, out=tmp)
+    out *= tmp
+
+    add(x_dot, v_shift, out=tmp)
+    tmp *= bc
+    tanh(tmp, out=tmp)
+    tmp *= 0.5
+    tmp += 0.5
+    out *= tmp
+
+    out *= gain
+    return out
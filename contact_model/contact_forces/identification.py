@@ -0,0 +1,228 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.parameters import ContactParameters
+from utils.sto_reader import read_sto_columns
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Every group of trials gets its own k, c, bc, cf. All the groups are fitted together by Levenberg-Marquardt on the log
+# of the parameters (positive, and k and cf equally well scaled); the force is linear in k.
+IDENTIFIABLE: Tuple[str, ...] = ("k", "c", "bc", "cf")
+
+
+def force_and_gradients(x: ndarray, x_dot: ndarray, R, k, c, bc, cf) -> Tuple[ndarray, ndarray]:
+    """
+    Smooth Hunt-Crossley force and its analytic derivatives with respect to k, c, bc and cf. Parameters can be
+    scalars or per-frame arrays.
+
+    :return: (N, ) forces and (N, 4) derivatives, columns ordered as IDENTIFIABLE.
+    """
+
+    x = np.asarray(x, dtype=float64)
+    x_dot = np.asarray(x_dot, dtype=float64)
+
+    gain_per_k: ndarray = (4 / 3) * np.sqrt(R) * 0.5 ** 1.5
+    gain: ndarray = gain_per_k * k
+
+    base: ndarray = x * x + cf
+    p_pow: ndarray = base ** 0.75
+    t_p: ndarray = np.tanh(bc * x)
+    s_p: ndarray = 0.5 + 0.5 * t_p
+    p: ndarray = p_pow * s_p
+
+    v_shift: ndarray = x_dot + 2 / (3 * c)
+    v_lin: ndarray = 1 + 1.5 * c * x_dot
+    t_v: ndarray = np.tanh(bc * v_shift)
+    s_v: ndarray = 0.5 + 0.5 * t_v
+    v: ndarray = v_lin * s_v
+
+    force: ndarray = gain * p * v
+
+    # S'(z) = 0.5 * (1 - tanh(z)^2)
+    ds_p: ndarray = 0.5 * (1 - t_p * t_p)
+    ds_v: ndarray = 0.5 * (1 - t_v * t_v)
+
+    jacobian: ndarray = np.empty((*force.shape, 4), dtype=float64)
+    jacobian[..., 0] = gain_per_k * p * v
+    jacobian[..., 1] = gain * p * (1.5 * x_dot * s_v - v_lin * ds_v * bc * 2 / (3 * c * c))
+    jacobian[..., 2] = gain * (p_pow * ds_p * x * v + p * v_lin * ds_v * v_shift)
+    jacobian[..., 3] = gain * 0.75 * base ** -0.25 * s_p * v
+
+    return force, jacobian
+
+
+def box_average(time: ndarray, values: ndarray, new_time: ndarray) -> ndarray:
+    """
+    Resample a densely sampled signal (e.g. 2000 Hz force plates) at new_time (e.g. the kinematics frames) by averaging
+    it over the window of each new frame, which goes from the midpoint with the previous frame to the midpoint with the
+    next one. Uses the cumulative trapezoidal integral and binary search, so the cost is O(len(time) + len(new_time))
+    for any ratio of the 2 rates.
+
+    :param time: (N, ) increasing sample times.
+    :param values: (N, ) or (N, m) samples.
+    :param new_time: (T, ) increasing times.
+    :return: (T, ) or (T, m) window averages. Windows partly outside time only average the covered part.
+    """
+
+    time = np.asarray(time, dtype=float64)
+    values = np.asarray(values, dtype=float64)
+    flat: ndarray = values.reshape(len(time), -1)
+
+    integral: ndarray = np.zeros_like(flat)
+    np.cumsum(0.5 * (flat[1:] + flat[:-1]) * np.diff(time)[:, None], axis=0, out=integral[1:])
+
+    edges: ndarray = np.empty(len(new_time) + 1, dtype=float64)
+    edges[1:-1] = 0.5 * (new_time[1:] + new_time[:-1])
+    edges[0] = new_time[0] - 0.5 * (new_time[1] - new_time[0]) if len(new_time) > 1 else new_time[0]
+    edges[-1] = new_time[-1] + 0.5 * (new_time[-1] - new_time[-2]) if len(new_time) > 1 else new_time[-1]
+    edges = np.clip(edges, time[0], time[-1])
+
+    # the integral is piecewise quadratic: evaluate it exactly at the window edges
+    i: ndarray = np.clip(np.searchsorted(time, edges, side="right") - 1, 0, len(time) - 2)
+    dt: ndarray = (edges - time[i])[:, None]
+    h: ndarray = (time[i + 1] - time[i])[:, None]
+    slope: ndarray = (flat[i + 1] - flat[i]) / h
+    at_edges: ndarray = integral[i] + flat[i] * dt + 0.5 * slope * dt * dt
+
+    width: ndarray = np.diff(edges)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        averages: ndarray = np.where(width > 0, np.diff(at_edges, axis=0) / width,
+                                     np.array([np.interp(new_time, time, column) for column in flat.T]).T)
+
+    return averages.reshape((len(new_time), *values.shape[1:]))
+
+
+def read_measured_force(file_path: str, columns: Sequence[str], new_time: ndarray) -> ndarray:
+    """
+    Measured force of a .mot/.sto file (e.g. <trial>grf.mot at 2000 Hz) averaged over the windows of the kinematics
+    frames new_time. With several columns (e.g. the 3 components of a force vector), the magnitude is returned.
+    """
+
+    data, _ = read_sto_columns(file_path, ["time", *columns])
+    force: ndarray = box_average(data[:, 0], data[:, 1:], new_time)
+    return force[:, 0] if len(columns) == 1 else np.linalg.norm(force, axis=1)
+
+
+class IdentificationTrial(NamedTuple):
+    penetration: ndarray        # (T, )
+    penetration_rate: ndarray   # (T, )
+    force: ndarray              # (T, ) measured force at the same frames (see box_average)
+    R: float                    # effective radius
+    group: str = "default"      # trials of the same group share the parameters
+    weights: Optional[ndarray] = None   # (T, ) per-frame weights of the residuals
+
+
+class IdentificationResult:
+
+    def __init__(self, groups: List[str], params: ndarray, fitted: Tuple[str, ...], cost: ndarray, rmse: ndarray,
+                 iterations: int, converged: ndarray):
+        self.groups: List[str] = groups
+        self.params: ndarray = params       # (G, 4), columns ordered as IDENTIFIABLE
+        self.fitted: Tuple[str, ...] = fitted
+        self.cost: ndarray = cost           # (G, ) 0.5 * sum of squared weighted residuals
+        self.rmse: ndarray = rmse           # (G, ) N
+        self.iterations: int = iterations
+        self.converged: ndarray = converged
+
+    def parameters(self, group: str = "default") -> Dict[str, float]:
+        return dict(zip(IDENTIFIABLE, self.params[self.groups.index(group)].tolist()))
+
+    def contact_parameters(self, group: str = "default",
+                           base: ContactParameters = ContactParameters()) -> ContactParameters:
+        return base._replace(**self.parameters(group))
+
+
+def identify_parameters(trials: Sequence[IdentificationTrial], initial: ContactParameters = ContactParameters(),
+                        fit: Sequence[str] = ("k", "c"), max_iterations: int = 100, tol: float = 1e-10,
+                        damping: float = 1e-3) -> IdentificationResult:
+    """
+    Fit the smooth Hunt-Crossley parameters in fit to the measured forces, separately for every group of trials.
+
+    :param trials: trials with penetration, rate and measured force at the same frames.
+    :param initial: starting values of k, c, bc, cf; the parameters not in fit stay at these values.
+    :param fit: parameters to identify, a subset of IDENTIFIABLE.
+    :param max_iterations: maximum number of Levenberg-Marquardt iterations.
+    :param tol: convergence threshold on the relative cost decrease and on the log-parameter step.
+    :param damping: initial Levenberg-Marquardt damping.
+    """
+
+    unknown: List[str] = [name for name in fit if name not in IDENTIFIABLE]
+    if unknown:
+        raise ValueError(f"can't identify {unknown}. Parameters: {IDENTIFIABLE}")
+
+    groups: List[str] = sorted({trial.group for trial in trials})
+    n_groups: int = len(groups)
+    free: ndarray = np.array([name in fit for name in IDENTIFIABLE])
+
+    # all the frames of all the trials, with their group and effective radius
+    x: ndarray = np.concatenate([np.asarray(t.penetration, dtype=float64).ravel() for t in trials])
+    x_dot: ndarray = np.concatenate([np.asarray(t.penetration_rate, dtype=float64).ravel() for t in trials])
+    measured: ndarray = np.concatenate([np.asarray(t.force, dtype=float64).ravel() for t in trials])
+    frame_group: ndarray = np.concatenate([np.full(len(t.penetration), groups.index(t.group)) for t in trials])
+    R: ndarray = np.concatenate([np.full(len(t.penetration), t.R, dtype=float64) for t in trials])
+    w: ndarray = np.sqrt(np.concatenate([np.ones(len(t.penetration)) if t.weights is None
+                                         else np.asarray(t.weights, dtype=float64) for t in trials]))
+
+    def evaluate(log_params: ndarray, jacobian: bool):
+        p: ndarray = np.exp(log_params)[frame_group]
+        force, d_force = force_and_gradients(x, x_dot, R, p[:, 0], p[:, 1], p[:, 2], p[:, 3])
+        residuals: ndarray = w * (force - measured)
+        cost: ndarray = 0.5 * np.bincount(frame_group, residuals * residuals, minlength=n_groups)
+        if not jacobian:
+            return residuals, cost, None
+
+        # chain rule to the log-parameters, then drop the fixed ones
+        J: ndarray = (w[:, None] * d_force * p) * free
+        return residuals, cost, J
+
+    def normal_equations(residuals: ndarray, J: ndarray) -> Tuple[ndarray, ndarray]:
+        JtJ: ndarray = np.stack([np.bincount(frame_group, J[:, i] * J[:, j], minlength=n_groups)
+                                 for i in range(4) for j in range(4)], axis=1).reshape(n_groups, 4, 4)
+        Jtr: ndarray = np.stack([np.bincount(frame_group, J[:, i] * residuals, minlength=n_groups)
+                                 for i in range(4)], axis=1)
+        return JtJ, Jtr
+
+    values = initial._asdict()
+    start: ndarray = np.tile([float(values[name]) for name in IDENTIFIABLE], (n_groups, 1))
+    log_params: ndarray = np.log(start)
+    lam: ndarray = np.full(n_groups, damping)
+    converged: ndarray = np.zeros(n_groups, dtype=bool)
+
+    residuals, cost, J = evaluate(log_params, True)
+    iteration: int = 0
+    for iteration in range(1, max_iterations + 1):
+        JtJ, Jtr = normal_equations(residuals, J)
+
+        # damped system; fixed parameters get an identity row so that their step is 0
+        diagonal: ndarray = np.diagonal(JtJ, axis1=1, axis2=2)
+        A: ndarray = JtJ + (lam[:, None] * np.where(diagonal > 0, diagonal, 1.0))[:, :, None] * np.eye(4)
+        A[:, ~free, :] = 0.0
+        A[:, :, ~free] = 0.0
+        A[:, ~free, ~free] = 1.0
+        b: ndarray = -Jtr * free
+
+        step: ndarray = np.linalg.solve(A, b[..., None])[..., 0]
+        step[converged] = 0.0
+
+        candidate: ndarray = log_params + step
+        new_residuals, new_cost, _ = evaluate(candidate, False)
+        better: ndarray = (new_cost < cost) & ~converged
+
+        relative_decrease: ndarray = (cost - new_cost) / np.maximum(cost, 1e-300)
+        converged |= better & ((relative_decrease < tol) | (np.abs(step).max(axis=1) < tol))
+        converged |= ~better & (lam > 1e12)
+
+        log_params[better] = candidate[better]
+        lam = np.where(better, lam / 10, lam * 10)
+
+        if converged.all():
+            break
+
+        residuals, cost, J = evaluate(log_params, True)
+
+    _, cost, _ = evaluate(log_params, False)
+    n_frames: ndarray = np.bincount(frame_group, minlength=n_groups)
+    rmse: ndarray = np.sqrt(2 * cost / np.maximum(n_frames, 1))
+
+    # fixed parameters as given, not through exp(log())
+    params: ndarray = np.where(free, np.exp(log_params), start)
+    return IdentificationResult(groups, params, tuple(fit), cost, rmse, iteration, converged)
@@ -0,0 +1,125 @@
+import numpy as np
+from numpy import ndarray, float64
+from .batch_forces import smooth_hunt_crossley_batch
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+ParamGrid = Union[float, Sequence[float], ndarray]
+
+# order of the parameter columns of a sweep
+PARAMETER_NAMES: Tuple[str, ...] = ("k", "c", "bc", "cf", "R")
+
+
+def trapezoid_weights(time: ndarray) -> ndarray:
+    """
+    Weights w such that force @ w is the trapezoidal integral of force over time.
+    """
+
+    dt: ndarray = np.diff(time)
+    w: ndarray = np.zeros_like(time, dtype=float64)
+    w[:-1] += 0.5 * dt
+    w[1:] += 0.5 * dt
+    return w
+
+
+class SweepResult:
+    """
+    Output of sweep_contact_parameters. Row p of every array corresponds to the parameter combination params[p], whose
+    columns are labelled by names. grid_shape is the shape of the Cartesian grid, so e.g. peak.reshape(grid_shape) is
+    indexed [k, c, bc, cf, R].
+    """
+
+    def __init__(self, names: Tuple[str, ...], params: ndarray, grid_shape: Tuple[int, ...], time: ndarray,
+                 peak: ndarray, impulse: ndarray, duration: ndarray, forces: Optional[ndarray]):
+        self.names: Tuple[str, ...] = names
+        self.params: ndarray = params
+        self.grid_shape: Tuple[int, ...] = grid_shape
+        self.time: ndarray = time
+        self.peak: ndarray = peak
+        self.impulse: ndarray = impulse
+        self.duration: ndarray = duration
+        self.forces: Optional[ndarray] = forces   # (params x time), None if not kept
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    def parameters(self, p: int) -> Dict[str, float]:
+        return {name: float(value) for name, value in zip(self.names, self.params[p])}
+
+    def summary(self, max_rows: Optional[int] = None) -> str:
+        """
+        Plain-text table with one row per parameter combination.
+        """
+
+        header: List[str] = [f"{name:>14}" for name in self.names] + [f"{m:>14}" for m in
+                                                                      ("peak (N)", "impulse (Ns)", "duration (s)")]
+        lines: List[str] = ["".join(header)]
+
+        n_rows: int = len(self) if max_rows is None else min(max_rows, len(self))
+        for p in range(n_rows):
+            row: List[float] = list(self.params[p]) + [self.peak[p], self.impulse[p], self.duration[p]]
+            lines.append("".join(f"{value:>14.4g}" for value in row))
+
+        return "\n".join(lines)
+
+
+def sweep_contact_parameters(x: ndarray, x_dot: ndarray, time: ndarray, k: ParamGrid, c: ParamGrid,
+                             R: ParamGrid, bc: ParamGrid = 50.0, cf: ParamGrid = 1e-8,
+                             threshold: float = 1.0, keep_forces: bool = True,
+                             max_elements: int = 2 ** 22) -> SweepResult:
+    """
+    Evaluate smooth_hunt_crossley over the Cartesian grid of the given parameter values. The penetration and its rate
+    come from the kinematics only, so they are computed once (e.g. with ContactPair.evaluate_many) and reused for every
+    combination; the force model is broadcast over (combinations x time) in blocks of at most max_elements values.
+
+    :param x: (T, ) penetration.
+    :param x_dot: (T, ) rate of change of the penetration.
+    :param time: (T, ) time stamps, used for impulse and contact duration.
+    :param k: stiffness value(s).
+    :param c: damping value(s).
+    :param R: effective radius value(s) (see utils.geometry.compute_effective_radius). The geometric radii used to
+              compute x are not changed.
+    :param bc: smoothing factor value(s).
+    :param cf: smoothing constant value(s).
+    :param threshold: force (N) above which a frame counts as in contact.
+    :param keep_forces: keep the whole (combinations x time) force array. If False, only the metrics are kept and no
+                        array bigger than one block is allocated.
+    :param max_elements: maximum number of force values computed in one vectorized pass.
+    :return: SweepResult
+    """
+
+    x = np.ascontiguousarray(x, dtype=float64)
+    x_dot = np.ascontiguousarray(x_dot, dtype=float64)
+    time = np.asarray(time, dtype=float64)
+
+    axes: List[ndarray] = [np.atleast_1d(np.asarray(values, dtype=float64)) for values in (k, c, bc, cf, R)]
+    grid_shape: Tuple[int, ...] = tuple(len(axis) for axis in axes)
+    names: Tuple[str, ...] = PARAMETER_NAMES
+
+    mesh: List[ndarray] = np.meshgrid(*axes, indexing="ij")
+    params: ndarray = np.stack([m.ravel() for m in mesh], axis=-1)
+    P: int = len(params)
+    T: int = len(x)
+
+    w: ndarray = trapezoid_weights(time)
+
+    peak: ndarray = np.empty(P, dtype=float64)
+    impulse: ndarray = np.empty(P, dtype=float64)
+    duration: ndarray = np.empty(P, dtype=float64)
+    forces: Optional[ndarray] = np.empty((P, T), dtype=float64) if keep_forces else None
+
+    block: int = max(1, max_elements // max(T, 1))
+    buffer: Optional[ndarray] = None if keep_forces else np.empty((min(block, P), T), dtype=float64)
+
+    for start in range(0, P, block):
+        stop: int = min(start + block, P)
+        chunk: ndarray = params[start:stop]
+
+        out: ndarray = forces[start:stop] if keep_forces else buffer[:stop - start]
+        k_, c_, bc_, cf_, R_ = (chunk[:, i, None] for i in range(len(names)))
+        smooth_hunt_crossley_batch(x, x_dot, R_, k_, c_, bc_, cf_, out=out)
+
+        peak[start:stop] = out.max(axis=-1)
+        impulse[start:stop] = out @ w
+        duration[start:stop] = (out > threshold) @ w
+
+    return SweepResult(names, params, grid_shape, time, peak, impulse, duration, forces)
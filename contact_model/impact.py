@@ -0,0 +1,282 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_effective_radius
+from utils.vector_algebra import dot_products, norms
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+ArrayLike = Union[float, ndarray]
+
+# Dormand-Prince 5(4) tableau
+_A: Tuple[Tuple[float, ...], ...] = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+_B5: ndarray = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+_B4: ndarray = np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+_E: ndarray = _B5 - _B4
+
+_Y_AXIS: ndarray = np.array([0.0, 1.0, 0.0])
+
+# Both bodies translate freely and only interact through the smooth Hunt-Crossley force along the contact normal. The
+# cylinder axis is along ground y. Strikes are integrated with a batched
+# Dormand-Prince 5(4) scheme, each with its own step, and steps never jump over the onset or the separation.
+
+# ImpactResult.status of each strike
+FINISHED: int = 0           # reached t_end
+SEPARATED: int = 1          # stopped at separation (stop_at_separation)
+STEP_UNDERFLOW: int = 2     # stopped because the step went below h_min: the rest of the strike is missing
+MAX_ITERATIONS: int = 3     # still running when max_iterations was reached
+
+
+class Strikes(NamedTuple):
+    """
+    Initial conditions and parameters of N strikes. Vectors are (N, 3) in ground, the rest (N, ).
+    """
+    sphere_pos: ndarray
+    sphere_vel: ndarray
+    bag_pos: ndarray        # centre of the cylinder
+    bag_vel: ndarray
+    sphere_mass: ndarray    # effective mass of the fist
+    bag_mass: ndarray
+    k: ndarray
+    c: ndarray
+
+    def __len__(self) -> int:
+        return len(self.k)
+
+
+def make_strikes(speed: ArrayLike, sphere_mass: ArrayLike, bag_mass: ArrayLike, k: ArrayLike, c: ArrayLike,
+                 gap: ArrayLike = 0.02, height: ArrayLike = 0.0,
+                 params: ContactParameters = ContactParameters()) -> Strikes:
+    """
+    Strikes along +x at a bag at rest in the origin. All the arguments are broadcast against each other and flattened,
+    so e.g. speed[:, None] and k[None, :] give every speed with every stiffness.
+
+    :param speed: fist speed (m/s).
+    :param gap: initial distance between the sphere and the cylinder surfaces (m).
+    :param height: height of the sphere centre relative to the cylinder centre (m).
+    """
+
+    speed, sphere_mass, bag_mass, k, c, gap, height = (
+        a.ravel() for a in np.broadcast_arrays(*(np.asarray(a, dtype=float64)
+                                                 for a in (speed, sphere_mass, bag_mass, k, c, gap, height))))
+    n: int = len(speed)
+
+    sphere_pos: ndarray = np.zeros((n, 3), dtype=float64)
+    sphere_pos[:, 0] = -(params.cylinder_r + params.sphere_r + gap)
+    sphere_pos[:, 1] = height
+    sphere_vel: ndarray = np.zeros((n, 3), dtype=float64)
+    sphere_vel[:, 0] = speed
+
+    return Strikes(sphere_pos, sphere_vel, np.zeros((n, 3)), np.zeros((n, 3)), sphere_mass, bag_mass, k, c)
+
+
+class ImpactResult:
+    """
+    Output of simulate_strikes. time, penetration, penetration_rate and force hold one array per strike, sampled at
+    the accepted steps (so they're dense during contact and sparse in free flight). onset and separation are nan for
+    strikes that never touched / never left the bag before they stopped. status tells why each strike stopped (FINISHED,
+    SEPARATED, STEP_UNDERFLOW or MAX_ITERATIONS): only FINISHED and SEPARATED strikes are complete.
+    """
+
+    def __init__(self, time: List[ndarray], penetration: List[ndarray], penetration_rate: List[ndarray],
+                 force: List[ndarray], onset: ndarray, separation: ndarray, impulse: ndarray,
+                 final_state: ndarray, n_steps: ndarray, n_rejected: ndarray, status: ndarray):
+        self.time: List[ndarray] = time
+        self.penetration: List[ndarray] = penetration
+        self.penetration_rate: List[ndarray] = penetration_rate
+        self.force: List[ndarray] = force
+        self.onset: ndarray = onset
+        self.separation: ndarray = separation
+        self.impulse: ndarray = impulse
+        self.final_state: ndarray = final_state     # (N, 12): sphere pos, sphere vel, bag pos, bag vel
+        self.n_steps: ndarray = n_steps
+        self.n_rejected: ndarray = n_rejected
+        self.status: ndarray = status
+
+    def __len__(self) -> int:
+        return len(self.onset)
+
+    @property
+    def complete(self) -> ndarray:
+        return (self.status == FINISHED) | (self.status == SEPARATED)
+
+    @property
+    def n_underflow(self) -> int:
+        return int(np.count_nonzero(self.status == STEP_UNDERFLOW))
+
+    @property
+    def peak(self) -> ndarray:
+        return np.array([f.max() if len(f) else 0.0 for f in self.force])
+
+    @property
+    def duration(self) -> ndarray:
+        return self.separation - self.onset
+
+    @property
+    def rebound_velocity(self) -> ndarray:
+        return self.final_state[:, 3:6]
+
+    @property
+    def bag_velocity(self) -> ndarray:
+        return self.final_state[:, 9:12]
+
+    def resample(self, rate: float, duration: Optional[float] = None) -> Tuple[ndarray, ndarray]:
+        """
+        Forces interpolated on a common time grid starting at each strike's contact onset.
+
+        :param rate: sampling rate (Hz).
+        :param duration: length of the grid (s). None uses the longest contact.
+        :return: (T, ) time since onset and (N, T) forces (0 for strikes without contact and past the last step).
+        """
+
+        if duration is None:
+            duration = float(np.nanmax(self.duration)) if np.isfinite(self.duration).any() else 0.0
+        t: ndarray = np.arange(int(round(duration * rate)) + 1) / rate
+
+        forces: ndarray = np.zeros((len(self), len(t)), dtype=float64)
+        for i in np.flatnonzero(np.isfinite(self.onset)):
+            forces[i] = np.interp(t + self.onset[i], self.time[i], self.force[i], left=0.0, right=0.0)
+
+        return t, forces
+
+
+def _contact(y: ndarray, half_height: float, sphere_r: float, cylinder_r: float, R: float, k: ndarray, c: ndarray,
+             bc: float, cf: float) -> Tuple[ndarray, ...]:
+    sphere_pos, sphere_vel, bag_pos, bag_vel = y[:, 0:3], y[:, 3:6], y[:, 6:9], y[:, 9:12]
+    relative_vel: ndarray = bag_vel - sphere_vel
+
+    # normal from the orthogonal projection of the sphere centre on the axis. compute_penetrations scales q elementwise,
+    # which tilts the normal (and the impulse) towards the cylinder centre when the sphere is off its mid-height, and
+    # picks the edges from the motion direction, which is undefined when the bodies are at rest
+    bottom: ndarray = bag_pos - half_height * _Y_AXIS
+    Q: ndarray = bottom + dot_products(sphere_pos - bottom, _Y_AXIS)[:, None] * _Y_AXIS
+    distance: ndarray = norms(sphere_pos - Q)
+    n: ndarray = (sphere_pos - Q) / distance[:, None]
+    d: ndarray = sphere_r + cylinder_r - distance
+    rate: ndarray = dot_products(relative_vel, n)
+    force: ndarray = smooth_hunt_crossley_batch(d, rate, R, k, c, bc, cf)
+
+    return d, rate, force, n
+
+
+def simulate_strikes(strikes: Strikes, params: ContactParameters = ContactParameters(), bag_height: float = 1.0,
+                     t_end: float = 0.5, rtol: float = 1e-6, atol: float = 1e-9, h_max: float = 1e-3,
+                     h_min: float = 1e-10, event_tol: float = 1e-9, stop_at_separation: bool = True,
+                     max_iterations: int = 100000) -> ImpactResult:
+    """
+    :param strikes: initial conditions and per-strike parameters (see make_strikes).
+    :param params: sphere_r, cylinder_r, bc and cf are used; k and c come from strikes.
+    :param bag_height: length of the cylinder (m).
+    :param t_end: end time (s).
+    :param rtol: relative tolerance of the local error.
+    :param atol: absolute tolerance of the local error.
+    :param h_max: largest step (s), taken in free flight.
+    :param h_min: smallest step (s). Strikes that would need smaller steps are stopped with status STEP_UNDERFLOW.
+    :param event_tol: penetration (m) within which onset and separation are considered located.
+    :param stop_at_separation: stop each strike as soon as the sphere leaves the bag.
+    :param max_iterations: safety limit on the number of batched steps.
+    """
+
+    n: int = len(strikes)
+    # state: sphere pos, sphere vel, bag pos, bag vel, impulse (integrated with the rest, to the same tolerance)
+    y: ndarray = np.concatenate([strikes.sphere_pos, strikes.sphere_vel, strikes.bag_pos, strikes.bag_vel,
+                                 np.zeros((n, 1))], axis=1).astype(float64)
+    inv_sphere_mass: ndarray = 1.0 / strikes.sphere_mass
+    inv_bag_mass: ndarray = 1.0 / strikes.bag_mass
+    R: float = compute_effective_radius(params.sphere_r, params.cylinder_r)
+    geometry = (0.5 * bag_height, params.sphere_r, params.cylinder_r, R)
+
+    t: ndarray = np.zeros(n, dtype=float64)
+    h: ndarray = np.full(n, h_max, dtype=float64)
+    onset: ndarray = np.full(n, np.nan)
+    separation: ndarray = np.full(n, np.nan)
+    n_steps: ndarray = np.zeros(n, dtype=np.int64)
+    n_rejected: ndarray = np.zeros(n, dtype=np.int64)
+    active: ndarray = np.ones(n, dtype=bool)
+    status: ndarray = np.full(n, MAX_ITERATIONS, dtype=np.int8)
+
+    d, rate, force, _ = _contact(y, *geometry, strikes.k, strikes.c, params.bc, params.cf)
+    # copies: d, rate and force are updated in place as the strikes advance
+    records: List[Tuple[ndarray, ...]] = [(np.arange(n), t.copy(), d.copy(), rate.copy(), force.copy())]
+
+    def derivatives(yy: ndarray, idx: ndarray) -> ndarray:
+        _, _, f, nn = _contact(yy, *geometry, strikes.k[idx], strikes.c[idx], params.bc, params.cf)
+        # the normal points from the bag at the sphere
+        dy: ndarray = np.empty_like(yy)
+        dy[:, 0:3] = yy[:, 3:6]
+        dy[:, 3:6] = (f * inv_sphere_mass[idx])[:, None] * nn
+        dy[:, 6:9] = yy[:, 9:12]
+        dy[:, 9:12] = -(f * inv_bag_mass[idx])[:, None] * nn
+        dy[:, 12] = f
+        return dy
+
+    for _ in range(max_iterations):
+        idx: ndarray = np.flatnonzero(active)
+        if not len(idx):
+            break
+
+        y0: ndarray = y[idx]
+        hh: ndarray = np.minimum(h[idx], t_end - t[idx])[:, None]
+
+        stages: ndarray = np.empty((7, len(idx), 13), dtype=float64)
+        stages[0] = derivatives(y0, idx)
+        for s in range(1, 7):
+            stages[s] = derivatives(y0 + hh * np.tensordot(_A[s], stages[:s], axes=1), idx)
+
+        y1: ndarray = y0 + hh * np.tensordot(_B5, stages, axes=1)
+        error: ndarray = hh * np.tensordot(_E, stages, axes=1)
+        scale: ndarray = atol + rtol * np.maximum(np.abs(y0), np.abs(y1))
+        error_norm: ndarray = np.sqrt(np.mean((error / scale) ** 2, axis=1))
+
+        d0: ndarray = d[idx]
+        d1, rate1, force1, _ = _contact(y1, *geometry, strikes.k[idx], strikes.c[idx], params.bc, params.cf)
+
+        # a step that crosses penetration 0 by more than event_tol is shortened with a secant guess of the crossing
+        crossing: ndarray = ((d0 < -event_tol) & (d1 > event_tol)) | ((d0 > event_tol) & (d1 < -event_tol))
+        accepted: ndarray = (error_norm <= 1.0) & ~crossing
+
+        factor: ndarray = np.clip(0.9 * np.maximum(error_norm, 1e-10) ** -0.2, 0.2, 5.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            secant: ndarray = np.clip(d0 / (d0 - d1), 0.05, 0.95)
+        h_next: ndarray = np.where(error_norm <= 1.0, np.where(crossing, secant, factor), factor) * hh[:, 0]
+
+        # accepted steps
+        a_idx: ndarray = idx[accepted]
+        t[a_idx] += hh[accepted, 0]
+        y[a_idx] = y1[accepted]
+        d[a_idx], rate[a_idx], force[a_idx] = d1[accepted], rate1[accepted], force1[accepted]
+        n_steps[a_idx] += 1
+        n_rejected[idx[~accepted]] += 1
+        records.append((a_idx, t[a_idx], d1[accepted], rate1[accepted], force1[accepted]))
+
+        # events
+        started: ndarray = accepted & (d0 <= 0) & (d1 > 0) & np.isnan(onset[idx])
+        onset[idx[started]] = t[idx[started]]
+        ended: ndarray = accepted & (d0 > 0) & (d1 <= 0) & ~np.isnan(onset[idx]) & np.isnan(separation[idx])
+        separation[idx[ended]] = t[idx[ended]]
+
+        h[idx] = np.minimum(h_next, h_max)
+        finished: ndarray = t[idx] >= t_end
+        separated: ndarray = ended & ~finished if stop_at_separation else np.zeros(len(idx), dtype=bool)
+        underflow: ndarray = (h[idx] < h_min) & ~finished & ~separated
+        status[idx[finished]] = FINISHED
+        status[idx[separated]] = SEPARATED
+        status[idx[underflow]] = STEP_UNDERFLOW
+        active[idx[finished | separated | underflow]] = False
+
+    order_idx: ndarray = np.concatenate([r[0] for r in records])
+    order: ndarray = np.argsort(order_idx, kind="stable")
+    splits: ndarray = np.cumsum(np.bincount(order_idx, minlength=n))[:-1]
+    time, penetration, penetration_rate, forces = (np.split(np.concatenate([r[j] for r in records])[order], splits)
+                                                   for j in range(1, 5))
+
+    return ImpactResult(time, penetration, penetration_rate, forces, onset, separation, y[:, 12], y[:, :12], n_steps,
+                        n_rejected, status)
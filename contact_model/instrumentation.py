@@ -0,0 +1,221 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_NULL_CONTEXT = nullcontext()
+
+_active: Optional["Profiler"] = None
+
+
+class StageStats:
+    __slots__ = ("calls", "time", "net_bytes", "net_blocks")
+
+    def __init__(self):
+        self.calls: int = 0
+        self.time: float = 0.0
+        self.net_bytes: int = 0
+        self.net_blocks: int = 0
+
+
+class Profiler:
+    """
+    Per-trial, per-stage wall time, call counts and, optionally, net allocated bytes and blocks.
+
+    Stages are marked in the code with stage() or @instrumented. While no Profiler is enabled they cost one global
+    lookup, so they are only placed around coarse spans (a group of OpenSim calls, the Vec3/ndarray conversions of a
+    frame, a batched kernel), and scalar kernels such as smooth_hunt_crossley are timed at their call sites.
+    """
+
+    def __init__(self, trace: bool = False, memory: bool = False):
+        """
+        :param trace: also keep one event per stage call, for write_trace. Memory grows with the number of calls.
+        :param memory: record the net bytes allocated by every stage with tracemalloc (NumPy buffers included), and
+                       the net number of allocated blocks (sys.getallocatedblocks, Python objects only). This slows
+                       down every allocation while the profiler is enabled.
+        """
+
+        self.stats: Dict[str, Dict[str, StageStats]] = {}
+        self.events: Optional[List[Dict[str, Any]]] = [] if trace else None
+        self.memory: bool = memory
+        self.current_trial: str = "default"
+        self._t0: float = time.perf_counter()
+        self._started_tracemalloc: bool = False
+
+    def _memory(self) -> Tuple[int, int]:
+        if not self.memory:
+            return 0, 0
+        return tracemalloc.get_traced_memory()[0], sys.getallocatedblocks()
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def trial(self, name: str) -> Iterator["Profiler"]:
+        previous: str = self.current_trial
+        self.current_trial = name
+        try:
+            yield self
+        finally:
+            self.current_trial = previous
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        bytes0, blocks0 = self._memory()
+        t0: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            t1: float = time.perf_counter()
+            bytes1, blocks1 = self._memory()
+            self.record(name, t0, t1, bytes1 - bytes0, blocks1 - blocks0)
+
+    def record(self, name: str, t0: float, t1: float, net_bytes: int = 0, net_blocks: int = 0):
+        trial_stats: Dict[str, StageStats] = self.stats.setdefault(self.current_trial, {})
+        stats: Optional[StageStats] = trial_stats.get(name)
+        if stats is None:
+            stats = trial_stats[name] = StageStats()
+
+        stats.calls += 1
+        stats.time += t1 - t0
+        stats.net_bytes += net_bytes
+        stats.net_blocks += net_blocks
+
+        if self.events is not None:
+            self.events.append({"name": name, "cat": self.current_trial, "ph": "X", "pid": 0, "tid": 0,
+                                "ts": (t0 - self._t0) * 1e6, "dur": (t1 - t0) * 1e6})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------------------------------------------------------
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        One dict per (trial, stage): calls, total and mean time (s), net allocated bytes and blocks (0 without memory).
+        """
+
+        return [{"trial": trial, "stage": name, "calls": s.calls, "time": s.time,
+                 "mean_time": s.time / s.calls if s.calls else 0.0, "net_bytes": s.net_bytes,
+                 "net_blocks": s.net_blocks}
+                for trial, trial_stats in self.stats.items() for name, s in trial_stats.items()]
+
+    def summary_table(self) -> str:
+        lines: List[str] = [f"{'trial':<20}{'stage':<45}{'calls':>10}{'total (ms)':>14}{'mean (us)':>12}"
+                            f"{'net bytes':>12}{'net blocks':>12}"]
+
+        for r in sorted(self.to_records(), key=lambda r: (r["trial"], -r["time"])):
+            lines.append(f"{r['trial']:<20}{r['stage']:<45}{r['calls']:>10}{r['time'] * 1e3:>14.3f}"
+                         f"{r['mean_time'] * 1e6:>12.2f}{r['net_bytes']:>12}{r['net_blocks']:>12}")
+
+        return "\n".join(lines)
+
+    def write_trace(self, file_path: str):
+        """
+        Chrome trace event file (open with chrome://tracing or Perfetto). Needs Profiler(trace=True).
+        """
+
+        if self.events is None:
+            raise ValueError("the profiler was created with trace=False")
+
+        with open(file_path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def enable(trace: bool = False, memory: bool = False) -> Profiler:
+    """
+    Start recording into a new Profiler:
+
+        profiler = enable()
+        with profiler.trial("P8"):
+            ...
+        disable()
+        print(profiler.summary_table())
+        profiler.write_trace("trace.json")  # chrome://tracing / Perfetto
+    """
+
+    global _active
+    if _active is not None:
+        _active.stop()
+
+    _active = Profiler(trace, memory)
+    _active.start()
+    return _active
+
+
+def disable() -> Optional[Profiler]:
+    global _active
+    profiler: Optional[Profiler] = _active
+    if profiler is not None:
+        profiler.stop()
+
+    _active = None
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _active
+
+
+@contextmanager
+def profiling(trace: bool = False, memory: bool = False) -> Iterator[Profiler]:
+    """
+    Enable a new Profiler for the duration of the with block.
+    """
+
+    global _active
+    previous: Optional[Profiler] = _active
+    profiler: Profiler = Profiler(trace, memory)
+    profiler.start()
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = previous
+
+
+def stage(name: str):
+    """
+    Context manager that records name in the active profiler, or does nothing if instrumentation is disabled.
+    """
+
+    if _active is None:
+        return _NULL_CONTEXT
+
+    return _active.stage(name)
+
+
+def instrumented(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that records every call of the function as a stage.
+    """
+
+    def decorator(func: Callable) -> Callable:
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler: Optional[Profiler] = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+
+            bytes0, blocks0 = profiler._memory()
+            t0: float = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                t1: float = time.perf_counter()
+                bytes1, blocks1 = profiler._memory()
+                profiler.record(name, t0, t1, bytes1 - bytes0, blocks1 - blocks0)
+
+        return wrapper
+
+    return decorator
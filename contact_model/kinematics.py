@@ -0,0 +1,20 @@
+from typing import NamedTuple
+
+# type hint imports
+from numpy import ndarray
+
+
+class ContactKinematics(NamedTuple):
+    """
+    Output of ContactPair. Every field is either a single frame (3D vectors with shape (3, ), scalars for penetration
+    and its rate) or a whole trajectory (3D vectors with shape (T, 3), penetration and rate with shape (T, )). All the
+    vectors are expressed in ground.
+    """
+    sphere_centre: ndarray
+    cylinder_bottom: ndarray
+    cylinder_top: ndarray
+    cylinder_edge: ndarray
+    sphere_edge: ndarray
+    normal: ndarray
+    penetration: ndarray
+    penetration_rate: ndarray
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.kinematics import ContactKinematics
+from contact_model.parameters import ContactParameters
+from typing import Callable, Dict, List, Optional, Tuple
+
+# root of the on-disk caches. Unset: nothing is cached on disk unless a directory is passed explicitly
+CACHE_DIR_ENV: str = "TACKLING_MSK_CACHE_DIR"
+
+# bump when the contents of ContactKinematics (or the way they're computed) change, so old entries are never reused
+CACHE_VERSION: int = 1
+
+_file_hashes: Dict[Tuple[str, int, float], str] = {}
+
+
+def cache_directory(name: str) -> Optional[str]:
+    """
+    $TACKLING_MSK_CACHE_DIR/<name>, or None if the environment variable is not set.
+    """
+
+    root: Optional[str] = os.environ.get(CACHE_DIR_ENV)
+    return os.path.join(root, name) if root else None
+
+
+def file_hash(file_path: str) -> str:
+    """
+    sha256 of a file's contents. Memoised per process by (path, size, mtime), so a file is only read once per run.
+    """
+
+    stat = os.stat(file_path)
+    memo_key: Tuple[str, int, float] = (os.path.abspath(file_path), stat.st_size, stat.st_mtime)
+    if memo_key not in _file_hashes:
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_hashes[memo_key] = h.hexdigest()
+
+    return _file_hashes[memo_key]
+
+
+class KinematicsCache:
+    """
+    Content-addressed on-disk cache of per-frame contact kinematics (ContactKinematics).
+
+    Entries are keyed by the hash of the .osim, the states file, the optional kinematics file and the geometry
+    parameters (sphere_loc, sphere_r, cylinder_r), and stored as uncompressed .npz files with one float64 array per
+    field. When the total size goes over max_bytes, the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model_file: str, states_file: str, sphere_loc: ndarray, sphere_r: float, cylinder_r: float,
+            kinematics_file: Optional[str] = None) -> str:
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_VERSION}".encode())
+        for file_path in (model_file, states_file, kinematics_file):
+            h.update(b"-" if file_path is None else file_hash(file_path).encode())
+
+        h.update(np.asarray(sphere_loc, dtype=float64).reshape(3).tobytes())
+        h.update(np.array([sphere_r, cylinder_r], dtype=float64).tobytes())
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[ContactKinematics]:
+        path: str = self._path(key)
+        try:
+            with np.load(path) as data:
+                kin: ContactKinematics = ContactKinematics(*(data[field] for field in ContactKinematics._fields))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        return kin
+
+    def put(self, key: str, kin: ContactKinematics):
+        path: str = self._path(key)
+        tmp_path: str = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{field: np.asarray(value, dtype=float64) for field, value in kin._asdict().items()})
+        os.replace(tmp_path, path)
+
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Delete least recently used entries until the cache fits in max_bytes. The entry keep (e.g. the one just
+        written) is never deleted, even if it's bigger than max_bytes on its own.
+        """
+
+        keep_path: Optional[str] = None if keep is None else self._path(keep)
+
+        entries: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path: str = os.path.join(self.directory, name)
+            if path == keep_path:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total: int = sum(size for _, size, _ in entries)
+        if keep_path is not None and os.path.exists(keep_path):
+            total += os.path.getsize(keep_path)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.directory, name))
+
+    def get_or_compute(self, key: str, compute: Callable[[], ContactKinematics]) -> ContactKinematics:
+        kin: Optional[ContactKinematics] = self.get(key)
+        if kin is None:
+            kin = compute()
+            self.put(key, kin)
+
+        return kin
+
+
+def cached_contact_kinematics(model_file: str, states_file: str, kinematics_file: Optional[str] = None,
+                              params: ContactParameters = ContactParameters(),
+                              cache: Optional[KinematicsCache] = None) -> ContactKinematics:
+    """
+    ContactKinematics of a whole trial, from the cache if possible. OpenSim is only imported (and the model only
+    loaded) on a cache miss.
+
+    :param model_file: .osim model.
+    :param states_file: states .sto replayed on the model.
+    :param kinematics_file: BodyKinematics velocity file used for the cylinder velocity. If None, the velocity of the
+                            cylinder centre of mass is read from the states.
+    :param params: sphere_loc, sphere_r and cylinder_r are used.
+    :param cache: KinematicsCache. None uses $TACKLING_MSK_CACHE_DIR/kinematics if the variable is set, and computes
+                  without caching otherwise.
+    """
+
+    if cache is None:
+        directory: Optional[str] = cache_directory("kinematics")
+        cache = None if directory is None else KinematicsCache(directory)
+
+    def compute() -> ContactKinematics:
+        from opensim import Model
+        from contact_model.sphere_to_cylinder import ContactPair
+        from contact_model.state_replay import StateReplay
+        from utils.sto_reader import read_sto_columns
+
+        model = Model(model_file)
+        replay: StateReplay = StateReplay(model, states_file)
+
+        cylinder_vel: Optional[ndarray] = None
+        if kinematics_file is not None:
+            cylinder_vel, _ = read_sto_columns(kinematics_file, ["punching_bag_X", "punching_bag_Y",
+                                                                 "punching_bag_Z"])
+
+        pair: ContactPair = ContactPair(model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+        return pair.evaluate_many((s for _, s in replay), cylinder_vel)
+
+    if cache is None:
+        return compute()
+
+    return cache.get_or_compute(cache.key(model_file, states_file, params.sphere_loc, params.sphere_r,
+                                          params.cylinder_r, kinematics_file), compute)
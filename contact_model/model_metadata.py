@@ -0,0 +1,185 @@
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.kinematics_cache import cache_directory, file_hash
+from utils.osim_xml import (bodies_from_root, markers_from_root, coordinates_from_root, muscles_from_root,
+                            BodyInfo, MarkerInfo)
+from typing import Dict, List, Optional
+
+# bump when fields are added or their meaning changes
+METADATA_VERSION: int = 1
+
+_loaded: Dict[str, "ModelMetadata"] = {}
+
+
+class ModelMetadata:
+    """
+    Static model data (coordinates, muscle-tendon parameters, bodies, markers, total mass) from a single pass over the
+    .osim XML, without OpenSim. The OpenSim Model is only built, lazily, when dynamics are needed (model).
+
+    Arrays rather than objects, so that the snapshot is a plain .npz (no pickle) and loads without parsing anything.
+    """
+
+    def __init__(self, model_file: str, model_hash: str, arrays: Dict[str, ndarray]):
+        self.model_file: str = model_file
+        self.model_hash: str = model_hash
+        self.arrays: Dict[str, ndarray] = arrays
+        self._model = None
+        self._state = None
+
+        self.coordinate_names: List[str] = arrays["coordinate_names"].tolist()
+        self.coordinate_joints: List[str] = arrays["coordinate_joints"].tolist()
+        self.coordinate_defaults: ndarray = arrays["coordinate_defaults"]
+        self.coordinate_ranges: ndarray = arrays["coordinate_ranges"]          # (n_coordinates, 2)
+        self.coordinate_rotational: ndarray = arrays["coordinate_rotational"]
+        self.muscle_names: List[str] = arrays["muscle_names"].tolist()
+        self.mt_parameters: ndarray = arrays["mt_parameters"]                  # (5, n_muscles), see from_model_file
+        self.body_names: List[str] = arrays["body_names"].tolist()
+        self.body_masses: ndarray = arrays["body_masses"]
+        self.body_mass_centers: ndarray = arrays["body_mass_centers"]          # (n_bodies, 3)
+        self.marker_names: List[str] = arrays["marker_names"].tolist()
+        self.marker_bodies: List[str] = arrays["marker_bodies"].tolist()
+        self.marker_locations: ndarray = arrays["marker_locations"]            # (n_markers, 3)
+        self.total_mass: float = float(self.body_masses.sum())
+
+    @classmethod
+    def from_model_file(cls, model_file: str) -> "ModelMetadata":
+        """
+        Parse the .osim once. mt_parameters has the rows of getMTparameters.m: max isometric force, optimal fiber
+        length, tendon slack length, pennation angle at optimal fiber length and max contraction velocity (times the
+        optimal fiber length, i.e. in m/s).
+        """
+
+        root: ET.Element = ET.parse(model_file).getroot()
+        coordinates = coordinates_from_root(root)
+        muscles = muscles_from_root(root)
+        bodies = bodies_from_root(root)
+        markers = markers_from_root(root)
+
+        mt_parameters: ndarray = np.array([[m.max_isometric_force, m.optimal_fiber_length, m.tendon_slack_length,
+                                            m.pennation_angle_at_optimal,
+                                            m.max_contraction_velocity * m.optimal_fiber_length]
+                                           for m in muscles.values()], dtype=float64).reshape(-1, 5).T
+
+        arrays: Dict[str, ndarray] = {
+            "coordinate_names": np.array(list(coordinates), dtype=str),
+            "coordinate_joints": np.array([c.joint for c in coordinates.values()], dtype=str),
+            "coordinate_defaults": np.array([c.default_value for c in coordinates.values()], dtype=float64),
+            "coordinate_ranges": np.array([c.range for c in coordinates.values()], dtype=float64).reshape(-1, 2),
+            "coordinate_rotational": np.array([c.rotational for c in coordinates.values()], dtype=bool),
+            "muscle_names": np.array(list(muscles), dtype=str),
+            "mt_parameters": mt_parameters,
+            "body_names": np.array(list(bodies), dtype=str),
+            "body_masses": np.array([b.mass for b in bodies.values()], dtype=float64),
+            "body_mass_centers": np.array([b.mass_center for b in bodies.values()], dtype=float64).reshape(-1, 3),
+            "marker_names": np.array(list(markers), dtype=str),
+            "marker_bodies": np.array([m.body for m in markers.values()], dtype=str),
+            "marker_locations": np.array([m.location for m in markers.values()], dtype=float64).reshape(-1, 3),
+        }
+
+        return cls(model_file, file_hash(model_file), arrays)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------------------------------------------------------
+    def save(self, file_path: str):
+        tmp_path: str = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=METADATA_VERSION, model_hash=self.model_hash, **self.arrays)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str, model_file: str) -> Optional["ModelMetadata"]:
+        """
+        None if the snapshot is missing, unreadable or was written by another METADATA_VERSION.
+        """
+
+        try:
+            with np.load(file_path) as data:
+                if int(data["version"]) != METADATA_VERSION:
+                    return None
+                arrays: Dict[str, ndarray] = {name: data[name] for name in data.files
+                                              if name not in ("version", "model_hash")}
+                return cls(model_file, str(data["model_hash"]), arrays)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+
+    def to_mat(self, file_path: str):
+        """
+        MATLAB .mat with the same arrays (cell arrays of names). Needs scipy.
+        """
+
+        from scipy.io import savemat
+
+        arrays: Dict[str, ndarray] = {name: (value.astype(object) if value.dtype.kind == "U" else value)
+                                      for name, value in self.arrays.items()}
+        savemat(file_path, {**arrays, "total_mass": self.total_mass})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------------------------------------------------------
+    def bodies(self) -> Dict[str, BodyInfo]:
+        return {name: BodyInfo(float(mass), mass_center) for name, mass, mass_center
+                in zip(self.body_names, self.body_masses, self.body_mass_centers)}
+
+    def markers(self) -> Dict[str, MarkerInfo]:
+        return {name: MarkerInfo(body, location) for name, body, location
+                in zip(self.marker_names, self.marker_bodies, self.marker_locations)}
+
+    def coordinate_paths(self) -> List[str]:
+        """
+        Absolute paths of the coordinates (/jointset/<joint>/<coordinate>), as used by the state variable names.
+        """
+
+        return [f"/jointset/{joint}/{name}" for joint, name in zip(self.coordinate_joints, self.coordinate_names)]
+
+    @property
+    def model(self):
+        """
+        The OpenSim Model, loaded and initialised on first use.
+        """
+
+        if self._model is None:
+            from opensim import Model
+
+            self._model = Model(self.model_file)
+            self._state = self._model.initSystem()
+
+        return self._model
+
+    @property
+    def state(self):
+        self.model
+        return self._state
+
+
+def model_metadata(model_file: str, directory: Optional[str] = None) -> ModelMetadata:
+    """
+    Metadata of a model, from (in order) this process, the snapshot in directory, or a fresh parse that is then
+    written to directory.
+
+    :param directory: snapshot directory. None uses $TACKLING_MSK_CACHE_DIR/models if the variable is set; otherwise
+                      the metadata is only kept in this process and nothing is written to disk.
+    """
+
+    model_hash: str = file_hash(model_file)
+    if model_hash in _loaded:
+        return _loaded[model_hash]
+
+    if directory is None:
+        directory = cache_directory("models")
+
+    metadata: Optional[ModelMetadata] = None
+    if directory is not None:
+        file_path: str = os.path.join(directory, f"{model_hash}.npz")
+        metadata = ModelMetadata.load(file_path, model_file)
+
+    if metadata is None:
+        metadata = ModelMetadata.from_model_file(model_file)
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            metadata.save(file_path)
+
+    _loaded[model_hash] = metadata
+    return metadata
@@ -0,0 +1,20 @@
+from typing import NamedTuple, Tuple
+
+
+class ContactParameters(NamedTuple):
+    """
+    Geometry and contact model parameters of the sphere-to-cylinder contact. Defaults are the values used for the P8
+    punching trials. All the fields are immutable, so ContactParameters can be used as a dictionary key.
+    """
+    # sphere location in local clavicle reference frame (use np.asarray(sphere_loc).reshape(3) for the array)
+    sphere_loc: Tuple[float, float, float] = (-0.05, 0.015, 0.1)
+    # sphere radius
+    sphere_r: float = 0.025
+    # cylinder radius
+    cylinder_r: float = 0.1702085
+    # stiffness and damping
+    k: float = 2300832.0
+    c: float = 2.5
+    # smoothing of smooth_hunt_crossley
+    bc: float = 50.0
+    cf: float = 1e-8
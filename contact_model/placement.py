@@ -0,0 +1,284 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.body_kinematics import BodyTrajectory, load_body_trajectory, station_positions, point_velocities
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.model_metadata import model_metadata, ModelMetadata
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_penetrations, compute_effective_radius
+from utils.sto_reader import read_sto_columns
+from utils.vector_algebra import dot_products
+from typing import TYPE_CHECKING, Callable, Iterable, NamedTuple, Optional, Sequence, Tuple, Union
+
+# type hint imports
+if TYPE_CHECKING:
+    from opensim import Model, State
+
+# Nothing OpenSim computes for a frame depends on the placement of the sphere (sphere_loc, sphere_r): the body poses and
+# velocities are extracted once into FrameTransforms, and K candidate placements are then evaluated as (K, T) arrays.
+
+
+class FrameTransforms(NamedTuple):
+    """
+    Placement-independent per-frame data, in ground. Vectors are (T, 3), rotations (T, 3, 3).
+    """
+    time: ndarray
+    sphere_origin: ndarray      # origin of the sphere body frame
+    sphere_R: ndarray           # rotation from the sphere body frame to ground
+    sphere_w: ndarray           # angular velocity of the sphere body
+    sphere_v: ndarray           # velocity of the sphere body origin
+    cylinder_bottom: ndarray
+    cylinder_top: ndarray
+    cylinder_vel: ndarray       # cylinder velocity used for the motion direction
+    cylinder_origin: ndarray
+    cylinder_w: ndarray
+    cylinder_v: ndarray
+
+    def save(self, file_path: str):
+        np.savez(file_path, **self._asdict())
+
+
+def load_transforms(file_path: str) -> FrameTransforms:
+    with np.load(file_path) as data:
+        return FrameTransforms(*(data[field] for field in FrameTransforms._fields))
+
+
+def extract_transforms(model: "Model", frames: Iterable[Tuple[int, "State"]], time: ndarray,
+                       cylinder_vel: Optional[ndarray] = None, sphere_body: str = "rclavicle",
+                       cylinder_body: str = "punching_bag", cylinder_top: str = "cylinder_top",
+                       cylinder_bottom: str = "cylinder_bottom") -> FrameTransforms:
+    """
+    Read the transforms from OpenSim, once.
+
+    :param model: OpenSim Model.
+    :param frames: (frame index, state realized to velocity) pairs, e.g. a StateReplay.
+    :param time: (T, ) frame times.
+    :param cylinder_vel: (T, 3) cylinder velocities in ground. None uses the velocity of the cylinder centre of mass.
+    """
+
+    from opensim import Vec3
+
+    ground = model.getGround()
+    sphere_frame = model.getBodySet().get(sphere_body).findBaseFrame()
+    cylinder_body_ = model.getBodySet().get(cylinder_body)
+    cylinder_frame = cylinder_body_.findBaseFrame()
+    cylinder_com = cylinder_body_.getMassCenter()
+    top_marker = model.getMarkerSet().get(cylinder_top)
+    bottom_marker = model.getMarkerSet().get(cylinder_bottom)
+    unit_vectors = [Vec3(1, 0, 0), Vec3(0, 1, 0), Vec3(0, 0, 1)]
+
+    # nan for the frames that frames doesn't cover, rather than whatever was in memory
+    T: int = len(time)
+    vectors: ndarray = np.full((9, T, 3), np.nan, dtype=float64)
+    sphere_R: ndarray = np.full((T, 3, 3), np.nan, dtype=float64)
+
+    for n, s in frames:
+        for i, frame in ((0, sphere_frame), (5, cylinder_frame)):
+            spatial_vel = frame.getVelocityInGround(s)
+            vectors[i, n] = frame.getPositionInGround(s).to_numpy()
+            vectors[i + 1, n] = spatial_vel.get(0).to_numpy()
+            vectors[i + 2, n] = spatial_vel.get(1).to_numpy()
+
+        # columns of the rotation: ground images of the body axes
+        for j, e in enumerate(unit_vectors):
+            sphere_R[n, :, j] = sphere_frame.findStationLocationInGround(s, e).to_numpy() - vectors[0, n]
+
+        vectors[3, n] = bottom_marker.findLocationInFrame(s, ground).to_numpy()
+        vectors[4, n] = top_marker.findLocationInFrame(s, ground).to_numpy()
+        vectors[8, n] = cylinder_frame.findStationVelocityInGround(s, cylinder_com).to_numpy() \
+            if cylinder_vel is None else cylinder_vel[n]
+
+    return FrameTransforms(np.asarray(time, dtype=float64), vectors[0], sphere_R, vectors[1], vectors[2], vectors[3],
+                           vectors[4], vectors[8], vectors[5], vectors[6], vectors[7])
+
+
+def transforms_from_body_kinematics(model_file: str, pos_file: str, vel_file: str, sphere_body: str = "rclavicle",
+                                    cylinder_body: str = "punching_bag", cylinder_top: str = "cylinder_top",
+                                    cylinder_bottom: str = "cylinder_bottom") -> FrameTransforms:
+    """
+    Same as extract_transforms, from BodyKinematics files and the model metadata snapshot, without OpenSim.
+    """
+
+    metadata: ModelMetadata = model_metadata(model_file)
+    bodies = metadata.bodies()
+    markers = metadata.markers()
+
+    time, _ = read_sto_columns(pos_file, ["time"])
+    sphere: BodyTrajectory = load_body_trajectory(pos_file, vel_file, sphere_body)
+    cylinder: BodyTrajectory = load_body_trajectory(pos_file, vel_file, cylinder_body)
+
+    origin = {}
+    for name, traj in ((sphere_body, sphere), (cylinder_body, cylinder)):
+        origin[name] = station_positions(traj, bodies[name].mass_center, np.zeros(3))
+
+    return FrameTransforms(time[:, 0], origin[sphere_body], sphere.R, sphere.w,
+                           point_velocities(sphere, origin[sphere_body]),
+                           station_positions(cylinder, bodies[cylinder_body].mass_center,
+                                             markers[cylinder_bottom].location),
+                           station_positions(cylinder, bodies[cylinder_body].mass_center,
+                                             markers[cylinder_top].location),
+                           cylinder.com_vel, origin[cylinder_body], cylinder.w,
+                           point_velocities(cylinder, origin[cylinder_body]))
+
+
+class PlacementResult(NamedTuple):
+    offsets: ndarray            # (K, 3) sphere_loc candidates
+    radii: ndarray              # (K, ) sphere_r candidates
+    penetration: ndarray        # (K, T)
+    penetration_rate: ndarray   # (K, T)
+    force: ndarray              # (K, T)
+
+
+def evaluate_placements(transforms: FrameTransforms, offsets: ndarray, radii: Union[float, ndarray],
+                        params: ContactParameters = ContactParameters(),
+                        max_elements: int = 2**20) -> PlacementResult:
+    """
+    Penetration, rate and smooth Hunt-Crossley force of K candidate placements over all the frames.
+
+    :param transforms: per-frame data (see extract_transforms).
+    :param offsets: (K, 3) or (3, ) sphere centres in the sphere body frame.
+    :param radii: scalar or (K, ) sphere radii.
+    :param params: cylinder_r, k, c, bc and cf are used.
+    :param max_elements: candidates are processed in chunks of at most this many candidate-frames.
+    """
+
+    offsets = np.asarray(offsets, dtype=float64).reshape(-1, 3)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float64), (len(offsets),)).copy()
+    K, T = len(offsets), len(transforms.time)
+
+    penetration: ndarray = np.empty((K, T), dtype=float64)
+    rate: ndarray = np.empty((K, T), dtype=float64)
+    tr: FrameTransforms = transforms
+    chunk: int = max(1, max_elements // max(T, 1))
+
+    for start in range(0, K, chunk):
+        stop: int = min(start + chunk, K)
+        r_s: ndarray = radii[start:stop, None]
+
+        centres: ndarray = tr.sphere_origin + np.einsum("tij,kj->kti", tr.sphere_R, offsets[start:stop])
+        d, cylinder_edge, sphere_edge, n = compute_penetrations(centres, tr.cylinder_bottom, tr.cylinder_top,
+                                                                tr.cylinder_vel, r_s, params.cylinder_r)
+
+        cylinder_edge_vel: ndarray = tr.cylinder_v + np.cross(tr.cylinder_w, cylinder_edge - tr.cylinder_origin)
+        sphere_edge_vel: ndarray = tr.sphere_v + np.cross(tr.sphere_w, sphere_edge - tr.sphere_origin)
+
+        penetration[start:stop] = d
+        rate[start:stop] = dot_products(cylinder_edge_vel - sphere_edge_vel, n)
+
+    force: ndarray = smooth_hunt_crossley_batch(penetration, rate,
+                                                compute_effective_radius(radii, params.cylinder_r)[:, None],
+                                                params.k, params.c, params.bc, params.cf)
+
+    return PlacementResult(offsets, radii, penetration, rate, force)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Objectives and searches
+# ----------------------------------------------------------------------------------------------------------------------
+Objective = Callable[[PlacementResult, ndarray], ndarray]
+
+
+def contact_onsets(penetration: ndarray, time: ndarray) -> ndarray:
+    """
+    (K, ) time of the first crossing of penetration 0 from below, linearly interpolated between frames, or time[0] if
+    the sphere is already in contact at the first frame. nan if the sphere never touches.
+    """
+
+    crossing: ndarray = (penetration[:, :-1] <= 0) & (penetration[:, 1:] > 0)
+
+    # interpolate only where there is a crossing: d0 <= 0 < d1 there, so d0 - d1 is never 0
+    rows: ndarray = np.flatnonzero(crossing.any(axis=1))
+    first: ndarray = np.argmax(crossing[rows], axis=1)
+    d0: ndarray = penetration[rows, first]
+    d1: ndarray = penetration[rows, first + 1]
+
+    onset: ndarray = np.full(len(penetration), np.nan)
+    onset[rows] = time[first] + (time[first + 1] - time[first]) * d0 / (d0 - d1)
+    onset[penetration[:, 0] > 0] = time[0]
+
+    return onset
+
+
+def onset_objective(observed_onset: float) -> Objective:
+    """
+    Squared error of the contact onset time. Placements without contact cost more than any placement with contact, and
+    the closer they get to the bag the less they cost.
+    """
+
+    def objective(result: PlacementResult, time: ndarray) -> ndarray:
+        onset: ndarray = contact_onsets(result.penetration, time)
+        span: float = float(time[-1] - time[0])
+        no_contact: ndarray = span ** 2 + np.abs(result.penetration.max(axis=1))
+        return np.where(np.isnan(onset), no_contact, (onset - observed_onset) ** 2)
+
+    return objective
+
+
+class PlacementSearch(NamedTuple):
+    offsets: ndarray            # (K, 3)
+    radii: ndarray              # (R, )
+    cost: ndarray               # (K, R)
+    best_offset: ndarray
+    best_radius: float
+    best_cost: float
+
+
+def grid_search(transforms: FrameTransforms, offsets: ndarray, radii: Sequence[float], objective: Objective,
+                params: ContactParameters = ContactParameters(), max_elements: int = 2**20) -> PlacementSearch:
+    """
+    Evaluate every offset with every radius.
+    """
+
+    offsets = np.asarray(offsets, dtype=float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=float64).ravel()
+
+    all_offsets: ndarray = np.repeat(offsets, len(radii), axis=0)
+    all_radii: ndarray = np.tile(radii, len(offsets))
+    chunk: int = max(1, max_elements // max(len(transforms.time), 1))
+
+    cost: ndarray = np.empty(len(all_offsets), dtype=float64)
+    for start in range(0, len(all_offsets), chunk):
+        result: PlacementResult = evaluate_placements(transforms, all_offsets[start:start + chunk],
+                                                      all_radii[start:start + chunk], params, max_elements)
+        cost[start:start + chunk] = objective(result, transforms.time)
+
+    cost = cost.reshape(len(offsets), len(radii))
+    k, r = np.unravel_index(np.argmin(cost), cost.shape)
+
+    return PlacementSearch(offsets, radii, cost, offsets[k], float(radii[r]), float(cost[k, r]))
+
+
+def offset_grid(centre: ndarray, half_width: Union[float, ndarray], n: int) -> ndarray:
+    """
+    (n^3, 3) offsets on a regular grid of n points per axis around centre.
+    """
+
+    centre = np.asarray(centre, dtype=float64).reshape(3)
+    half_width = np.broadcast_to(np.asarray(half_width, dtype=float64), (3,))
+    axes = [np.linspace(centre[i] - half_width[i], centre[i] + half_width[i], n) for i in range(3)]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+def optimize_placement(transforms: FrameTransforms, objective: Objective, x0_offset: ndarray, x0_radius: float,
+                       params: ContactParameters = ContactParameters(),
+                       bounds: Optional[Sequence[Tuple[float, float]]] = None, method: str = "Nelder-Mead",
+                       **minimize_kwargs):
+    """
+    Local optimisation of (sphere_loc, sphere_r) with scipy.optimize.minimize. Every evaluation is array maths on the
+    cached transforms.
+
+    :param bounds: 4 (min, max) pairs for x, y, z and the radius.
+    :return: (best offset, best radius, scipy OptimizeResult).
+    """
+
+    from scipy.optimize import minimize
+
+    def cost(x: ndarray) -> float:
+        if x[3] <= 0:
+            return np.inf
+        result: PlacementResult = evaluate_placements(transforms, x[:3], x[3], params)
+        return float(objective(result, transforms.time)[0])
+
+    x0: ndarray = np.concatenate([np.asarray(x0_offset, dtype=float64).reshape(3), [x0_radius]])
+    res = minimize(cost, x0, method=method, bounds=bounds, **minimize_kwargs)
+
+    return res.x[:3], float(res.x[3]), res
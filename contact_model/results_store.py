@@ -0,0 +1,277 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+from numpy import ndarray, float64
+from utils.sto_reader import write_sto
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# columns and the shape of one frame
+COLUMNS: Dict[str, Tuple[int, ...]] = {
+    "time": (),
+    "force": (),
+    "penetration": (),
+    "penetration_rate": (),
+    "contact_point": (3,),  # in ground
+    "normal": (3,),         # in ground, from the cylinder at the sphere
+}
+
+
+class ResultsStore:
+    """
+    Columnar, append-only store of per-frame contact results for many trials: a directory with one folder per trial,
+    holding one compressed .npz per appended chunk (one array per column) and the trial metadata:
+
+        <store>/<trial>/000000.npz, 000001.npz, ...
+        <store>/<trial>/meta.json
+
+    Every file is written to a temporary file and moved into place, so a crash loses at most the chunk being written
+    and never what is already stored. Reading a trial only decompresses the requested columns.
+
+    A store must have a single writer at a time (readers can run alongside it): 2 processes appending to the same
+    trial would pick the same chunk number.
+    """
+
+    def __init__(self, directory: str, mode: str = "a", compress: bool = True):
+        """
+        :param directory: store directory. Created if it doesn't exist and mode is "a".
+        :param mode: "r" to read, "a" to read and append.
+        :param compress: deflate the chunks.
+        """
+
+        if mode not in ("r", "a"):
+            raise ValueError(f"mode must be 'r' or 'a', not {mode}")
+        if mode == "r" and not os.path.isdir(directory):
+            raise FileNotFoundError(f"no results store in {directory}")
+
+        self.directory: str = directory
+        self.mode: str = mode
+        self.compress: bool = compress
+        if mode == "a":
+            os.makedirs(directory, exist_ok=True)
+
+        # trial -> chunk files, in order
+        self._chunks: Dict[str, List[str]] = {}
+        for trial in sorted(os.listdir(directory)):
+            trial_dir: str = os.path.join(directory, trial)
+            if not os.path.isdir(trial_dir):
+                continue
+            chunks: List[str] = sorted(os.path.join(trial_dir, name) for name in os.listdir(trial_dir)
+                                       if name.endswith(".npz"))
+            if chunks:
+                self._chunks[trial] = chunks
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # every chunk is complete on disk as soon as append returns: nothing to flush
+        pass
+
+    def __contains__(self, trial: str) -> bool:
+        return trial in self._chunks
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def trials(self) -> List[str]:
+        return sorted(self._chunks)
+
+    def columns(self, trial: str) -> List[str]:
+        with np.load(self._chunks[trial][0]) as data:
+            return list(data.files)
+
+    def _write(self, file_path: str, write):
+        tmp_path: str = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, file_path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------------------------------------------------------
+    def append(self, trial: str, **columns: ndarray):
+        """
+        Append one chunk of frames to a trial. Every chunk of a trial must have the same columns, with the same
+        number of frames. Columns not in COLUMNS are allowed (any per-frame shape).
+        """
+
+        if self.mode == "r":
+            raise ValueError(f"{self.directory} was opened read-only")
+        if "/" in trial or os.sep in trial or trial.startswith("."):
+            raise ValueError(f"trial names can't contain '/' or start with '.': {trial}")
+
+        arrays: Dict[str, ndarray] = {name: np.asarray(value, dtype=float64) for name, value in columns.items()}
+        lengths = {len(a) for a in arrays.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"all the columns of a chunk must have the same number of frames, not {sorted(lengths)}")
+
+        for name, a in arrays.items():
+            if name in COLUMNS and a.shape[1:] != COLUMNS[name]:
+                raise ValueError(f"{name} must have shape (T, {', '.join(map(str, COLUMNS[name]))}). "
+                                 f"Current array has: {a.shape}")
+
+        existing: List[str] = self._chunks.get(trial, [])
+        if existing and set(self.columns(trial)) != set(arrays):
+            raise ValueError(f"trial {trial} has columns {sorted(self.columns(trial))}, the chunk has {sorted(arrays)}")
+
+        trial_dir: str = os.path.join(self.directory, trial)
+        os.makedirs(trial_dir, exist_ok=True)
+        chunk_file: str = os.path.join(trial_dir, f"{len(existing):06d}.npz")
+        save = np.savez_compressed if self.compress else np.savez
+        self._write(chunk_file, lambda f: save(f, **arrays))
+        self._chunks.setdefault(trial, []).append(chunk_file)
+
+    def append_kinematics(self, trial: str, time: ndarray, kin, force: ndarray,
+                          contact_point: Optional[ndarray] = None):
+        """
+        Append a chunk from ContactKinematics (or MeshContactKinematics, with contact_point=kin.mesh_edge) and the
+        matching forces. The contact point defaults to the cylinder edge.
+        """
+
+        self.append(trial, time=time, force=force, penetration=kin.penetration,
+                    penetration_rate=kin.penetration_rate,
+                    contact_point=kin.cylinder_edge if contact_point is None else contact_point, normal=kin.normal)
+
+    def set_metadata(self, trial: str, **metadata):
+        """
+        JSON-serialisable trial metadata (model, states file, contact parameters, ...). Can only be set once.
+        """
+
+        if self.mode == "r":
+            raise ValueError(f"{self.directory} was opened read-only")
+
+        file_path: str = os.path.join(self.directory, trial, "meta.json")
+        if os.path.exists(file_path):
+            raise ValueError(f"trial {trial} already has metadata")
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self._write(file_path, lambda f: f.write(json.dumps(metadata).encode()))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------------------------------------------------------
+    def metadata(self, trial: str) -> dict:
+        file_path: str = os.path.join(self.directory, trial, "meta.json")
+        if not os.path.exists(file_path):
+            return {}
+        with open(file_path) as f:
+            return json.load(f)
+
+    def read(self, trial: str, columns: Optional[Sequence[str]] = None) -> Dict[str, ndarray]:
+        """
+        Selected columns of a trial, with all its chunks concatenated. None reads every column.
+        """
+
+        if trial not in self._chunks:
+            raise KeyError(f"{self.directory} has no trial {trial}")
+
+        trial_columns: List[str] = self.columns(trial)
+        if columns is None:
+            columns = trial_columns
+
+        missing: List[str] = [name for name in columns if name not in trial_columns]
+        if missing:
+            raise KeyError(f"trial {trial} has no columns {missing}")
+
+        parts: Dict[str, List[ndarray]] = {name: [] for name in columns}
+        for chunk_file in self._chunks[trial]:
+            with np.load(chunk_file) as data:
+                for name in columns:
+                    parts[name].append(data[name])
+
+        return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+    def iter_trials(self, trials: Optional[Sequence[str]] = None,
+                    columns: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, Dict[str, ndarray]]]:
+        """
+        (trial, columns) pairs, one trial in memory at a time.
+        """
+
+        for trial in self.trials() if trials is None else trials:
+            yield trial, self.read(trial, columns)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# ExternalLoads export
+# ----------------------------------------------------------------------------------------------------------------------
+def external_loads_columns(name: str) -> List[str]:
+    return ["time"] + [f"{name}_{q}{axis}" for q in ("v", "p") for axis in "xyz"] + \
+           [f"{name}_torque_{axis}" for axis in "xyz"]
+
+
+def write_external_loads_xml(file_path: str, mot_file: str, name: str, applied_to_body: str):
+    """
+    ExternalLoads .xml with a single ExternalForce reading force and point (in ground) from mot_file.
+    """
+
+    document = ET.Element("OpenSimDocument", Version="40000")
+    loads = ET.SubElement(document, "ExternalLoads", name="externalloads")
+    objects = ET.SubElement(loads, "objects")
+    force = ET.SubElement(objects, "ExternalForce", name=name)
+
+    for tag, text in (("applied_to_body", applied_to_body), ("force_expressed_in_body", "ground"),
+                      ("point_expressed_in_body", "ground"), ("force_identifier", f"{name}_v"),
+                      ("point_identifier", f"{name}_p"), ("torque_identifier", f"{name}_torque_"),
+                      ("data_source_name", os.path.basename(mot_file))):
+        ET.SubElement(force, tag).text = text
+
+    ET.SubElement(loads, "groups")
+    ET.SubElement(loads, "datafile").text = os.path.basename(mot_file)
+
+    tree = ET.ElementTree(document)
+    ET.indent(tree, "\t")
+    tree.write(file_path, encoding="UTF-8", xml_declaration=True)
+
+
+def export_external_loads(store: ResultsStore, directory: str, trials: Optional[Sequence[str]] = None,
+                          on: str = "cylinder", applied_to_body: str = "punching_bag", name: str = "contact",
+                          rate: Optional[float] = None, suffix: str = "grf") -> List[str]:
+    """
+    Write the 3D contact force and its application point of every trial as an OpenSim ExternalLoads pair:
+    <trial><suffix>.mot and <trial><suffix>.xml (the ocp pipeline reads <trial id>grf.mot).
+
+    :param store: ResultsStore with time, force, contact_point and normal.
+    :param directory: output folder. Created if needed.
+    :param trials: trials to export. None exports all of them.
+    :param on: "cylinder" for the force the sphere applies on the cylinder (-force * normal), "sphere" for the
+               opposite.
+    :param applied_to_body: body the ExternalForce is applied to.
+    :param name: ExternalForce name, also the prefix of the .mot columns.
+    :param rate: resample on a uniform time grid at rate (Hz), e.g. 2000. None keeps the stored frames.
+    :return: paths of the .mot files.
+    """
+
+    if on not in ("cylinder", "sphere"):
+        raise ValueError(f"on must be 'cylinder' or 'sphere', not {on}")
+
+    os.makedirs(directory, exist_ok=True)
+    sign: float = -1.0 if on == "cylinder" else 1.0
+    columns: List[str] = external_loads_columns(name)
+    written: List[str] = []
+
+    for trial, data in store.iter_trials(trials, ["time", "force", "contact_point", "normal"]):
+        time: ndarray = data["time"]
+        force: ndarray = sign * data["force"][:, None] * data["normal"]
+        point: ndarray = data["contact_point"]
+
+        if rate is not None:
+            new_time: ndarray = time[0] + np.arange(int(np.floor((time[-1] - time[0]) * rate + 1e-9)) + 1) / rate
+            force = np.stack([np.interp(new_time, time, force[:, i]) for i in range(3)], axis=1)
+            point = np.stack([np.interp(new_time, time, point[:, i]) for i in range(3)], axis=1)
+            time = new_time
+
+        block: ndarray = np.zeros((len(time), len(columns)), dtype=float64)
+        block[:, 0] = time
+        block[:, 1:4] = force
+        block[:, 4:7] = point
+
+        mot_file: str = os.path.join(directory, f"{trial}{suffix}.mot")
+        write_sto(mot_file, block, columns, name=f"{trial}{suffix}")
+        write_external_loads_xml(os.path.join(directory, f"{trial}{suffix}.xml"), mot_file, name, applied_to_body)
+        written.append(mot_file)
+
+    return written
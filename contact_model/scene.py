@@ -0,0 +1,226 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from utils.geometry import compute_penetrations, compute_effective_radius
+from utils.vector_algebra import dot_products
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Tuple
+
+# type hint imports. opensim is only imported to sample states, so the broad and narrow phase work without it
+if TYPE_CHECKING:
+    from opensim import Model, State, Frame, Marker, Vec3
+
+
+class SceneSphere(NamedTuple):
+    name: str
+    body: str
+    offset: ndarray     # sphere centre in the body frame
+    radius: float
+
+
+class SceneCylinder(NamedTuple):
+    name: str
+    bottom_marker: str
+    top_marker: str
+    radius: float
+
+
+class SceneSamples(NamedTuple):
+    """
+    Per-frame positions and velocities of all the scene geometries, expressed in ground. Sphere fields have shape
+    (T, N, 3), cylinder fields (T, M, 3). *_origin, *_w and *_v are origin, angular velocity and origin velocity of the
+    base frame each geometry is fixed to; they are used for the velocity of the contact points.
+    """
+    sphere_centre: ndarray
+    sphere_origin: ndarray
+    sphere_w: ndarray
+    sphere_v: ndarray
+    cylinder_bottom: ndarray
+    cylinder_top: ndarray
+    cylinder_vel: ndarray   # velocity of the cylinder body centre of mass
+    cylinder_origin: ndarray
+    cylinder_w: ndarray
+    cylinder_v: ndarray
+
+
+class PairResult(NamedTuple):
+    frames: ndarray             # indices of the frames that went through the narrow phase
+    penetration: ndarray        # (T, ), 0 outside frames
+    penetration_rate: ndarray   # (T, ), 0 outside frames
+    force: ndarray              # (T, ), 0 outside frames
+    normal: ndarray             # (T, 3), 0 outside frames
+
+
+class SceneResult(NamedTuple):
+    pairs: Dict[Tuple[str, str], PairResult]
+    n_checks: int   # frames x spheres x cylinders
+    n_narrow: int   # of which went through the narrow phase
+
+
+def _mass_center(frame: "Frame") -> "Vec3":
+    """
+    Mass centre of the body a base frame belongs to, or its origin if the frame is not a body (ground).
+    """
+
+    from opensim import Body, Vec3
+
+    body: Body = Body.safeDownCast(frame)
+    return body.getMassCenter() if body is not None else Vec3(0, 0, 0)
+
+
+class ContactScene:
+    """
+    N contact spheres attached to arbitrary bodies against M cylinders defined by the markers at the centre of their
+    bottom and top surfaces.
+
+    Every frame goes through a cheap broad phase first: the axis-aligned bounding box of each sphere is tested against
+    the bounding box of each cylinder, and only the (frame, sphere, cylinder) triplets whose boxes overlap go through
+    the penetration and force kernels.
+    """
+
+    def __init__(self):
+        self.spheres: List[SceneSphere] = []
+        self.cylinders: List[SceneCylinder] = []
+
+    def add_sphere(self, name: str, body: str, offset: ndarray, radius: float) -> "ContactScene":
+        self.spheres.append(SceneSphere(name, body, np.asarray(offset, dtype=float64).reshape(3), radius))
+        return self
+
+    def add_cylinder(self, name: str, bottom_marker: str, top_marker: str, radius: float) -> "ContactScene":
+        self.cylinders.append(SceneCylinder(name, bottom_marker, top_marker, radius))
+        return self
+
+    @property
+    def sphere_radii(self) -> ndarray:
+        return np.array([sphere.radius for sphere in self.spheres], dtype=float64)
+
+    @property
+    def cylinder_radii(self) -> ndarray:
+        return np.array([cylinder.radius for cylinder in self.cylinders], dtype=float64)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # OpenSim sampling
+    # ------------------------------------------------------------------------------------------------------------------
+    def sample(self, model: "Model", states: Iterable["State"]) -> SceneSamples:
+        """
+        Read positions and velocities of all the geometries for a sequence of states (realized to velocity). Handles
+        are resolved once, before the loop over the states.
+        """
+
+        from opensim import Vec3
+
+        ground = model.getGround()
+
+        sphere_frames: List[Frame] = [model.getBodySet().get(sphere.body).findBaseFrame() for sphere in self.spheres]
+        sphere_offsets: List[Vec3] = [Vec3.createFromMat(sphere.offset) for sphere in self.spheres]
+
+        markers: List[Tuple[Marker, Marker]] = [(model.getMarkerSet().get(cylinder.bottom_marker),
+                                                 model.getMarkerSet().get(cylinder.top_marker))
+                                                for cylinder in self.cylinders]
+        # markers can be attached to offset frames or to ground: velocities are taken on their base frame
+        cylinder_frames: List[Frame] = [bottom.getParentFrame().findBaseFrame() for bottom, _ in markers]
+        cylinder_coms: List[Vec3] = [_mass_center(frame) for frame in cylinder_frames]
+
+        rows: List[ndarray] = []
+        for s in states:
+            row: ndarray = np.empty((4 * len(self.spheres) + 6 * len(self.cylinders), 3), dtype=float64)
+            r: int = 0
+
+            for frame, offset in zip(sphere_frames, sphere_offsets):
+                spatial_vel = frame.getVelocityInGround(s)
+                row[r] = frame.findStationLocationInGround(s, offset).to_numpy()
+                row[r + 1] = frame.getPositionInGround(s).to_numpy()
+                row[r + 2] = spatial_vel.get(0).to_numpy()
+                row[r + 3] = spatial_vel.get(1).to_numpy()
+                r += 4
+
+            for (bottom, top), frame, com in zip(markers, cylinder_frames, cylinder_coms):
+                spatial_vel = frame.getVelocityInGround(s)
+                row[r] = bottom.findLocationInFrame(s, ground).to_numpy()
+                row[r + 1] = top.findLocationInFrame(s, ground).to_numpy()
+                row[r + 2] = frame.findStationVelocityInGround(s, com).to_numpy()
+                row[r + 3] = frame.getPositionInGround(s).to_numpy()
+                row[r + 4] = spatial_vel.get(0).to_numpy()
+                row[r + 5] = spatial_vel.get(1).to_numpy()
+                r += 6
+
+            rows.append(row)
+
+        data: ndarray = np.stack(rows)
+        N: int = len(self.spheres)
+        spheres: ndarray = data[:, :4 * N].reshape(len(rows), N, 4, 3)
+        cylinders: ndarray = data[:, 4 * N:].reshape(len(rows), len(self.cylinders), 6, 3)
+
+        return SceneSamples(*(spheres[:, :, i] for i in range(4)), *(cylinders[:, :, i] for i in range(6)))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # Broad and narrow phase
+    # ------------------------------------------------------------------------------------------------------------------
+    def broad_phase(self, samples: SceneSamples, margin: float = 0.0) -> ndarray:
+        """
+        (T, N, M) mask of the (frame, sphere, cylinder) triplets whose axis-aligned bounding boxes, inflated by margin,
+        overlap.
+        """
+
+        r_s: ndarray = self.sphere_radii[None, :, None] + margin
+        sphere_lo: ndarray = samples.sphere_centre - r_s
+        sphere_hi: ndarray = samples.sphere_centre + r_s
+
+        r_c: ndarray = self.cylinder_radii[None, :, None]
+        cylinder_lo: ndarray = np.minimum(samples.cylinder_bottom, samples.cylinder_top) - r_c
+        cylinder_hi: ndarray = np.maximum(samples.cylinder_bottom, samples.cylinder_top) + r_c
+
+        overlap: ndarray = ((sphere_lo[:, :, None] <= cylinder_hi[:, None]) &
+                            (cylinder_lo[:, None] <= sphere_hi[:, :, None]))
+        return overlap.all(axis=-1)
+
+    def evaluate(self, samples: SceneSamples, k: float, c: float, bc: float = 50.0, cf: float = 1e-8,
+                 margin: float = 0.0) -> SceneResult:
+        """
+        Penetration, its rate and smooth Hunt-Crossley force for every sphere-cylinder pair that passes the broad phase
+        in at least one frame.
+
+        :param samples: output of sample (or the same arrays from any other source).
+        :param k: stiffness.
+        :param c: damping.
+        :param bc: smoothing factor.
+        :param cf: smoothing constant.
+        :param margin: inflation of the sphere bounding boxes in the broad phase.
+        :return: SceneResult with one PairResult per (sphere name, cylinder name) that can touch.
+        """
+
+        candidates: ndarray = self.broad_phase(samples, margin)
+        T, N, M = candidates.shape
+        t, i, j = np.nonzero(candidates)
+
+        r_s: ndarray = self.sphere_radii[i]
+        r_c: ndarray = self.cylinder_radii[j]
+
+        d, cylinder_edge, sphere_edge, n = compute_penetrations(samples.sphere_centre[t, i],
+                                                                samples.cylinder_bottom[t, j],
+                                                                samples.cylinder_top[t, j],
+                                                                samples.cylinder_vel[t, j], r_s, r_c)
+
+        # velocity of the 2 edge points as stations fixed to their frames: v = v_O + w x (p - p_O)
+        cylinder_edge_vel: ndarray = samples.cylinder_v[t, j] + np.cross(samples.cylinder_w[t, j],
+                                                                         cylinder_edge - samples.cylinder_origin[t, j])
+        sphere_edge_vel: ndarray = samples.sphere_v[t, i] + np.cross(samples.sphere_w[t, i],
+                                                                     sphere_edge - samples.sphere_origin[t, i])
+        rate: ndarray = dot_products(cylinder_edge_vel - sphere_edge_vel, n)
+
+        force: ndarray = smooth_hunt_crossley_batch(d, rate, compute_effective_radius(r_s, r_c), k, c, bc, cf)
+
+        pairs: Dict[Tuple[str, str], PairResult] = {}
+        pair_id: ndarray = i * M + j
+        for p in np.unique(pair_id):
+            rows: ndarray = np.flatnonzero(pair_id == p)
+            frames: ndarray = t[rows]
+
+            result: PairResult = PairResult(frames, np.zeros(T), np.zeros(T), np.zeros(T), np.zeros((T, 3)))
+            result.penetration[frames] = d[rows]
+            result.penetration_rate[frames] = rate[rows]
+            result.force[frames] = force[rows]
+            result.normal[frames] = n[rows]
+
+            pairs[(self.spheres[p // M].name, self.cylinders[p % M].name)] = result
+
+        return SceneResult(pairs, T * N * M, len(t))
@@ -0,0 +1,109 @@
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.body_kinematics import BodyTrajectory, load_body_trajectory, station_positions
+from contact_model.model_metadata import model_metadata, ModelMetadata
+from contact_model.parameters import ContactParameters
+from utils.sto_reader import read_sto_columns
+from utils.vector_algebra import dot_products
+from typing import List, NamedTuple, Tuple
+
+# Screens the frames where sphere-to-cylinder contact is possible from the BodyKinematics positions and the static model
+# data, so that the OpenSim path only runs near impacts (batch_runner.run_screened_trial). Without orientations the
+# sphere centre is within |sphere_loc - mass centre| of its body centre of mass, and the cylinder axis within the
+# farthest end marker of the cylinder centre of mass, which bounds the gap from below whatever the orientations are.
+# use_orientation uses the body rotations too, and gives the exact gap to the finite cylinder axis.
+
+
+class ScreeningReport(NamedTuple):
+    n_frames: int
+    n_candidates: int                   # frames inside the windows
+    windows: List[Tuple[int, int]]      # [start, stop) frame ranges
+
+    @property
+    def n_skipped(self) -> int:
+        return self.n_frames - self.n_candidates
+
+    @property
+    def skipped_fraction(self) -> float:
+        return self.n_skipped / self.n_frames if self.n_frames else 0.0
+
+    def __str__(self) -> str:
+        windows: str = ", ".join(f"{start}-{stop - 1}" for start, stop in self.windows) or "none"
+        return (f"{self.n_skipped} of {self.n_frames} frames skipped ({100 * self.skipped_fraction:.1f}%), "
+                f"contact windows: {windows}")
+
+
+def gap_lower_bounds(pos_file: str, model_file: str, params: ContactParameters = ContactParameters(),
+                     sphere_body: str = "rclavicle", cylinder_body: str = "punching_bag",
+                     cylinder_top: str = "cylinder_top", cylinder_bottom: str = "cylinder_bottom",
+                     use_orientation: bool = False) -> ndarray:
+    """
+    (T, ) lower bounds of the distance between the sphere and the cylinder surfaces (negative when they may overlap).
+    """
+
+    metadata: ModelMetadata = model_metadata(model_file)
+    bodies = metadata.bodies()
+    markers = metadata.markers()
+
+    sphere_mass_center: ndarray = bodies[sphere_body].mass_center
+    cylinder_mass_center: ndarray = bodies[cylinder_body].mass_center
+    sphere_loc: ndarray = np.asarray(params.sphere_loc, dtype=float64).reshape(3)
+    top: ndarray = markers[cylinder_top].location
+    bottom: ndarray = markers[cylinder_bottom].location
+    contact_distance: float = params.sphere_r + params.cylinder_r
+
+    if not use_orientation:
+        columns: List[str] = [f"{body}_{axis}" for body in (sphere_body, cylinder_body) for axis in "XYZ"]
+        com, _ = read_sto_columns(pos_file, columns)
+
+        sphere_offset: float = float(np.linalg.norm(sphere_loc - sphere_mass_center))
+        axis_offset: float = float(max(np.linalg.norm(top - cylinder_mass_center),
+                                       np.linalg.norm(bottom - cylinder_mass_center)))
+
+        return np.linalg.norm(com[:, :3] - com[:, 3:], axis=1) - sphere_offset - axis_offset - contact_distance
+
+    sphere: BodyTrajectory = load_body_trajectory(pos_file, None, sphere_body)
+    cylinder: BodyTrajectory = load_body_trajectory(pos_file, None, cylinder_body)
+
+    centre: ndarray = station_positions(sphere, sphere_mass_center, sphere_loc)
+    p0: ndarray = station_positions(cylinder, cylinder_mass_center, bottom)
+    p1: ndarray = station_positions(cylinder, cylinder_mass_center, top)
+
+    axis: ndarray = p1 - p0
+    u: ndarray = np.clip(dot_products(centre - p0, axis) / dot_products(axis, axis), 0.0, 1.0)
+    return np.linalg.norm(centre - (p0 + u[:, None] * axis), axis=1) - contact_distance
+
+
+def contact_windows(candidates: ndarray, pad: int = 2) -> List[Tuple[int, int]]:
+    """
+    [start, stop) ranges of the True runs of candidates, each grown by pad frames on both sides and merged when they
+    touch.
+    """
+
+    candidates = np.asarray(candidates, dtype=bool)
+    if pad > 0 and candidates.any():
+        # dilation: a frame is in a window if any frame within pad of it is a candidate
+        counts: ndarray = np.convolve(candidates.astype(np.int64), np.ones(2 * pad + 1, dtype=np.int64), mode="same")
+        candidates = counts > 0
+
+    edges: ndarray = np.diff(np.concatenate([[0], candidates.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def screen_trial(pos_file: str, model_file: str, params: ContactParameters = ContactParameters(),
+                 margin: float = 0.05, pad: int = 2, use_orientation: bool = False,
+                 **bodies) -> Tuple[ndarray, ScreeningReport]:
+    """
+    :param margin: frames whose gap bound is below margin (m) are candidates.
+    :param pad: frames added before and after each run of candidates.
+    :param bodies: sphere_body, cylinder_body, cylinder_top, cylinder_bottom (see gap_lower_bounds).
+    :return: (n_candidates, ) frame indices inside the windows, and the ScreeningReport.
+    """
+
+    bounds: ndarray = gap_lower_bounds(pos_file, model_file, params, use_orientation=use_orientation, **bodies)
+    windows: List[Tuple[int, int]] = contact_windows(bounds < margin, pad)
+
+    indices: ndarray = np.concatenate([np.arange(start, stop) for start, stop in windows]) if windows \
+        else np.empty(0, dtype=np.int64)
+
+    return indices, ScreeningReport(len(bounds), len(indices), windows)
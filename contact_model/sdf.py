@@ -0,0 +1,320 @@
+import os
+import numpy as np
+from numpy import ndarray, float64, int64
+from contact_model.body_kinematics import BodyTrajectory, load_body_trajectory, station_positions, point_velocities
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.kinematics_cache import file_hash
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_effective_radius
+from utils.meshes import load_mesh
+from utils.osim_xml import read_bodies, read_meshes, BodyInfo, MeshInfo
+from utils.vector_algebra import dot_products, unit_vectors
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+# The exact distance to the mesh is baked once on a grid in the mesh body frame, then penetration = sphere_r - sdf(centre)
+# and normal = grad sdf / |grad sdf| are interpolated for any number of centres. The normal points from the mesh at the
+# sphere, as the cylinder one. The inside is given by the winding number, so meshes only need to be closed.
+SDF_VERSION: int = 1
+
+
+def closest_points_on_triangles(points: ndarray, a: ndarray, b: ndarray, c: ndarray) -> ndarray:
+    """
+    Closest points to every point on every triangle (Ericson, Real-Time Collision Detection 5.1.5), with the Voronoi
+    regions selected by masks. points (P, 3), triangle corners (F, 3) -> (P, F, 3).
+    """
+
+    p: ndarray = points[:, None, :]
+    ab: ndarray = b - a
+    ac: ndarray = c - a
+
+    ap: ndarray = p - a
+    d1: ndarray = dot_products(ab, ap)
+    d2: ndarray = dot_products(ac, ap)
+    bp: ndarray = p - b
+    d3: ndarray = dot_products(ab, bp)
+    d4: ndarray = dot_products(ac, bp)
+    cp: ndarray = p - c
+    d5: ndarray = dot_products(ab, cp)
+    d6: ndarray = dot_products(ac, cp)
+
+    va: ndarray = d3 * d6 - d5 * d4
+    vb: ndarray = d5 * d2 - d1 * d6
+    vc: ndarray = d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w_bc: ndarray = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        denominator: ndarray = va + vb + vc
+        # barycentric coordinates (v, w) of the closest point: a + v * ab + w * ac, region by region
+        conditions = [(d1 <= 0) & (d2 <= 0),                            # vertex a
+                      (d3 >= 0) & (d4 <= d3),                           # vertex b
+                      (vc <= 0) & (d1 >= 0) & (d3 <= 0),                # edge ab
+                      (d6 >= 0) & (d5 <= d6),                           # vertex c
+                      (vb <= 0) & (d2 >= 0) & (d6 <= 0),                # edge ac
+                      (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)]      # edge bc
+        v: ndarray = np.select(conditions, [0.0, 1.0, d1 / (d1 - d3), 0.0, 0.0, 1.0 - w_bc], vb / denominator)
+        w: ndarray = np.select(conditions, [0.0, 0.0, 0.0, 1.0, d2 / (d2 - d6), w_bc], vc / denominator)
+
+    return a + v[..., None] * ab + w[..., None] * ac
+
+
+def winding_numbers(points: ndarray, a: ndarray, b: ndarray, c: ndarray) -> ndarray:
+    """
+    Generalised winding numbers of a triangle soup at points (P, 3): sum of the solid angles of the triangles (Van
+    Oosterom and Strackee) / 4 pi. +-1 inside a closed mesh (the sign depends on the orientation), 0 outside.
+    """
+
+    ra: ndarray = a - points[:, None, :]
+    rb: ndarray = b - points[:, None, :]
+    rc: ndarray = c - points[:, None, :]
+    la: ndarray = np.linalg.norm(ra, axis=-1)
+    lb: ndarray = np.linalg.norm(rb, axis=-1)
+    lc: ndarray = np.linalg.norm(rc, axis=-1)
+
+    numerator: ndarray = dot_products(ra, np.cross(rb, rc))
+    denominator: ndarray = (la * lb * lc + dot_products(ra, rb) * lc + dot_products(ra, rc) * lb
+                            + dot_products(rb, rc) * la)
+
+    return 2 * np.arctan2(numerator, denominator).sum(axis=1) / (4 * np.pi)
+
+
+def mesh_signed_distances(points: ndarray, vertices: ndarray, faces: ndarray,
+                          max_elements: int = 2**22) -> Tuple[ndarray, ndarray]:
+    """
+    Exact signed distances from points (P, 3) to a closed triangle mesh, and the unit gradients of the distance
+    (directions from the closest surface points, flipped inside). Points are processed in chunks of at most
+    max_elements point-triangle pairs.
+
+    :return: (P, ) distances (negative inside) and (P, 3) gradients.
+    """
+
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    chunk: int = max(1, max_elements // len(faces))
+
+    distance: ndarray = np.empty(len(points), dtype=float64)
+    gradient: ndarray = np.empty((len(points), 3), dtype=float64)
+
+    for start in range(0, len(points), chunk):
+        p: ndarray = points[start:start + chunk]
+        closest: ndarray = closest_points_on_triangles(p, a, b, c)
+        d2: ndarray = np.einsum("pfi,pfi->pf", p[:, None, :] - closest, p[:, None, :] - closest)
+        nearest: ndarray = np.argmin(d2, axis=1)
+
+        offset: ndarray = p - closest[np.arange(len(p)), nearest]
+        sign: ndarray = np.where(np.abs(winding_numbers(p, a, b, c)) > 0.5, -1.0, 1.0)
+
+        distance[start:start + chunk] = sign * np.linalg.norm(offset, axis=1)
+        gradient[start:start + chunk] = sign[:, None] * unit_vectors(offset)
+
+    return distance, gradient
+
+
+class SignedDistanceField:
+    """
+    Signed distance (and its gradient) on a regular grid in the body frame of a mesh. Grid node (i, j, k) is at
+    origin + (i, j, k) * spacing.
+    """
+
+    def __init__(self, origin: ndarray, spacing: ndarray, field: ndarray):
+        """
+        :param origin: (3, ) position of node (0, 0, 0) in the body frame.
+        :param spacing: (3, ) node spacing.
+        :param field: (nx, ny, nz, 4) distance and gradient (x, y, z) at the nodes.
+        """
+
+        self.origin: ndarray = np.asarray(origin, dtype=float64)
+        self.spacing: ndarray = np.asarray(spacing, dtype=float64)
+        self.field: ndarray = np.ascontiguousarray(field, dtype=float64)
+        self.shape: Tuple[int, int, int] = self.field.shape[:3]
+
+        nx, ny, nz = self.shape
+        self._flat: ndarray = self.field.reshape(-1, 4)
+        self._corners: ndarray = np.array([(i * ny + j) * nz + k for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+
+    @property
+    def distance(self) -> ndarray:
+        return self.field[..., 0]
+
+    @property
+    def gradient(self) -> ndarray:
+        return self.field[..., 1:]
+
+    @classmethod
+    def bake(cls, vertices: ndarray, faces: ndarray, spacing: Optional[float] = None, padding: float = 0.05,
+             resolution: int = 64, max_elements: int = 2**22) -> "SignedDistanceField":
+        """
+        :param vertices: (V, 3) mesh vertices in the body frame.
+        :param faces: (F, 3) triangles.
+        :param spacing: grid spacing. None gives resolution nodes along the longest side of the grid.
+        :param padding: distance the grid extends around the mesh bounding box. Should be at least the radius of the
+                        spheres, so that contacts starting anywhere on the surface are seen.
+        """
+
+        vertices = np.asarray(vertices, dtype=float64)
+        faces = np.asarray(faces, dtype=int64)
+        lower: ndarray = vertices.min(axis=0) - padding
+        upper: ndarray = vertices.max(axis=0) + padding
+
+        if spacing is None:
+            spacing = (upper - lower).max() / (resolution - 1)
+        shape: ndarray = np.ceil((upper - lower) / spacing).astype(int64) + 1
+
+        axes = [lower[i] + spacing * np.arange(shape[i]) for i in range(3)]
+        nodes: ndarray = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+        distance, gradient = mesh_signed_distances(nodes, vertices, faces, max_elements)
+
+        field: ndarray = np.empty((*shape, 4), dtype=float64)
+        field[..., 0] = distance.reshape(shape)
+        field[..., 1:] = gradient.reshape((*shape, 3))
+
+        # nodes on the surface have no direction to the closest point: use the finite-difference gradient there
+        on_surface: ndarray = np.abs(field[..., 0]) < 1e-12
+        if on_surface.any():
+            fd: ndarray = np.stack(np.gradient(field[..., 0], spacing), axis=-1)
+            field[on_surface, 1:] = fd[on_surface]
+
+        return cls(lower, np.full(3, spacing), field)
+
+    @classmethod
+    def from_mesh_file(cls, mesh_file: str, scale_factors: Sequence[float] = (1.0, 1.0, 1.0),
+                       **kwargs) -> "SignedDistanceField":
+        vertices, faces = load_mesh(mesh_file)
+        return cls.bake(vertices * np.asarray(scale_factors, dtype=float64), faces, **kwargs)
+
+    def save(self, file_path: str):
+        tmp_path: str = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=SDF_VERSION, origin=self.origin, spacing=self.spacing, field=self.field)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> "SignedDistanceField":
+        with np.load(file_path) as data:
+            if int(data["version"]) != SDF_VERSION:
+                raise ValueError(f"{file_path} was baked with SDF version {int(data['version'])}, "
+                                 f"current version is {SDF_VERSION}")
+            return cls(data["origin"], data["spacing"], data["field"])
+
+    def lookup(self, points: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Trilinear interpolation at points (N, 3) in the body frame. Outside the grid, the distance is extended with
+        the distance from the grid box, which over-estimates it: the grid padding should cover the contact region.
+
+        :return: (N, ) signed distances and (N, 3) (non-normalised) gradients.
+        """
+
+        u: ndarray = (points - self.origin) / self.spacing
+        upper: ndarray = np.array(self.shape, dtype=float64) - 1
+        u_clamped: ndarray = np.clip(u, 0.0, upper)
+
+        i: ndarray = np.minimum(u_clamped.astype(int64), upper.astype(int64) - 1)
+        f: ndarray = u_clamped - i
+
+        nx, ny, nz = self.shape
+        base: ndarray = (i[:, 0] * ny + i[:, 1]) * nz + i[:, 2]
+        values: ndarray = self._flat[base[:, None] + self._corners]    # (N, 8, 4), corners ordered as i, j, k bits
+
+        fx, fy, fz = f[:, 0, None], f[:, 1, None], f[:, 2, None]
+        c00: ndarray = values[:, 0] * (1 - fz) + values[:, 1] * fz
+        c01: ndarray = values[:, 2] * (1 - fz) + values[:, 3] * fz
+        c10: ndarray = values[:, 4] * (1 - fz) + values[:, 5] * fz
+        c11: ndarray = values[:, 6] * (1 - fz) + values[:, 7] * fz
+        result: ndarray = (c00 * (1 - fy) + c01 * fy) * (1 - fx) + (c10 * (1 - fy) + c11 * fy) * fx
+
+        outside: ndarray = np.linalg.norm((u - u_clamped) * self.spacing, axis=1)
+        return result[:, 0] + outside, result[:, 1:]
+
+    def penetrations(self, sphere_centres: ndarray, sphere_r) -> Tuple[ndarray, ndarray]:
+        """
+        :param sphere_centres: (N, 3) sphere centres in the body frame.
+        :return: (N, ) penetrations (positive in contact) and (N, 3) unit normals in the body frame.
+        """
+
+        distance, gradient = self.lookup(sphere_centres)
+        return sphere_r - distance, unit_vectors(gradient)
+
+
+class MeshContactKinematics(NamedTuple):
+    """
+    Per-frame sphere-to-mesh contact, expressed in ground. Same meaning as the ContactKinematics fields of the same name.
+    """
+    sphere_centre: ndarray
+    mesh_edge: ndarray
+    sphere_edge: ndarray
+    normal: ndarray
+    penetration: ndarray
+    penetration_rate: ndarray
+
+
+class MeshContact:
+    """
+    Contact of a sphere fixed to one body with the mesh of another body, from BodyTrajectory data (see
+    contact_model.body_kinematics). The effective radius of the force model is built from sphere_r and surface_r, the
+    radius of curvature of the mesh in the contact region (cylinder_r of the parameters by default).
+    """
+
+    def __init__(self, sdf: SignedDistanceField, mesh_mass_center: ndarray, sphere_mass_center: ndarray,
+                 params: ContactParameters = ContactParameters(), surface_r: Optional[float] = None):
+        self.sdf: SignedDistanceField = sdf
+        self.mesh_mass_center: ndarray = np.asarray(mesh_mass_center, dtype=float64)
+        self.sphere_mass_center: ndarray = np.asarray(sphere_mass_center, dtype=float64)
+        self.params: ContactParameters = params
+        self.sphere_loc: ndarray = np.asarray(params.sphere_loc, dtype=float64).reshape(3)
+        self.R: float = compute_effective_radius(params.sphere_r, params.cylinder_r if surface_r is None else surface_r)
+
+    @classmethod
+    def from_model(cls, model_file: str, mesh_name: str, sphere_body: str = "rclavicle",
+                   params: ContactParameters = ContactParameters(), surface_r: Optional[float] = None,
+                   geometry_dirs: Sequence[str] = (), sdf_dir: Optional[str] = None, **bake_kwargs) -> "MeshContact":
+        """
+        Contact with the mesh geometry mesh_name of the .osim. The mesh file is looked for in geometry_dirs, then next
+        to the model and in its Geometry folder. The baked field is stored in sdf_dir (the model folder by default),
+        keyed by the mesh contents, scale factors and bake options, and reused on the next runs.
+        """
+
+        meshes: Dict[str, MeshInfo] = read_meshes(model_file)
+        bodies: Dict[str, BodyInfo] = read_bodies(model_file)
+        mesh: MeshInfo = meshes[mesh_name]
+
+        model_dir: str = os.path.dirname(os.path.abspath(model_file))
+        candidates = [os.path.join(d, mesh.mesh_file) for d in (*geometry_dirs, model_dir,
+                                                                 os.path.join(model_dir, "Geometry"))]
+        mesh_file: Optional[str] = next((p for p in candidates if os.path.exists(p)), None)
+        if mesh_file is None:
+            raise FileNotFoundError(f"mesh file {mesh.mesh_file} not found. Looked in: {', '.join(candidates)}")
+
+        options: str = "-".join(f"{k}={bake_kwargs[k]}" for k in sorted(bake_kwargs))
+        tag: str = f"{file_hash(mesh_file)[:16]}-{'_'.join(f'{s:g}' for s in mesh.scale_factors)}-{options}"
+        sdf_file: str = os.path.join(model_dir if sdf_dir is None else sdf_dir, f"{mesh.mesh_file}.{tag}.sdf.npz")
+
+        if os.path.exists(sdf_file):
+            sdf: SignedDistanceField = SignedDistanceField.load(sdf_file)
+        else:
+            sdf = SignedDistanceField.from_mesh_file(mesh_file, mesh.scale_factors, **bake_kwargs)
+            sdf.save(sdf_file)
+
+        return cls(sdf, bodies[mesh.body].mass_center, bodies[sphere_body].mass_center, params, surface_r)
+
+    def evaluate_trajectories(self, sphere: BodyTrajectory, mesh_body: BodyTrajectory) -> MeshContactKinematics:
+        sphere_centre: ndarray = station_positions(sphere, self.sphere_mass_center, self.sphere_loc)
+
+        # ground -> mesh body frame: p_local = R^T (p - com) + mass_center
+        local: ndarray = np.einsum("tji,tj->ti", mesh_body.R, sphere_centre - mesh_body.com) + self.mesh_mass_center
+        d, normal_local = self.sdf.penetrations(local, self.params.sphere_r)
+        distance: ndarray = self.params.sphere_r - d
+
+        n: ndarray = np.einsum("tij,tj->ti", mesh_body.R, normal_local)
+        mesh_edge: ndarray = sphere_centre - distance[:, None] * n
+        sphere_edge: ndarray = sphere_centre - self.params.sphere_r * n
+
+        vel: ndarray = point_velocities(mesh_body, mesh_edge) - point_velocities(sphere, sphere_edge)
+        return MeshContactKinematics(sphere_centre, mesh_edge, sphere_edge, n, d, dot_products(vel, n))
+
+    def evaluate(self, pos_file: str, vel_file: Optional[str], sphere_body: str = "rclavicle",
+                 mesh_body: str = "punching_bag") -> MeshContactKinematics:
+        return self.evaluate_trajectories(load_body_trajectory(pos_file, vel_file, sphere_body),
+                                          load_body_trajectory(pos_file, vel_file, mesh_body))
+
+    def forces(self, kin: MeshContactKinematics, out: Optional[ndarray] = None) -> ndarray:
+        p: ContactParameters = self.params
+        return smooth_hunt_crossley_batch(kin.penetration, kin.penetration_rate, self.R, p.k, p.c, p.bc, p.cf, out=out)
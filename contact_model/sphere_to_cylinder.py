@@ -1,10 +1,15 @@
-from utils.vector_algebra import unit_vector, dot_product
-from utils.geometry import find_point_projection_along_a_line, get_distance_between_edges
+from numpy import asarray, empty, cross, float64
+from utils.vector_algebra import unit_vector, dot_product, dot_products
+from utils.geometry import find_point_projection_along_a_line, get_distance_between_edges, compute_penetrations
+from contact_model.instrumentation import instrumented, stage
+from contact_model.kinematics import ContactKinematics
+from typing import Iterable, Optional
 
 # type hint imports
 from numpy import ndarray
 from opensim import Model, State, Body, Frame, Marker, Vec3, Ground
 
+@instrumented("compute_x_and_x_dot")
 def compute_x_and_x_dot(model: Model, sphere_loc: ndarray, cylinder_vel: ndarray, clavicle: Body, sphere_r: float,
                         cylinder_r: float, s: State):
 
@@ -25,48 +30,52 @@ def compute_x_and_x_dot(model: Model, sphere_loc: ndarray, cylinder_vel: ndarray
     ground: Ground = model.getGround()
 
     # convert sphere location to Vec3 object
-    sphere_loc_vec3: Vec3 = Vec3.createFromMat(sphere_loc.squeeze(-1))
+    with stage("convert.vec3"):
+        sphere_loc_vec3: Vec3 = Vec3.createFromMat(sphere_loc.squeeze(-1))
 
-    # get clavicle Base Frame
-    clavicleFrame: Frame = clavicle.findBaseFrame()
+    with stage("opensim.positions"):
+        # get clavicle Base Frame
+        clavicleFrame: Frame = clavicle.findBaseFrame()
 
-    # find sphere CoM in global reference frame
-    sphere_com: Vec3 = clavicleFrame.findStationLocationInGround(s, sphere_loc_vec3)
+        # find sphere CoM in global reference frame
+        sphere_com: Vec3 = clavicleFrame.findStationLocationInGround(s, sphere_loc_vec3)
 
-    # get cylinder frame
-    cylinderBody: Body = model.getBodySet().get("punching_bag")
-    cylinderFrame: Frame = cylinderBody.findBaseFrame()
+        # get cylinder frame
+        cylinderBody: Body = model.getBodySet().get("punching_bag")
+        cylinderFrame: Frame = cylinderBody.findBaseFrame()
 
-    # ------------------------------------------------------------------------------------------------------------------
-    # compute the position of the centre of the top and bottom surfaces of the cylinder
-    # ------------------------------------------------------------------------------------------------------------------
-    # find top centre
-    cylinder_top_marker: Marker = model.getMarkerSet().get("cylinder_top")
-    cylinder_top: Vec3 = cylinder_top_marker.findLocationInFrame(s, model.getGround())
-
-    # find bottom centre
-    cylinder_bottom_marker: Marker = model.getMarkerSet().get("cylinder_bottom")
-    cylinder_bottom: Vec3 = cylinder_bottom_marker.findLocationInFrame(s, model.getGround())
+        # --------------------------------------------------------------------------------------------------------------
+        # compute the position of the centre of the top and bottom surfaces of the cylinder
+        # --------------------------------------------------------------------------------------------------------------
+        # find top centre
+        cylinder_top_marker: Marker = model.getMarkerSet().get("cylinder_top")
+        cylinder_top: Vec3 = cylinder_top_marker.findLocationInFrame(s, model.getGround())
 
+        # find bottom centre
+        cylinder_bottom_marker: Marker = model.getMarkerSet().get("cylinder_bottom")
+        cylinder_bottom: Vec3 = cylinder_bottom_marker.findLocationInFrame(s, model.getGround())
 
-    # find projection of the sphere CoM onto the cylinder longitudinal axis --> this will be a relative position vector,
-    # expressed with respect to the bottom surface center of the cylinder.
-    Q_relative: ndarray = find_point_projection_along_a_line(sphere_com.to_numpy()[:, None],
-                                                          cylinder_bottom.to_numpy()[:, None],
-                                                          cylinder_top.to_numpy()[:, None])
+    with stage("convert.vec3"):
+        sphere_com_arr: ndarray = sphere_com.to_numpy()[:, None]
+        cylinder_top_arr: ndarray = cylinder_top.to_numpy()[:, None]
+        cylinder_bottom_arr: ndarray = cylinder_bottom.to_numpy()[:, None]
 
-    # Now we add the cylinder bottom center vector to express Q in the Global reference frame.
-    Q_global: ndarray = Q_relative + cylinder_bottom.to_numpy()[:, None]
+    with stage("geometry.penetration"):
+        # find projection of the sphere CoM onto the cylinder longitudinal axis --> this will be a relative position
+        # vector, expressed with respect to the bottom surface center of the cylinder.
+        Q_relative: ndarray = find_point_projection_along_a_line(sphere_com_arr, cylinder_bottom_arr, cylinder_top_arr)
 
-    # compute directional vector of cylinder velocity
-    cylinder_motion_direction: ndarray = unit_vector(cylinder_vel)
+        # Now we add the cylinder bottom center vector to express Q in the Global reference frame.
+        Q_global: ndarray = Q_relative + cylinder_bottom_arr
 
+        # compute directional vector of cylinder velocity
+        cylinder_motion_direction: ndarray = unit_vector(cylinder_vel)
 
-    # key function: here we compute the indentation between the 2 surfaces. This quantity is a scalar that consists of
-    # the 3D relative position vector between the 2 surface edges, projected onto the directional vector that points from
-    # the center of the sphere to Q. This directional vector is outputted as "n".
-    d, cylinder_edge, sphere_edge, n = get_distance_between_edges(Q_global, sphere_com.to_numpy()[:, None],
-                                                               sphere_r, cylinder_r, cylinder_motion_direction)
+        # key function: here we compute the indentation between the 2 surfaces. This quantity is a scalar that consists
+        # of the 3D relative position vector between the 2 surface edges, projected onto the directional vector that
+        # points from the center of the sphere to Q. This directional vector is outputted as "n".
+        d, cylinder_edge, sphere_edge, n = get_distance_between_edges(Q_global, sphere_com_arr, sphere_r, cylinder_r,
+                                                                      cylinder_motion_direction)
 
     # ------------------------------------------------------------------------------------------------------------------
     # Compute rate of change over time of indentation as the relative velocity of the 2 edge points
@@ -75,28 +84,163 @@ def compute_x_and_x_dot(model: Model, sphere_loc: ndarray, cylinder_vel: ndarray
     # Vec3 accepts only 1D arrays, meaning that we need to check whether the numpy arrays are shape: (3, 1) --> 2D. If
     # they're, we need to squeeze the 2nd dimension.
 
-    if cylinder_edge.ndim > 1:
-        cylinder_edge = cylinder_edge.squeeze(-1)
+    with stage("convert.vec3"):
+        if cylinder_edge.ndim > 1:
+            cylinder_edge = cylinder_edge.squeeze(-1)
 
-    if sphere_edge.ndim > 1:
-        sphere_edge = sphere_edge.squeeze(-1)
+        if sphere_edge.ndim > 1:
+            sphere_edge = sphere_edge.squeeze(-1)
 
-    # global vector
-    cylinderEdge_loc: Vec3 = Vec3.createFromMat(cylinder_edge)
-    sphereEdge_loc: Vec3 = Vec3.createFromMat(sphere_edge)
+        # global vector
+        cylinderEdge_loc: Vec3 = Vec3.createFromMat(cylinder_edge)
+        sphereEdge_loc: Vec3 = Vec3.createFromMat(sphere_edge)
 
-    # local vectors: express the point on the edges in their respective reference frame.
-    cylinderEdge_station: Vec3 = ground.findStationLocationInAnotherFrame(s, cylinderEdge_loc, cylinderFrame)
-    sphereEdge_station: Vec3 = ground.findStationLocationInAnotherFrame(s, sphereEdge_loc, clavicleFrame)
+    with stage("opensim.velocities"):
+        # local vectors: express the point on the edges in their respective reference frame.
+        cylinderEdge_station: Vec3 = ground.findStationLocationInAnotherFrame(s, cylinderEdge_loc, cylinderFrame)
+        sphereEdge_station: Vec3 = ground.findStationLocationInAnotherFrame(s, sphereEdge_loc, clavicleFrame)
 
-    # find velocity of these 2 points in ground
-    cylinderEdge_vel: Vec3 = cylinderFrame.findStationVelocityInGround(s, cylinderEdge_station)
-    spheredEdge_vel: Vec3 = clavicleFrame.findStationVelocityInGround(s, sphereEdge_station)
+        # find velocity of these 2 points in ground
+        cylinderEdge_vel: Vec3 = cylinderFrame.findStationVelocityInGround(s, cylinderEdge_station)
+        spheredEdge_vel: Vec3 = clavicleFrame.findStationVelocityInGround(s, sphereEdge_station)
 
     # compute relative vel
-    vel: ndarray = cylinderEdge_vel.to_numpy() - spheredEdge_vel.to_numpy()
+    with stage("convert.vec3"):
+        vel: ndarray = cylinderEdge_vel.to_numpy() - spheredEdge_vel.to_numpy()
 
     # project vel onto normal unit vector
-    vel_scalar: float = float(dot_product(vel, n))
+    with stage("geometry.rate"):
+        vel_scalar: float = float(dot_product(vel, n))
 
     return d, vel_scalar
+
+
+class ContactPair:
+    """
+    Sphere-to-cylinder contact pair bound to one model. All the name lookups (bodies, base frames, markers) and the
+    conversion of the sphere location to Vec3 are done once here, instead of at every call of compute_x_and_x_dot.
+
+    evaluate_many only reads positions and frame velocities from OpenSim: the geometry and the edge velocities are
+    then computed for the whole trajectory at once with the batched kernels in utils.geometry.
+    """
+
+    def __init__(self, model: Model, sphere_loc: ndarray, sphere_r: float, cylinder_r: float,
+                 sphere_body: str = "rclavicle", cylinder_body: str = "punching_bag",
+                 cylinder_top: str = "cylinder_top", cylinder_bottom: str = "cylinder_bottom"):
+        """
+        :param model: OpenSim Model object.
+        :param sphere_loc: location of the sphere origin in its parent Body reference frame. Shape (3, ) or (3, 1).
+        :param sphere_r: radius of the sphere.
+        :param cylinder_r: radius of the cylinder.
+        :param sphere_body: name of the body the sphere is attached to.
+        :param cylinder_body: name of the cylinder body.
+        :param cylinder_top: name of the marker at the centre of the top surface of the cylinder.
+        :param cylinder_bottom: name of the marker at the centre of the bottom surface of the cylinder.
+        """
+
+        self.model: Model = model
+        self.sphere_r: float = sphere_r
+        self.cylinder_r: float = cylinder_r
+
+        self.ground: Ground = model.getGround()
+
+        self.sphere_loc: ndarray = asarray(sphere_loc, dtype=float64).reshape(3)
+        self.sphere_loc_vec3: Vec3 = Vec3.createFromMat(self.sphere_loc)
+
+        self.sphere_body: Body = model.getBodySet().get(sphere_body)
+        self.sphere_frame: Frame = self.sphere_body.findBaseFrame()
+
+        self.cylinder_body: Body = model.getBodySet().get(cylinder_body)
+        self.cylinder_frame: Frame = self.cylinder_body.findBaseFrame()
+        self.cylinder_com: Vec3 = self.cylinder_body.getMassCenter()
+
+        self.cylinder_top_marker: Marker = model.getMarkerSet().get(cylinder_top)
+        self.cylinder_bottom_marker: Marker = model.getMarkerSet().get(cylinder_bottom)
+
+    @instrumented("ContactPair.sample")
+    def _sample(self, s: State, n: int, buffers: ndarray, cylinder_vel: Optional[ndarray]):
+        # read everything this frame needs from OpenSim into row n of the buffers:
+        # 0 sphere centre, 1 cylinder bottom, 2 cylinder top, 3 cylinder velocity,
+        # 4/5 sphere frame origin and angular velocity, 6 its origin velocity, 7/8/9 same for the cylinder frame
+        with stage("opensim.positions"):
+            points = [self.sphere_frame.findStationLocationInGround(s, self.sphere_loc_vec3),
+                      self.cylinder_bottom_marker.findLocationInFrame(s, self.ground),
+                      self.cylinder_top_marker.findLocationInFrame(s, self.ground),
+                      self.sphere_frame.getPositionInGround(s), self.cylinder_frame.getPositionInGround(s)]
+
+        with stage("opensim.velocities"):
+            sphere_vel = self.sphere_frame.getVelocityInGround(s)
+            cylinder_frame_vel = self.cylinder_frame.getVelocityInGround(s)
+            com_vel = None
+            if cylinder_vel is None:
+                com_vel = self.cylinder_frame.findStationVelocityInGround(s, self.cylinder_com)
+
+        with stage("convert.vec3"):
+            for i, point in zip((0, 1, 2, 4, 7), points):
+                buffers[i, n] = point.to_numpy()
+
+            buffers[3, n] = cylinder_vel[n] if com_vel is None else com_vel.to_numpy()
+            for i, spatial_vel in ((5, sphere_vel), (8, cylinder_frame_vel)):
+                buffers[i, n] = spatial_vel.get(0).to_numpy()
+                buffers[i + 1, n] = spatial_vel.get(1).to_numpy()
+
+    @instrumented("ContactPair.solve")
+    def _solve(self, buffers: ndarray) -> ContactKinematics:
+        sphere_com, cylinder_bottom, cylinder_top, cylinder_vel = buffers[:4]
+        sphere_origin, sphere_w, sphere_v, cylinder_origin, cylinder_w, cylinder_v = buffers[4:]
+
+        d, cylinder_edge, sphere_edge, n = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top,
+                                                                cylinder_vel, self.sphere_r, self.cylinder_r)
+
+        # velocity of the 2 edge points, as if they were stations fixed to their frames: v = v_O + w x (p - p_O)
+        cylinderEdge_vel: ndarray = cylinder_v + cross(cylinder_w, cylinder_edge - cylinder_origin)
+        sphereEdge_vel: ndarray = sphere_v + cross(sphere_w, sphere_edge - sphere_origin)
+
+        vel_scalar: ndarray = dot_products(cylinderEdge_vel - sphereEdge_vel, n)
+
+        return ContactKinematics(sphere_com, cylinder_bottom, cylinder_top, cylinder_edge, sphere_edge, n, d,
+                                 vel_scalar)
+
+    def evaluate(self, s: State, cylinder_vel: Optional[ndarray] = None) -> ContactKinematics:
+        """
+        Penetration and its rate for a single state. Same result as compute_x_and_x_dot.
+
+        :param s: OpenSim state, realized to velocity.
+        :param cylinder_vel: cylinder body velocity in ground. If None, the velocity of the cylinder centre of mass is
+                             read from the state.
+        :return: single-frame ContactKinematics.
+        """
+
+        buffers: ndarray = empty((10, 1, 3), dtype=float64)
+        self._sample(s, 0, buffers, None if cylinder_vel is None else asarray(cylinder_vel).reshape(1, 3))
+        res: ContactKinematics = self._solve(buffers)
+
+        return ContactKinematics(*(field[0] for field in res))
+
+    def evaluate_many(self, states: Iterable[State], cylinder_vel: Optional[ndarray] = None) -> ContactKinematics:
+        """
+        Penetration and its rate for a sequence of states. The states are consumed one by one, so they can be the same
+        State object realized at a new frame at every step.
+
+        :param states: iterable of OpenSim states, realized to velocity.
+        :param cylinder_vel: (T, 3) cylinder velocities in ground. If None, they are read from the states.
+        :return: ContactKinematics with one row per state.
+        """
+
+        if cylinder_vel is not None:
+            cylinder_vel = asarray(cylinder_vel, dtype=float64).reshape(-1, 3)
+
+        capacity: int = 128 if cylinder_vel is None else len(cylinder_vel)
+        buffers: ndarray = empty((10, capacity, 3), dtype=float64)
+
+        T: int = 0
+        for s in states:
+            if T == buffers.shape[1]:
+                grown: ndarray = empty((10, 2 * T, 3), dtype=float64)
+                grown[:, :T] = buffers
+                buffers = grown
+
+            self._sample(s, T, buffers, cylinder_vel)
+            T += 1
+
+        return self._solve(buffers[:, :T])
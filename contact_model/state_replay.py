@@ -0,0 +1,116 @@
+from numpy import ndarray, empty, float64, ascontiguousarray
+from contact_model.instrumentation import stage
+from utils.sto_reader import read_sto_header, read_sto_columns, StoHeader
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# type hint imports
+from opensim import Model, State, Vector
+
+
+class StateReplay:
+    """
+    Replays a states file (e.g. a StatesReporter .sto) on a model, frame by frame.
+
+    The file columns are matched to the model state variables by name once, in the constructor, and the whole trial is
+    stored as a contiguous (T, n_states) array ordered like model.getStateVariableNames(). Every frame is then set with a
+    single setStateVariableValues call (all the Q and U at once) before realizing the state to velocity.
+
+    State variables that have no column in the file keep the value they have in the state passed to the constructor.
+    Columns are matched by full state path (/jointset/<joint>/<coord>/value); plain coordinate names, as in IK .mot
+    files, are accepted for coordinate values.
+    """
+
+    def __init__(self, model: Model, states_file: str, s: Optional[State] = None, to_radians: bool = True):
+        """
+        :param model: OpenSim Model object.
+        :param states_file: path to the .sto/.mot file.
+        :param s: state that is going to be updated at every frame. If None, model.initSystem() is called.
+        :param to_radians: convert rotational columns to radians if the file is inDegrees=yes.
+        """
+
+        self.model: Model = model
+        self.s: State = model.initSystem() if s is None else s
+
+        names = model.getStateVariableNames()
+        self.state_names: List[str] = [names.get(i) for i in range(names.getSize())]
+
+        header: StoHeader = read_sto_header(states_file)
+        file_columns = set(header.columns)
+
+        # model state variable index -> file column
+        mapping: Dict[int, str] = {}
+        for i, name in enumerate(self.state_names):
+            if name in file_columns:
+                mapping[i] = name
+                continue
+
+            parts: List[str] = name.split("/")
+            if parts[-1] == "value" and parts[-2] in file_columns:
+                mapping[i] = parts[-2]
+
+        self.missing: List[str] = [name for i, name in enumerate(self.state_names) if i not in mapping]
+
+        state_idx: List[int] = list(mapping)
+        data, _ = read_sto_columns(states_file, ["time"] + [mapping[i] for i in state_idx], to_radians=to_radians)
+
+        self.time: ndarray = ascontiguousarray(data[:, 0])
+
+        T: int = len(self.time)
+        defaults: ndarray = model.getStateVariableValues(self.s).to_numpy()
+        self.Y: ndarray = empty((T, len(self.state_names)), dtype=float64)
+        self.Y[:] = defaults
+        self.Y[:, state_idx] = data[:, 1:]
+
+        # coordinate values and speeds as (T, n_coordinates) arrays, in CoordinateSet order
+        coordinate_set = model.getCoordinateSet()
+        self.coordinate_names: List[str] = [coordinate_set.get(i).getName() for i in range(coordinate_set.getSize())]
+        value_idx: List[int] = []
+        speed_idx: List[int] = []
+        for i in range(coordinate_set.getSize()):
+            path: str = coordinate_set.get(i).getAbsolutePathString()
+            value_idx.append(self.state_names.index(f"{path}/value"))
+            speed_idx.append(self.state_names.index(f"{path}/speed"))
+
+        self.values: ndarray = ascontiguousarray(self.Y[:, value_idx])
+        self.speeds: ndarray = ascontiguousarray(self.Y[:, speed_idx])
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __iter__(self) -> Iterator[Tuple[int, State]]:
+        return self.frames()
+
+    def set_frame(self, n: int) -> State:
+        """
+        Set time, Q and U (and any other state variable from the file) of frame n and realize velocity.
+        """
+
+        s: State = self.s
+        with stage("opensim.setStateVariableValues"):
+            s.setTime(float(self.time[n]))
+            self.model.setStateVariableValues(s, Vector.createFromMat(self.Y[n]))
+
+        with stage("opensim.realizeVelocity"):
+            self.model.realizeVelocity(s)
+
+        return s
+
+    def frames(self, indices: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, State]]:
+        """
+        Yield (frame index, realized state) for every frame, or only for the given frame indices. The same State object
+        is updated and yielded at every step.
+        """
+
+        if indices is None:
+            indices = range(len(self.time))
+
+        for n in indices:
+            yield n, self.set_frame(n)
+
+    def column(self, coordinate: str, speed: bool = False) -> ndarray:
+        """
+        Value (or speed) trajectory of a coordinate, by name.
+        """
+
+        i: int = self.coordinate_names.index(coordinate)
+        return self.speeds[:, i] if speed else self.values[:, i]
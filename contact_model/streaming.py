@@ -0,0 +1,311 @@
+import asyncio
+import time
+import numpy as np
+from numpy import ndarray, float64
+from contact_model.body_kinematics import BodyKinematicsContact, BodyTrajectory, euler_xyz_to_matrix, body_columns
+from contact_model.contact_forces.smooth_forces import smooth_hunt_crossley
+from contact_model.instrumentation import stage
+from contact_model.kinematics import ContactKinematics
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_effective_radius
+from utils.sto_reader import read_sto_columns
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+# Frames are pushed one at a time as they arrive; every frame costs a fixed amount of work and memory (ring buffers of
+# the last frames, for the rate estimation and the latency statistics).
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of the last rows pushed, backed by one preallocated array.
+    """
+
+    def __init__(self, capacity: int, width: int = 1):
+        self.data: ndarray = np.zeros((capacity, width), dtype=float64)
+        self.capacity: int = capacity
+        self.count: int = 0     # total number of rows ever pushed
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, row):
+        self.data[self.count % self.capacity] = row
+        self.count += 1
+
+    def __getitem__(self, i: int) -> ndarray:
+        """
+        i-th most recent row: 0 is the last one pushed.
+        """
+
+        if i >= len(self):
+            raise IndexError(i)
+        return self.data[(self.count - 1 - i) % self.capacity]
+
+    def values(self) -> ndarray:
+        """
+        Rows in the order they were pushed (oldest first). Copies.
+        """
+
+        if self.count <= self.capacity:
+            return self.data[:self.count].copy()
+        start: int = self.count % self.capacity
+        return np.concatenate([self.data[start:], self.data[:start]])
+
+
+def backward_derivative(t: Sequence[float], f: Sequence[float]) -> float:
+    """
+    Derivative at the last sample from the last 2 or 3 samples (1st/2nd order backward differences, non-uniform steps
+    allowed). t and f are ordered most recent first.
+    """
+
+    h1: float = t[0] - t[1]
+    if len(t) < 3:
+        return (f[0] - f[1]) / h1
+
+    h2: float = t[1] - t[2]
+    return ((2 * h1 + h2) / (h1 * (h1 + h2)) * f[0] - (h1 + h2) / (h1 * h2) * f[1]
+            + h1 / (h2 * (h1 + h2)) * f[2])
+
+
+class StreamSample(NamedTuple):
+    time: float
+    penetration: float
+    penetration_rate: float
+    force: float
+    rate_estimated: bool    # True if the rate came from the backward difference of the penetration
+    latency: float          # s spent on this frame
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Frame evaluators: frame -> (penetration, rate or None)
+# ----------------------------------------------------------------------------------------------------------------------
+class BodyPose(NamedTuple):
+    """
+    One frame of body poses, in BodyKinematics layout: [X, Y, Z, Ox, Oy, Oz] (centre of mass in ground, body-fixed X-Y-Z
+    Euler angles in radians) and optionally [vX, vY, vZ, wx, wy, wz] (centre of mass and angular velocity in ground).
+    """
+    sphere_pose: ndarray
+    cylinder_pose: ndarray
+    sphere_vel: Optional[ndarray] = None
+    cylinder_vel: Optional[ndarray] = None
+
+
+class BodyPoseEvaluator:
+    """
+    Evaluates BodyPose frames with the OpenSim-free BodyKinematicsContact. Without velocities, the cylinder motion
+    direction comes from the backward difference of its centre of mass and the rate is left to the estimator.
+    """
+
+    def __init__(self, contact: BodyKinematicsContact):
+        self.contact: BodyKinematicsContact = contact
+        self._previous: Optional[Tuple[float, ndarray]] = None
+
+    @staticmethod
+    def _trajectory(pose: ndarray, vel: Optional[ndarray], com_vel: Optional[ndarray] = None) -> BodyTrajectory:
+        pose = np.asarray(pose, dtype=float64)
+        if vel is None:
+            vel = np.zeros(6, dtype=float64)
+            if com_vel is not None:
+                vel[:3] = com_vel
+        vel = np.asarray(vel, dtype=float64)
+
+        return BodyTrajectory(pose[None, :3], euler_xyz_to_matrix(pose[None, 3:]), vel[None, :3], vel[None, 3:])
+
+    def __call__(self, t: float, frame: BodyPose) -> Tuple[float, Optional[float]]:
+        has_velocities: bool = frame.sphere_vel is not None and frame.cylinder_vel is not None
+
+        cylinder_com_vel: Optional[ndarray] = None
+        if frame.cylinder_vel is None and self._previous is not None:
+            t0, com0 = self._previous
+            cylinder_com_vel = (np.asarray(frame.cylinder_pose[:3]) - com0) / (t - t0)
+        self._previous = (t, np.array(frame.cylinder_pose[:3], dtype=float64))
+
+        kin: ContactKinematics = self.contact.evaluate_trajectories(
+            self._trajectory(frame.sphere_pose, frame.sphere_vel),
+            self._trajectory(frame.cylinder_pose, frame.cylinder_vel, cylinder_com_vel))
+
+        return float(kin.penetration[0]), float(kin.penetration_rate[0]) if has_velocities else None
+
+
+class StateEvaluator:
+    """
+    Evaluates frames of coordinate values (and optionally speeds), ordered as coordinate_names, on an OpenSim model
+    through a ContactPair. All the values are set with a single setStateVariableValues call. Without speeds, the
+    cylinder velocity comes from the backward difference of its centre of mass and the rate is left to the estimator.
+    """
+
+    def __init__(self, model, pair, coordinate_names: Sequence[str], s=None):
+        from opensim import Vector
+
+        self._Vector = Vector
+        self.model = model
+        self.pair = pair
+        self.s = model.initSystem() if s is None else s
+
+        coordinate_set = model.getCoordinateSet()
+        names = model.getStateVariableNames()
+        state_names = [names.get(i) for i in range(names.getSize())]
+        paths = [coordinate_set.get(name).getAbsolutePathString() for name in coordinate_names]
+
+        self.value_idx: ndarray = np.array([state_names.index(f"{p}/value") for p in paths])
+        self.speed_idx: ndarray = np.array([state_names.index(f"{p}/speed") for p in paths])
+        self.Y: ndarray = model.getStateVariableValues(self.s).to_numpy().copy()
+        self._previous: RingBuffer = RingBuffer(1, 4)      # time and cylinder centre of mass of the last frame
+
+    def __call__(self, t: float, frame: Tuple[ndarray, Optional[ndarray]]) -> Tuple[float, Optional[float]]:
+        values, speeds = frame
+        self.Y[self.value_idx] = values
+        self.Y[self.speed_idx] = 0.0 if speeds is None else speeds
+
+        self.s.setTime(t)
+        self.model.setStateVariableValues(self.s, self._Vector.createFromMat(self.Y))
+        self.model.realizeVelocity(self.s)
+
+        cylinder_vel: Optional[ndarray] = None
+        if speeds is None:
+            pair = self.pair
+            com: ndarray = pair.cylinder_frame.findStationLocationInGround(self.s, pair.cylinder_com).to_numpy()
+            if len(self._previous):
+                previous: ndarray = self._previous[0]
+                cylinder_vel = (com - previous[1:]) / (t - previous[0])
+            else:
+                # no previous frame: take the cylinder as moving towards the sphere (a zero velocity is undefined)
+                sphere: ndarray = pair.sphere_frame.findStationLocationInGround(self.s, pair.sphere_loc_vec3).to_numpy()
+                cylinder_vel = sphere - com
+            self._previous.append((t, *com))
+
+        kin: ContactKinematics = self.pair.evaluate(self.s, cylinder_vel)
+        return float(kin.penetration), None if speeds is None else float(kin.penetration_rate)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Estimator
+# ----------------------------------------------------------------------------------------------------------------------
+class StreamingContactEstimator:
+
+    def __init__(self, evaluate_frame: Callable[[float, Any], Tuple[float, Optional[float]]],
+                 params: ContactParameters = ContactParameters(), capacity: int = 256,
+                 latency_budget: Optional[float] = None):
+        """
+        :param evaluate_frame: callable (time, frame) -> (penetration, rate), with rate None if it can't be computed
+                               from the frame (e.g. BodyPoseEvaluator, StateEvaluator).
+        :param params: contact parameters. sphere_r and cylinder_r give the effective radius of the force model.
+        :param capacity: number of past frames kept for rate estimation and latency statistics.
+        :param latency_budget: per-frame deadline (s). Frames slower than this are counted in latency_stats.
+        """
+
+        self.evaluate_frame = evaluate_frame
+        self.params: ContactParameters = params
+        self.R: float = compute_effective_radius(params.sphere_r, params.cylinder_r)
+        self.latency_budget: Optional[float] = latency_budget
+
+        self.history: RingBuffer = RingBuffer(capacity, 4)      # time, penetration, rate, force
+        self.latency: RingBuffer = RingBuffer(capacity, 1)
+        self.over_budget: int = 0
+
+    def push(self, t: float, frame: Any) -> StreamSample:
+        t0: float = time.perf_counter()
+
+        d, rate = self.evaluate_frame(t, frame)
+
+        estimated: bool = rate is None
+        if estimated:
+            n: int = min(len(self.history), 2)
+            if n == 0:
+                rate = 0.0
+            else:
+                past = [self.history[i] for i in range(n)]
+                rate = backward_derivative([t] + [row[0] for row in past], [d] + [row[1] for row in past])
+
+        p: ContactParameters = self.params
+        with stage("force.smooth_hunt_crossley"):
+            force: float = smooth_hunt_crossley(d, rate, self.R, p.k, p.c, p.bc, p.cf)
+        self.history.append((t, d, rate, force))
+
+        latency: float = time.perf_counter() - t0
+        self.latency.append(latency)
+        if self.latency_budget is not None and latency > self.latency_budget:
+            self.over_budget += 1
+
+        return StreamSample(t, d, rate, force, estimated, latency)
+
+    def stream(self, frames: Iterable[Tuple[float, Any]]) -> Iterator[StreamSample]:
+        for t, frame in frames:
+            yield self.push(t, frame)
+
+    async def astream(self, frames: AsyncIterator[Tuple[float, Any]]) -> AsyncIterator[StreamSample]:
+        async for t, frame in frames:
+            yield self.push(t, frame)
+
+    def latency_stats(self) -> Dict[str, float]:
+        """
+        Latency statistics (s) over the last capacity frames, plus the total number of frames and of frames over
+        budget.
+        """
+
+        values: ndarray = self.latency.values()[:, 0]
+        if not len(values):
+            return {"frames": 0}
+
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"frames": self.latency.count, "mean": float(values.mean()), "p50": float(p50), "p95": float(p95),
+                "p99": float(p99), "max": float(values.max()), "over_budget": self.over_budget}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Local replay sources
+# ----------------------------------------------------------------------------------------------------------------------
+def _load_poses(pos_file: str, vel_file: Optional[str], sphere_body: str, cylinder_body: str):
+    columns = body_columns(sphere_body) + body_columns(cylinder_body)
+    pos, _ = read_sto_columns(pos_file, ["time"] + columns, to_radians=True)
+    vel: Optional[ndarray] = None
+    if vel_file is not None:
+        vel, _ = read_sto_columns(vel_file, columns, to_radians=True)
+
+    return pos, vel
+
+
+def _pose_frame(pos: ndarray, vel: Optional[ndarray], n: int) -> BodyPose:
+    if vel is None:
+        return BodyPose(pos[n, 1:7], pos[n, 7:13])
+    return BodyPose(pos[n, 1:7], pos[n, 7:13], vel[n, :6], vel[n, 6:12])
+
+
+def replay_body_kinematics(pos_file: str, vel_file: Optional[str] = None, sphere_body: str = "rclavicle",
+                           cylinder_body: str = "punching_bag", realtime: bool = False,
+                           speed: float = 1.0) -> Iterator[Tuple[float, BodyPose]]:
+    """
+    Replay BodyKinematics files (e.g. the P8 ones) as a stream of (time, BodyPose). Leave vel_file None to exercise the
+    incremental rate estimation. With realtime, frames are paced at the file rate divided by speed.
+    """
+
+    pos, vel = _load_poses(pos_file, vel_file, sphere_body, cylinder_body)
+    start: float = time.perf_counter()
+
+    for n in range(len(pos)):
+        if realtime:
+            delay: float = (pos[n, 0] - pos[0, 0]) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        yield float(pos[n, 0]), _pose_frame(pos, vel, n)
+
+
+async def areplay_body_kinematics(pos_file: str, vel_file: Optional[str] = None, sphere_body: str = "rclavicle",
+                                  cylinder_body: str = "punching_bag", realtime: bool = True,
+                                  speed: float = 1.0) -> AsyncIterator[Tuple[float, BodyPose]]:
+    """
+    asyncio version of replay_body_kinematics.
+    """
+
+    pos, vel = _load_poses(pos_file, vel_file, sphere_body, cylinder_body)
+    loop = asyncio.get_running_loop()
+    start: float = loop.time()
+
+    for n in range(len(pos)):
+        if realtime:
+            delay: float = (pos[n, 0] - pos[0, 0]) / speed - (loop.time() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        yield float(pos[n, 0]), _pose_frame(pos, vel, n)
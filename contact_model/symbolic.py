@@ -0,0 +1,251 @@
+import os
+import subprocess
+import numpy as np
+from numpy import ndarray
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from utils.geometry import compute_penetrations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 3D vectors are 3-element sequences of components: (N, ) arrays for NumPy, scalar SX/MX expressions for CasADi
+Vector = Sequence[Any]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# The expressions are written once in terms of tanh, sqrt and where, and evaluated with either set of ops
+# ----------------------------------------------------------------------------------------------------------------------
+class NumpyOps:
+    tanh = staticmethod(np.tanh)
+    sqrt = staticmethod(np.sqrt)
+    where = staticmethod(np.where)
+
+
+class CasadiOps:
+
+    def __init__(self):
+        casadi = _import_casadi()
+        self.tanh = casadi.tanh
+        self.sqrt = casadi.sqrt
+        self.where = casadi.if_else
+
+
+def _import_casadi():
+    try:
+        import casadi
+    except ImportError as e:
+        raise ImportError("casadi is required to build the symbolic contact model: pip install casadi") from e
+
+    return casadi
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Expressions
+# ----------------------------------------------------------------------------------------------------------------------
+def smooth_hunt_crossley_expr(x, x_dot, sphere_r, k, c, bc, cf, ops=NumpyOps):
+    """
+    Same maths as contact_model.contact_forces.smooth_forces.smooth_hunt_crossley.
+    """
+
+    k_new = 0.5 * k ** (2 / 3)
+    f_p_smooth = ((x ** 2 + cf) ** 0.5) ** 1.5 * (0.5 + 0.5 * ops.tanh(bc * x))
+    f_v_smooth = (1 + (1.5 * c * x_dot)) * (0.5 + 0.5 * ops.tanh(bc * (x_dot + 2 / (3 * c))))
+    r_new = sphere_r * k_new
+
+    return (4/3) * ((k_new ** (2 / 3)) ** 1.5) * ops.sqrt(r_new) * f_p_smooth * f_v_smooth
+
+
+def _dot(a: Vector, b: Vector):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _scale(a: Vector, s) -> List[Any]:
+    return [a[i] * s for i in range(3)]
+
+
+def _sub(a: Vector, b: Vector) -> List[Any]:
+    return [a[i] - b[i] for i in range(3)]
+
+
+def _add(a: Vector, b: Vector) -> List[Any]:
+    return [a[i] + b[i] for i in range(3)]
+
+
+def penetration_expr(sphere_com: Vector, cylinder_bottom: Vector, cylinder_top: Vector, cylinder_vel: Vector,
+                     sphere_r, cylinder_r, ops=NumpyOps) -> Tuple[Any, List[Any], List[Any], List[Any]]:
+    """
+    Same maths as utils.geometry.compute_penetrations (projection on the cylinder axis, then distance between the
+    edges along the normal), with the motion-direction cases written as where/if_else.
+
+    :return: penetration, cylinder edge, sphere edge, normal unit vector.
+    """
+
+    r: List[Any] = _sub(cylinder_top, cylinder_bottom)
+    r_norm = ops.sqrt(_dot(r, r))
+    r_hat: List[Any] = _scale(r, 1 / r_norm)
+    q: List[Any] = _sub(sphere_com, cylinder_bottom)
+
+    cos_theta = _dot(q, r) / (ops.sqrt(_dot(q, q)) * r_norm)
+    Q: List[Any] = _add([q[i] * cos_theta * r_hat[i] for i in range(3)], cylinder_bottom)
+
+    rel: List[Any] = _sub(sphere_com, Q)
+    rel_hat: List[Any] = _scale(rel, 1 / ops.sqrt(_dot(rel, rel)))
+
+    forward = cylinder_vel[0] > 0
+    same = cylinder_vel[0] * rel_hat[0] > 0
+    sign = ops.where(forward, ops.where(same, -1.0, 1.0), ops.where(same, 1.0, -1.0))
+
+    n: List[Any] = _scale(rel_hat, sign)
+    cylinder_edge: List[Any] = _add(Q, _scale(n, cylinder_r))
+    sphere_edge: List[Any] = _sub(sphere_com, _scale(n, sphere_r))
+
+    d = _dot(_sub(cylinder_edge, sphere_edge), n)
+    return d, cylinder_edge, sphere_edge, n
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# CasADi functions
+# ----------------------------------------------------------------------------------------------------------------------
+FORCE_PARAMETERS: Tuple[str, ...] = ("sphere_r", "k", "c", "bc", "cf")
+
+
+def force_function(name: str = "contact_force"):
+    """
+    casadi.Function f = F(x, x_dot, p) with p = [sphere_r, k, c, bc, cf].
+    """
+
+    casadi = _import_casadi()
+    x = casadi.SX.sym("x")
+    x_dot = casadi.SX.sym("x_dot")
+    p = casadi.SX.sym("p", len(FORCE_PARAMETERS))
+
+    f = smooth_hunt_crossley_expr(x, x_dot, p[0], p[1], p[2], p[3], p[4], CasadiOps())
+    return casadi.Function(name, [x, x_dot, p], [f], ["x", "x_dot", "p"], ["f"])
+
+
+def force_jacobian_function(name: str = "contact_force_jac"):
+    """
+    casadi.Function (f, df/dx, df/dx_dot, df/dp) = J(x, x_dot, p), exact derivatives from CasADi AD.
+    """
+
+    casadi = _import_casadi()
+    F = force_function()
+    x = casadi.SX.sym("x")
+    x_dot = casadi.SX.sym("x_dot")
+    p = casadi.SX.sym("p", len(FORCE_PARAMETERS))
+
+    f = F(x, x_dot, p)
+    return casadi.Function(name, [x, x_dot, p],
+                           [f, casadi.jacobian(f, x), casadi.jacobian(f, x_dot), casadi.jacobian(f, p)],
+                           ["x", "x_dot", "p"], ["f", "df_dx", "df_dx_dot", "df_dp"])
+
+
+def geometry_function(name: str = "contact_geometry"):
+    """
+    casadi.Function (d, cylinder_edge, sphere_edge, n) = G(sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, radii)
+    with radii = [sphere_r, cylinder_r]. All positions and velocities are 3x1 and expressed in ground.
+    """
+
+    casadi = _import_casadi()
+    sphere_com = casadi.SX.sym("sphere_com", 3)
+    cylinder_bottom = casadi.SX.sym("cylinder_bottom", 3)
+    cylinder_top = casadi.SX.sym("cylinder_top", 3)
+    cylinder_vel = casadi.SX.sym("cylinder_vel", 3)
+    radii = casadi.SX.sym("radii", 2)
+
+    d, cylinder_edge, sphere_edge, n = penetration_expr(sphere_com, cylinder_bottom, cylinder_top, cylinder_vel,
+                                                        radii[0], radii[1], CasadiOps())
+
+    return casadi.Function(name, [sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, radii],
+                           [d, casadi.vertcat(*cylinder_edge), casadi.vertcat(*sphere_edge), casadi.vertcat(*n)],
+                           ["sphere_com", "cylinder_bottom", "cylinder_top", "cylinder_vel", "radii"],
+                           ["d", "cylinder_edge", "sphere_edge", "n"])
+
+
+def geometry_jacobian_function(name: str = "contact_geometry_jac"):
+    """
+    casadi.Function (d, dd/dsphere_com, dd/dcylinder_bottom, dd/dcylinder_top) for the penetration.
+    """
+
+    casadi = _import_casadi()
+    G = geometry_function()
+    sphere_com = casadi.SX.sym("sphere_com", 3)
+    cylinder_bottom = casadi.SX.sym("cylinder_bottom", 3)
+    cylinder_top = casadi.SX.sym("cylinder_top", 3)
+    cylinder_vel = casadi.SX.sym("cylinder_vel", 3)
+    radii = casadi.SX.sym("radii", 2)
+
+    d = G(sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, radii)[0]
+    return casadi.Function(name, [sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, radii],
+                           [d, casadi.jacobian(d, sphere_com), casadi.jacobian(d, cylinder_bottom),
+                            casadi.jacobian(d, cylinder_top)],
+                           ["sphere_com", "cylinder_bottom", "cylinder_top", "cylinder_vel", "radii"],
+                           ["d", "dd_dsphere_com", "dd_dcylinder_bottom", "dd_dcylinder_top"])
+
+
+def generate_c_code(file_name: str = "contact_model.c", directory: str = ".", functions: Optional[List[Any]] = None,
+                    compile_shared: bool = False, compiler: str = "gcc") -> str:
+    """
+    Generate C code for the contact functions (by default force, geometry and their Jacobians) and optionally compile
+    it into a shared library, which can be loaded back with casadi.external(name, path).
+
+    :return: path to the generated .c file, or to the shared library if compile_shared is True.
+    """
+
+    casadi = _import_casadi()
+    if functions is None:
+        functions = [force_function(), force_jacobian_function(), geometry_function(), geometry_jacobian_function()]
+
+    generator = casadi.CodeGenerator(file_name)
+    for function in functions:
+        generator.add(function)
+
+    c_path: str = os.path.join(directory, file_name)
+    generator.generate(os.path.join(directory, ""))
+
+    if not compile_shared:
+        return c_path
+
+    so_path: str = os.path.splitext(c_path)[0] + ".so"
+    subprocess.run([compiler, "-fPIC", "-shared", "-O3", c_path, "-o", so_path], check=True)
+    return so_path
+
+
+def check_against_numpy(n_samples: int = 1000, seed: int = 0) -> Dict[str, float]:
+    """
+    Evaluate the CasADi functions on random samples and compare them with the NumPy path (smooth_hunt_crossley_batch
+    and utils.geometry.compute_penetrations).
+
+    :return: maximum absolute difference of every output.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # force
+    x: ndarray = rng.uniform(-0.01, 0.01, n_samples)
+    x_dot: ndarray = rng.uniform(-2.0, 2.0, n_samples)
+    p: ndarray = np.array([0.0218, 2300832.0, 2.5, 50.0, 1e-8])
+
+    F = force_function().map(n_samples)
+    f_casadi: ndarray = np.asarray(F(x[None], x_dot[None], np.repeat(p[:, None], n_samples, axis=1))).ravel()
+    f_numpy: ndarray = smooth_hunt_crossley_batch(x, x_dot, *p)
+
+    # geometry: sphere around a vertical cylinder, with random velocity directions
+    sphere_com: ndarray = rng.normal(0.0, 0.2, (n_samples, 3))
+    cylinder_bottom: ndarray = rng.normal(0.0, 0.01, (n_samples, 3))
+    cylinder_top: ndarray = cylinder_bottom + np.array([0.0, 1.0, 0.0])
+    cylinder_vel: ndarray = rng.normal(0.0, 1.0, (n_samples, 3))
+    radii: ndarray = np.array([0.025, 0.1702085])
+
+    G = geometry_function().map(n_samples)
+    d_casadi, ce_casadi, se_casadi, n_casadi = (np.asarray(out) for out in
+                                                G(sphere_com.T, cylinder_bottom.T, cylinder_top.T, cylinder_vel.T,
+                                                  np.repeat(radii[:, None], n_samples, axis=1)))
+    d_numpy, ce_numpy, se_numpy, n_numpy = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top,
+                                                                cylinder_vel, radii[0], radii[1])
+
+    return {
+        "force": float(np.max(np.abs(f_casadi - f_numpy))),
+        "penetration": float(np.max(np.abs(d_casadi.ravel() - d_numpy))),
+        "cylinder_edge": float(np.max(np.abs(ce_casadi.T - ce_numpy))),
+        "sphere_edge": float(np.max(np.abs(se_casadi.T - se_numpy))),
+        "normal": float(np.max(np.abs(n_casadi.T - n_numpy))),
+    }
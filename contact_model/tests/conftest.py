@@ -0,0 +1,18 @@
+import os
+import pytest
+from contact_model.body_kinematics import write_free_joint_states
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+@pytest.fixture(scope="session")
+def fixture_states(tmp_path_factory) -> str:
+    """
+    States file of the punching_bag.osim fixture, replaying the P8 BodyKinematics files.
+    """
+
+    path: str = str(tmp_path_factory.mktemp("states") / "P8_fixture_states.sto")
+    return write_free_joint_states(path, MODEL_FILE, POS_FILE, VEL_FILE)
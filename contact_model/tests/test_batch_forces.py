@@ -0,0 +1,40 @@
+import numpy as np
+from numpy import ndarray
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.contact_forces.smooth_forces import smooth_hunt_crossley
+from utils.geometry import compute_effective_radius
+
+
+def test_batch_force_matches_scalar_force():
+    rng = np.random.default_rng(0)
+    x: ndarray = rng.uniform(-0.01, 0.02, 500)
+    x_dot: ndarray = rng.uniform(-2, 2, 500)
+    R: float = compute_effective_radius(0.025, 0.1702085)
+
+    expected: ndarray = np.array([smooth_hunt_crossley(a, b, R, 2300832.0, 2.5) for a, b in zip(x, x_dot)])
+    np.testing.assert_allclose(smooth_hunt_crossley_batch(x, x_dot, R, 2300832.0, 2.5), expected, rtol=1e-10, atol=1e-9)
+
+
+def test_batch_force_broadcasts_parameters():
+    rng = np.random.default_rng(1)
+    x: ndarray = rng.uniform(-0.01, 0.02, 50)
+    x_dot: ndarray = rng.uniform(-2, 2, 50)
+    k: ndarray = np.array([1e5, 1e6, 2300832.0])
+    c: ndarray = np.array([0.5, 1.0, 2.5, 5.0])
+
+    force: ndarray = smooth_hunt_crossley_batch(x, x_dot, 0.02, k[:, None, None], c[None, :, None], bc=30.0)
+    assert force.shape == (3, 4, 50)
+
+    for i, k_i in enumerate(k):
+        for j, c_j in enumerate(c):
+            expected = [smooth_hunt_crossley(a, b, 0.02, k_i, c_j, bc=30.0) for a, b in zip(x, x_dot)]
+            np.testing.assert_allclose(force[i, j], expected, rtol=1e-10, atol=1e-9)
+
+
+def test_batch_force_writes_into_out():
+    x: ndarray = np.linspace(-0.01, 0.01, 10)
+    out: ndarray = np.empty(10)
+
+    result: ndarray = smooth_hunt_crossley_batch(x, 0.5, 0.02, 1e6, 2.0, out=out)
+    assert result is out
+    np.testing.assert_allclose(out, smooth_hunt_crossley_batch(x, 0.5, 0.02, 1e6, 2.0))
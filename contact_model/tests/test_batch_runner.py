@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("opensim")
+
+from opensim import Model
+from contact_model.batch_runner import Trial, run_screened_trial, run_trial, run_trials
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.parameters import ContactParameters
+from contact_model.sphere_to_cylinder import ContactPair
+from contact_model.state_replay import StateReplay
+from utils.geometry import compute_effective_radius
+from utils.sto_reader import read_sto_columns
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+@pytest.fixture(scope="module")
+def trial(fixture_states) -> Trial:
+    return Trial(MODEL_FILE, fixture_states, VEL_FILE, "P8")
+
+
+def test_run_trial_matches_contact_pair(trial):
+    params = ContactParameters()
+    result = run_trial(trial, params)
+
+    model = Model(MODEL_FILE)
+    replay = StateReplay(model, trial.states_file)
+    cylinder_vel, _ = read_sto_columns(VEL_FILE, ["punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+    kin = ContactPair(model, params.sphere_loc, params.sphere_r, params.cylinder_r).evaluate_many(
+        (s for _, s in replay), cylinder_vel)
+
+    np.testing.assert_allclose(result.penetration, kin.penetration, atol=1e-12)
+    np.testing.assert_allclose(result.force, smooth_hunt_crossley_batch(
+        kin.penetration, kin.penetration_rate, compute_effective_radius(params.sphere_r, params.cylinder_r),
+        params.k, params.c, params.bc, params.cf), rtol=1e-10, atol=1e-9)
+
+
+def test_screened_trial_matches_run_trial_in_the_windows(trial):
+    full = run_trial(trial)
+    screened, report = run_screened_trial(trial, POS_FILE)
+
+    inside = np.zeros(report.n_frames, dtype=bool)
+    for start, stop in report.windows:
+        inside[start:stop] = True
+
+    assert inside.any() and report.n_candidates == inside.sum()
+    np.testing.assert_allclose(screened.force[inside], full.force[inside], rtol=1e-12)
+    np.testing.assert_array_equal(screened.force[~inside], 0.0)
+    assert np.isnan(screened.penetration[~inside]).all()
+    # every frame in contact is inside a window
+    assert not (full.penetration[~inside] > 0).any()
+
+
+def test_run_trials_collects_failures(trial):
+    broken = Trial(MODEL_FILE, os.path.join(TESTS_DIR, "files", "missing.sto"), VEL_FILE, "broken")
+    batch = run_trials([trial, broken], max_workers=2)
+
+    assert batch.succeeded == ["P8"] and list(batch.failures) == ["broken"]
+    np.testing.assert_allclose(batch["P8"].force, run_trial(trial).force)
+
+    with pytest.raises(ValueError):
+        run_trials([trial, trial])
@@ -0,0 +1,39 @@
+import json
+import numpy as np
+from benchmarks import bench
+from benchmarks.bench import compare, run_benchmarks
+
+
+def test_run_records_every_benchmark():
+    results = run_benchmarks(["forces", "pipeline"], max_frames=1000, max_loop_frames=100, repeats=1, min_time=0.0,
+                             verbose=False)
+
+    records = results["results"]
+    assert json.loads(json.dumps(results)) == results
+    assert {r["group"] for r in records} == {"forces", "pipeline"}
+    for r in records:
+        assert r["status"] in ("ok", "skipped")
+        if r["status"] == "ok":
+            assert r["min"] <= r["median"]
+    assert all(r["frames"] <= 100 for r in records if r["name"] == "smooth_hunt_crossley.loop")
+
+
+def test_errors_are_recorded(monkeypatch):
+    def broken(_):
+        raise RuntimeError("broken setup")
+
+    monkeypatch.setattr(bench, "_registry", [bench.BenchmarkSpec("broken", "forces", broken, lambda _: None, None,
+                                                                 False)])
+    record, = run_benchmarks(verbose=False)["results"]
+    assert record["status"] == "error" and "broken setup" in record["reason"] and record["traceback"]
+
+
+def test_compare():
+    baseline = {"results": [{"name": "a", "frames": 10, "status": "ok", "min": 1.0},
+                            {"name": "b", "frames": 10, "status": "ok", "min": 1.0}]}
+    current = {"results": [{"name": "a", "frames": 10, "status": "ok", "min": 1.05},
+                           {"name": "b", "frames": 10, "status": "ok", "min": 1.5},
+                           {"name": "c", "frames": 10, "status": "ok", "min": 9.0}]}
+
+    regression, = compare(baseline, current, tolerance=0.1)
+    assert regression["name"] == "b" and np.isclose(regression["ratio"], 1.5)
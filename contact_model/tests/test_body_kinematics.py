@@ -0,0 +1,77 @@
+import os
+import numpy as np
+from scipy.spatial.transform import Rotation
+from contact_model.body_kinematics import (BodyKinematicsContact, euler_xyz_to_matrix, load_body_trajectory,
+                                           point_velocities, station_positions)
+from contact_model.parameters import ContactParameters
+from utils.sto_reader import read_sto_columns
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+def test_euler_xyz_is_body_fixed():
+    angles = np.random.default_rng(0).uniform(-np.pi, np.pi, (50, 3))
+    np.testing.assert_allclose(euler_xyz_to_matrix(angles), Rotation.from_euler("XYZ", angles).as_matrix(),
+                               atol=1e-12)
+
+
+def test_station_positions_and_velocities():
+    traj = load_body_trajectory(POS_FILE, VEL_FILE, "punching_bag")
+    mass_center = np.array([0.01, -0.02, 0.03])
+    station = np.array([0.1, 0.5, -0.1])
+
+    points = station_positions(traj, mass_center, station)
+    for t in range(0, len(points), 10):
+        np.testing.assert_allclose(points[t], traj.com[t] + traj.R[t] @ (station - mass_center))
+
+    vel = point_velocities(traj, points)
+    np.testing.assert_allclose(vel[0], traj.com_vel[0] + np.cross(traj.w[0], points[0] - traj.com[0]))
+
+
+def test_contact_on_fixture():
+    params = ContactParameters()
+    kin = BodyKinematicsContact(MODEL_FILE, params).evaluate(POS_FILE, VEL_FILE)
+
+    np.testing.assert_allclose(np.linalg.norm(kin.cylinder_top - kin.cylinder_bottom, axis=1), 1.0)
+    np.testing.assert_allclose(np.linalg.norm(kin.normal, axis=1), 1.0)
+    assert kin.penetration.shape == kin.penetration_rate.shape == (121, )
+    assert kin.penetration.max() > 0
+
+
+def test_markers_on_offset_frame_match_markers_on_body(tmp_path):
+    with open(MODEL_FILE) as f:
+        xml = f.read()
+
+    # same markers, given on a frame offset by 0.2 m along the bag's y axis and turned 180 degrees about z
+    offset_frame = ('<components><PhysicalOffsetFrame name="bag_offset"><socket_parent>..</socket_parent>'
+                    f'<translation>0 0.2 0</translation><orientation>0 0 {np.pi}</orientation>'
+                    '</PhysicalOffsetFrame></components>')
+    xml = xml.replace("<inertia>4.0231 0.5794 4.0231 0 0 0</inertia>",
+                      "<inertia>4.0231 0.5794 4.0231 0 0 0</inertia>" + offset_frame)
+    xml = xml.replace("<socket_parent_frame>/bodyset/punching_bag</socket_parent_frame>\n\t\t\t\t\t<location>0 0.5 0",
+                      "<socket_parent_frame>/bodyset/punching_bag/bag_offset</socket_parent_frame>\n"
+                      "\t\t\t\t\t<location>0 -0.3 0")
+    xml = xml.replace("<socket_parent_frame>/bodyset/punching_bag</socket_parent_frame>\n\t\t\t\t\t<location>0 -0.5 0",
+                      "<socket_parent_frame>/bodyset/punching_bag/bag_offset</socket_parent_frame>\n"
+                      "\t\t\t\t\t<location>0 0.7 0")
+    assert xml.count("bag_offset") == 3
+    offset_model = tmp_path / "offset.osim"
+    offset_model.write_text(xml)
+
+    expected = BodyKinematicsContact(MODEL_FILE).evaluate(POS_FILE, VEL_FILE)
+    actual = BodyKinematicsContact(str(offset_model)).evaluate(POS_FILE, VEL_FILE)
+    for e, a in zip(expected, actual):
+        np.testing.assert_allclose(a, e, atol=1e-12)
+
+
+def test_free_joint_states(fixture_states):
+    column = "/jointset/ground_punching_bag/punching_bag"
+    data, _ = read_sto_columns(fixture_states, ["time", f"{column}_ty/value", f"{column}_rx/speed"])
+    assert len(data) == 121 and np.all(np.isfinite(data))
+
+    # the speeds of a free joint are the angular velocity in ground
+    traj = load_body_trajectory(POS_FILE, VEL_FILE, "punching_bag")
+    np.testing.assert_allclose(data[:, 2], traj.w[:, 0])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from contact_model import collocation
+from contact_model.collocation import (CollocationResampler, collocation_grid, collocation_points)
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.kinematics import ContactKinematics
+from contact_model.parameters import ContactParameters
+from utils.geometry import compute_effective_radius
+from utils.sto_reader import write_sto
+
+
+@pytest.mark.parametrize("scheme", ["radau", "legendre"])
+@pytest.mark.parametrize("d", [1, 2, 3, 4, 5])
+def test_collocation_points_match_casadi(scheme, d):
+    casadi = pytest.importorskip("casadi")
+    np.testing.assert_allclose(collocation_points(d, scheme), casadi.collocation_points(d, scheme), atol=1e-12)
+
+
+def test_collocation_grid():
+    grid = collocation_grid(0.0, 1.0, 4, 3)
+    assert grid.shape == (12, )
+    np.testing.assert_allclose(grid[2::3], [0.25, 0.5, 0.75, 1.0])
+    assert np.all(np.diff(grid) > 0)
+
+
+def kinematics(time: np.ndarray, penetration: np.ndarray, rate: np.ndarray) -> ContactKinematics:
+    zeros = np.zeros((len(time), 3))
+    return ContactKinematics(zeros, zeros, zeros, zeros, zeros, zeros, penetration, rate)
+
+
+def test_resampler_reproduces_smooth_signals():
+    time = np.linspace(0, 1, 201)
+    coordinates = np.column_stack([np.sin(time), time ** 2])
+    penetration = 0.01 * np.sin(2 * np.pi * time)
+    params = ContactParameters()
+
+    resampler = CollocationResampler(time, coordinates, ["a", "b"], penetration)
+    sample = resampler.resample(N=20, d=3)
+    t = sample.time
+
+    np.testing.assert_allclose(sample.coordinates, np.column_stack([np.sin(t), t ** 2]), atol=1e-8)
+    np.testing.assert_allclose(sample.speeds, np.column_stack([np.cos(t), 2 * t]), atol=1e-4)
+    np.testing.assert_allclose(sample.penetration_rate, 0.02 * np.pi * np.cos(2 * np.pi * t), atol=1e-4)
+    np.testing.assert_allclose(sample.force, smooth_hunt_crossley_batch(
+        sample.penetration, sample.penetration_rate, compute_effective_radius(params.sphere_r, params.cylinder_r),
+        params.k, params.c, params.bc, params.cf))
+    assert sample.measured_force is None
+    assert resampler.resample(N=20, d=3) is sample
+
+
+def test_from_ik_file_cache_key_includes_the_rate(tmp_path, monkeypatch):
+    monkeypatch.setattr(collocation, "_resamplers", {})
+    time = np.linspace(0, 1, 101)
+    ik_file = str(tmp_path / "P8_IK.mot")
+    write_sto(ik_file, np.column_stack([time, np.degrees(np.sin(time))]), ["time", "a"], in_degrees=True)
+
+    penetration = 0.01 * np.sin(2 * np.pi * time)
+    first = CollocationResampler.from_ik_file(ik_file, time, kinematics(time, penetration, np.zeros_like(time)))
+    second = CollocationResampler.from_ik_file(ik_file, time, kinematics(time, penetration, np.ones_like(time)))
+    again = CollocationResampler.from_ik_file(ik_file, time, kinematics(time, penetration, np.ones_like(time)))
+
+    assert first is not second and second is again
+    np.testing.assert_allclose(second.resample(N=10).penetration_rate, 1.0)
+    np.testing.assert_allclose(first.resample(N=10).coordinates[:, 0], np.sin(first.resample(N=10).time), atol=1e-6)
@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("opensim")
+
+from opensim import Model
+from contact_model.body_kinematics import BodyKinematicsContact
+from contact_model.parameters import ContactParameters
+from contact_model.sphere_to_cylinder import ContactPair, compute_x_and_x_dot
+from contact_model.state_replay import StateReplay
+from utils.sto_reader import read_sto_columns
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+@pytest.fixture(scope="module")
+def replay(fixture_states) -> StateReplay:
+    return StateReplay(Model(MODEL_FILE), fixture_states)
+
+
+def test_evaluate_matches_compute_x_and_x_dot(replay):
+    params = ContactParameters()
+    sphere_loc = np.array(params.sphere_loc)[:, None]
+    cylinder_vel, _ = read_sto_columns(VEL_FILE, ["punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+    clavicle = replay.model.getBodySet().get("rclavicle")
+    pair = ContactPair(replay.model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+
+    for n, s in replay.frames(range(0, len(replay), 10)):
+        d, rate = compute_x_and_x_dot(replay.model, sphere_loc, cylinder_vel[n][:, None], clavicle, params.sphere_r,
+                                      params.cylinder_r, s)
+        kin = pair.evaluate(s, cylinder_vel[n])
+        np.testing.assert_allclose(kin.penetration, d, rtol=1e-12, atol=1e-14)
+        np.testing.assert_allclose(kin.penetration_rate, rate, rtol=1e-10, atol=1e-12)
+
+
+def test_evaluate_many_matches_evaluate(replay):
+    params = ContactParameters()
+    pair = ContactPair(replay.model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+    many = pair.evaluate_many(s for _, s in replay)
+
+    assert many.penetration.shape == (len(replay), )
+    for n, s in replay.frames([0, 60, len(replay) - 1]):
+        single = pair.evaluate(s)
+        for expected, actual in zip(single, many):
+            np.testing.assert_allclose(actual[n], expected, atol=1e-12)
+
+
+def test_evaluate_many_matches_body_kinematics(replay):
+    params = ContactParameters()
+    cylinder_vel, _ = read_sto_columns(VEL_FILE, ["punching_bag_X", "punching_bag_Y", "punching_bag_Z"])
+    pair = ContactPair(replay.model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+
+    expected = BodyKinematicsContact(MODEL_FILE, params).evaluate(POS_FILE, VEL_FILE)
+    actual = pair.evaluate_many((s for _, s in replay), cylinder_vel)
+    for e, a in zip(expected, actual):
+        np.testing.assert_allclose(a, e, atol=1e-8)
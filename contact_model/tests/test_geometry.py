@@ -0,0 +1,52 @@
+import numpy as np
+from numpy import ndarray
+from utils.geometry import (find_point_projection_along_a_line, get_distance_between_edges, compute_penetrations,
+                            find_point_projections_along_lines)
+from utils.vector_algebra import unit_vector
+
+
+def random_frames(N: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    cylinder_bottom: ndarray = rng.normal(0, 0.05, (N, 3)) + [0.0, 0.5, 0.0]
+    cylinder_top: ndarray = cylinder_bottom + rng.normal(0, 0.05, (N, 3)) + [0.0, 1.0, 0.0]
+    sphere_com: ndarray = rng.normal(0, 0.2, (N, 3)) + [0.0, 1.0, 0.0]
+    cylinder_vel: ndarray = rng.normal(0, 1.0, (N, 3))
+    return sphere_com, cylinder_bottom, cylinder_top, cylinder_vel
+
+
+def test_projections_match_per_frame_function():
+    sphere_com, cylinder_bottom, cylinder_top, _ = random_frames(100)
+    Q: ndarray = find_point_projections_along_lines(sphere_com, cylinder_bottom, cylinder_top)
+
+    for n in range(100):
+        expected = find_point_projection_along_a_line(sphere_com[n][:, None], cylinder_bottom[n][:, None],
+                                                      cylinder_top[n][:, None])
+        np.testing.assert_allclose(Q[n], expected[:, 0], rtol=1e-12, atol=1e-15)
+
+
+def test_penetrations_match_per_frame_functions():
+    sphere_com, cylinder_bottom, cylinder_top, cylinder_vel = random_frames(200, seed=1)
+    d, cylinder_edge, sphere_edge, normal = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top,
+                                                                 cylinder_vel, 0.025, 0.17)
+
+    for n in range(200):
+        Q = find_point_projection_along_a_line(sphere_com[n][:, None], cylinder_bottom[n][:, None],
+                                               cylinder_top[n][:, None]) + cylinder_bottom[n][:, None]
+        d_n, cylinder_edge_n, sphere_edge_n, normal_n = get_distance_between_edges(
+            Q, sphere_com[n][:, None], 0.025, 0.17, unit_vector(cylinder_vel[n][:, None]))
+
+        np.testing.assert_allclose(d[n], d_n.item(), rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose(cylinder_edge[n], cylinder_edge_n[:, 0], rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose(sphere_edge[n], sphere_edge_n[:, 0], rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose(normal[n], normal_n[:, 0], rtol=1e-12, atol=1e-15)
+
+
+def test_penetrations_accept_per_row_radii():
+    sphere_com, cylinder_bottom, cylinder_top, cylinder_vel = random_frames(20, seed=2)
+    radii: ndarray = np.linspace(0.01, 0.05, 20)
+
+    d, *_ = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, radii, 0.17)
+    for n in range(20):
+        d_n, *_ = compute_penetrations(sphere_com[n:n + 1], cylinder_bottom[n:n + 1], cylinder_top[n:n + 1],
+                                       cylinder_vel[n:n + 1], radii[n], 0.17)
+        np.testing.assert_allclose(d[n], d_n[0], rtol=1e-12)
@@ -0,0 +1,67 @@
+import numpy as np
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.contact_forces.identification import (IdentificationTrial, box_average, force_and_gradients,
+                                                         identify_parameters)
+from contact_model.parameters import ContactParameters
+
+R = 0.02
+
+
+def frames(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-0.002, 0.02, n), rng.uniform(-1.0, 1.0, n)
+
+
+def test_force_matches_batch_force():
+    x, x_dot = frames(200)
+    force, _ = force_and_gradients(x, x_dot, R, 2e6, 2.5, 50.0, 1e-8)
+    np.testing.assert_allclose(force, smooth_hunt_crossley_batch(x, x_dot, R, 2e6, 2.5, 50.0, 1e-8), rtol=1e-12)
+
+
+def test_gradients_match_finite_differences():
+    x, x_dot = frames(50)
+    params = np.array([2e6, 2.5, 50.0, 1e-6])
+    _, jacobian = force_and_gradients(x, x_dot, R, *params)
+
+    for i in range(4):
+        h = 1e-6 * params[i]
+        up, down = params.copy(), params.copy()
+        up[i] += h
+        down[i] -= h
+        fd = (force_and_gradients(x, x_dot, R, *up)[0] - force_and_gradients(x, x_dot, R, *down)[0]) / (2 * h)
+        np.testing.assert_allclose(jacobian[:, i], fd, rtol=1e-5, atol=1e-6 * np.abs(fd).max())
+
+
+def test_box_average():
+    time = np.linspace(0, 1, 2001)
+    new_time = np.linspace(0.1, 0.9, 81)
+
+    # linear signals average to their value at the window centre, columns are independent
+    values = np.column_stack([3 * time + 1, np.full_like(time, 2.0)])
+    np.testing.assert_allclose(box_average(time, values, new_time), np.column_stack([3 * new_time + 1,
+                                                                                      np.full(81, 2.0)]))
+
+    # sin averaged over a window of width w: sin(t) * sinc
+    w = new_time[1] - new_time[0]
+    expected = np.sin(new_time) * np.sin(w / 2) / (w / 2)
+    np.testing.assert_allclose(box_average(time, np.sin(time), new_time), expected, rtol=1e-6)
+
+
+def test_identification_recovers_parameters_per_group():
+    truth = {"P1": (2.0e6, 2.0), "P2": (3.5e6, 3.0)}
+    trials = []
+    for seed, (group, (k, c)) in enumerate(truth.items()):
+        for trial in range(2):
+            x, x_dot = frames(300, seed=10 * seed + trial)
+            force = smooth_hunt_crossley_batch(x, x_dot, R, k, c, 50.0, 1e-8)
+            trials.append(IdentificationTrial(x, x_dot, force, R, group))
+
+    result = identify_parameters(trials, ContactParameters(k=1e6, c=1.0), fit=("k", "c"))
+
+    assert result.converged.all()
+    for group, (k, c) in truth.items():
+        fitted = result.parameters(group)
+        np.testing.assert_allclose([fitted["k"], fitted["c"]], [k, c], rtol=1e-6)
+        assert fitted["bc"] == 50.0
+    assert result.contact_parameters("P2").k == result.parameters("P2")["k"]
+    np.testing.assert_allclose(result.rmse, 0, atol=1e-3)
@@ -0,0 +1,53 @@
+import numpy as np
+from contact_model.impact import (FINISHED, SEPARATED, STEP_UNDERFLOW, make_strikes, simulate_strikes)
+from contact_model.parameters import ContactParameters
+
+PARAMS = ContactParameters()
+
+
+def test_impulse_matches_momentum():
+    strikes = make_strikes(np.array([3.0, 6.0, 9.0]), 2.0, 40.0, PARAMS.k, PARAMS.c, height=np.array([0.0, 0.2, -0.3]))
+    result = simulate_strikes(strikes)
+
+    assert np.all(result.status == SEPARATED) and result.n_underflow == 0
+    bag_momentum = strikes.bag_mass[:, None] * result.bag_velocity
+    sphere_momentum = strikes.sphere_mass[:, None] * (result.rebound_velocity - strikes.sphere_vel)
+
+    # the normal is horizontal wherever the sphere is along the bag, and momentum is conserved
+    np.testing.assert_allclose(bag_momentum[:, 0], result.impulse, rtol=1e-6)
+    np.testing.assert_allclose(bag_momentum[:, 1:], 0, atol=1e-12)
+    np.testing.assert_allclose(bag_momentum + sphere_momentum, 0, atol=1e-9)
+
+
+def test_events_and_resampling():
+    strikes = make_strikes(np.array([[5.0], [8.0]]), 2.0, 40.0, np.array([PARAMS.k, 2 * PARAMS.k]), PARAMS.c)
+    result = simulate_strikes(strikes)
+
+    assert len(result) == 4
+    assert np.all(result.onset > 0) and np.all(result.duration > 0)
+    # faster strikes touch earlier and hit harder
+    assert np.all(result.onset[2:] < result.onset[:2]) and np.all(result.peak[2:] > result.peak[:2])
+
+    t, forces = result.resample(10000.0)
+    assert forces.shape == (4, len(t))
+    assert np.all(forces.max(axis=1) <= result.peak)
+    for i in range(4):
+        np.testing.assert_allclose(forces[i, 0], np.interp(result.onset[i], result.time[i], result.force[i]))
+
+
+def test_miss_finishes():
+    strikes = make_strikes(np.array([0.0, 1.0]), 2.0, 40.0, PARAMS.k, PARAMS.c, gap=0.5)
+    result = simulate_strikes(strikes, t_end=0.1)
+
+    np.testing.assert_array_equal(result.status, FINISHED)
+    assert np.all(np.isnan(result.onset))
+    np.testing.assert_array_equal(result.impulse, 0.0)
+
+
+def test_step_underflow_is_reported():
+    strikes = make_strikes(np.array([5.0, 0.0]), 2.0, 40.0, PARAMS.k, PARAMS.c)
+    result = simulate_strikes(strikes, t_end=0.2, h_max=1e-2, h_min=1e-3)
+
+    np.testing.assert_array_equal(result.status, [STEP_UNDERFLOW, FINISHED])
+    assert result.n_underflow == 1
+    np.testing.assert_array_equal(result.complete, [False, True])
@@ -0,0 +1,60 @@
+import numpy as np
+import tracemalloc
+from contact_model import instrumentation
+from contact_model.instrumentation import instrumented, profiling, stage
+
+
+@instrumented("test.allocate")
+def allocate(n: int) -> np.ndarray:
+    return np.ones(n)
+
+
+def test_disabled_records_nothing():
+    assert instrumentation.active() is None
+    with stage("test.stage"):
+        allocate(10)
+    assert instrumentation.active() is None
+
+
+def test_stages_and_calls_per_trial():
+    with profiling() as profiler:
+        with profiler.trial("P8"):
+            for _ in range(3):
+                with stage("test.stage"):
+                    allocate(10)
+
+    records = {(r["trial"], r["stage"]): r for r in profiler.to_records()}
+    assert records[("P8", "test.stage")]["calls"] == 3
+    assert records[("P8", "test.allocate")]["calls"] == 3
+    assert records[("P8", "test.allocate")]["net_bytes"] == 0
+    assert instrumentation.active() is None
+
+
+def test_memory_counts_numpy_buffers():
+    kept = []
+    with profiling(memory=True) as profiler:
+        with stage("test.keep"):
+            kept.append(allocate(10 ** 6))
+
+    assert not tracemalloc.is_tracing()
+    net_bytes: int = {r["stage"]: r["net_bytes"] for r in profiler.to_records()}["test.keep"]
+    assert net_bytes >= 8 * 10 ** 6
+
+
+def test_memory_counts_blocks():
+    kept = []
+    with profiling(memory=True) as profiler:
+        with stage("test.objects"):
+            kept.extend(object() for _ in range(1000))
+
+    net_blocks: int = {r["stage"]: r["net_blocks"] for r in profiler.to_records()}["test.objects"]
+    assert net_blocks >= 1000
+    assert "net blocks" in profiler.summary_table()
+
+
+def test_trace_events(tmp_path):
+    with profiling(trace=True) as profiler:
+        allocate(10)
+
+    profiler.write_trace(str(tmp_path / "trace.json"))
+    assert [event["name"] for event in profiler.events] == ["test.allocate"]
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+from contact_model import kinematics_cache
+from contact_model.kinematics import ContactKinematics
+from contact_model.kinematics_cache import KinematicsCache, cache_directory, cached_contact_kinematics
+from contact_model.parameters import ContactParameters
+
+
+def kinematics(frames: int, seed: int = 0) -> ContactKinematics:
+    rng = np.random.default_rng(seed)
+    vectors = [rng.standard_normal((frames, 3)) for _ in range(6)]
+    return ContactKinematics(*vectors, rng.standard_normal(frames), rng.standard_normal(frames))
+
+
+def test_round_trip(tmp_path):
+    cache = KinematicsCache(str(tmp_path))
+    kin = kinematics(20)
+    cache.put("a", kin)
+
+    assert "a" in cache
+    for expected, actual in zip(kin, cache.get("a")):
+        np.testing.assert_array_equal(actual, expected)
+    assert cache.get("b") is None
+
+
+def test_eviction_keeps_the_entry_just_written(tmp_path):
+    cache = KinematicsCache(str(tmp_path), max_bytes=1)
+    cache.put("a", kinematics(20))
+    cache.put("b", kinematics(20, seed=1))
+
+    assert "a" not in cache
+    assert "b" in cache
+
+
+def test_eviction_deletes_least_recently_used(tmp_path):
+    cache = KinematicsCache(str(tmp_path))
+    for i, key in enumerate("abc"):
+        cache.put(key, kinematics(20, seed=i))
+        os.utime(cache._path(key), (i, i))
+    cache.get("a")
+
+    entry_size: int = os.path.getsize(cache._path("a"))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+def test_no_directory_without_environment_variable(monkeypatch):
+    monkeypatch.delenv(kinematics_cache.CACHE_DIR_ENV, raising=False)
+    assert cache_directory("kinematics") is None
+
+
+def test_directory_from_environment_variable(monkeypatch, tmp_path):
+    monkeypatch.setenv(kinematics_cache.CACHE_DIR_ENV, str(tmp_path))
+    assert cache_directory("kinematics") == os.path.join(str(tmp_path), "kinematics")
+
+
+def test_cached_contact_kinematics_hits_without_opensim(tmp_path):
+    model_file = tmp_path / "model.osim"
+    states_file = tmp_path / "states.sto"
+    model_file.write_text("model")
+    states_file.write_text("states")
+
+    cache = KinematicsCache(str(tmp_path / "cache"))
+    kin = kinematics(5)
+    cache.put(cache.key(str(model_file), str(states_file), (-0.05, 0.015, 0.1), 0.05, 0.15), kin)
+
+    params = ContactParameters(sphere_loc=(-0.05, 0.015, 0.1), sphere_r=0.05, cylinder_r=0.15)
+    cached = cached_contact_kinematics(str(model_file), str(states_file), params=params, cache=cache)
+    np.testing.assert_array_equal(cached.penetration, kin.penetration)
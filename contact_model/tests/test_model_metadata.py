@@ -0,0 +1,66 @@
+import os
+import numpy as np
+from contact_model import model_metadata as metadata_module
+from contact_model.kinematics_cache import CACHE_DIR_ENV
+from contact_model.model_metadata import ModelMetadata, model_metadata
+
+MODEL_FILE: str = os.path.join(os.path.dirname(__file__), "osim_models", "punching_bag.osim")
+
+
+def test_fixture_metadata():
+    metadata = ModelMetadata.from_model_file(MODEL_FILE)
+
+    assert metadata.coordinate_names[:6] == [f"rclavicle_{q}" for q in ("rx", "ry", "rz", "tx", "ty", "tz")]
+    np.testing.assert_array_equal(metadata.coordinate_rotational, [True] * 3 + [False] * 3 + [True] * 3 + [False] * 3)
+    np.testing.assert_array_equal(metadata.coordinate_ranges[3], [-5, 5])
+    assert metadata.coordinate_paths()[0] == "/jointset/ground_rclavicle/rclavicle_rx"
+    assert metadata.mt_parameters.shape == (5, 0)
+
+    np.testing.assert_allclose(metadata.total_mass, 40.1561)
+    np.testing.assert_array_equal(metadata.bodies()["rclavicle"].mass_center, [-0.011096, 0.0063723, 0.054168])
+    markers = metadata.markers()
+    assert markers["cylinder_top"].body == "punching_bag"
+    np.testing.assert_array_equal(markers["cylinder_bottom"].location, [0, -0.5, 0])
+
+
+def test_snapshot_round_trip(tmp_path):
+    metadata = ModelMetadata.from_model_file(MODEL_FILE)
+    file_path = str(tmp_path / "snapshot.npz")
+    metadata.save(file_path)
+
+    loaded = ModelMetadata.load(file_path, MODEL_FILE)
+    assert loaded.model_hash == metadata.model_hash
+    for name, value in metadata.arrays.items():
+        np.testing.assert_array_equal(loaded.arrays[name], value)
+
+    assert ModelMetadata.load(str(tmp_path / "missing.npz"), MODEL_FILE) is None
+
+
+def test_nothing_written_without_a_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv(CACHE_DIR_ENV, raising=False)
+    monkeypatch.setattr(metadata_module, "_loaded", {})
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    assert model_metadata(MODEL_FILE).total_mass > 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_snapshot_in_cache_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(metadata_module, "_loaded", {})
+
+    metadata = model_metadata(MODEL_FILE)
+    assert os.listdir(str(tmp_path / "models")) == [f"{metadata.model_hash}.npz"]
+
+    # memoised in the process, then loaded from the snapshot
+    assert model_metadata(MODEL_FILE) is metadata
+    monkeypatch.setattr(metadata_module, "_loaded", {})
+    assert model_metadata(MODEL_FILE).marker_names == metadata.marker_names
+
+
+def test_to_mat(tmp_path):
+    from scipy.io import loadmat
+
+    ModelMetadata.from_model_file(MODEL_FILE).to_mat(str(tmp_path / "metadata.mat"))
+    data = loadmat(str(tmp_path / "metadata.mat"))
+    np.testing.assert_allclose(data["total_mass"], 40.1561)
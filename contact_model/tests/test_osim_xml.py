@@ -0,0 +1,84 @@
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+import pytest
+from utils.osim_xml import markers_from_root, read_markers
+
+MODEL_FILE: str = os.path.join(os.path.dirname(__file__), "osim_models", "punching_bag.osim")
+
+
+def model(markers: str, body_components: str = "", joint_frames: str = "") -> ET.Element:
+    return ET.fromstring(f"""
+    <OpenSimDocument Version="40000">
+        <Model name="m">
+            <ground><Ground name="ground" /></ground>
+            <BodySet name="bodyset"><objects>
+                <Body name="bag"><components>{body_components}</components></Body>
+            </objects></BodySet>
+            <JointSet name="jointset"><objects>
+                <WeldJoint name="weld">
+                    <socket_parent_frame>ground_offset</socket_parent_frame>
+                    <socket_child_frame>/bodyset/bag</socket_child_frame>
+                    <frames>{joint_frames}</frames>
+                </WeldJoint>
+            </objects></JointSet>
+            <MarkerSet name="markerset"><objects>{markers}</objects></MarkerSet>
+        </Model>
+    </OpenSimDocument>""")
+
+
+def marker(name: str, frame: str, location: str = "0.1 0.2 0.3") -> str:
+    return (f'<Marker name="{name}"><socket_parent_frame>{frame}</socket_parent_frame>'
+            f'<location>{location}</location></Marker>')
+
+
+def offset_frame(name: str, parent: str, translation: str, orientation: str) -> str:
+    return (f'<PhysicalOffsetFrame name="{name}"><socket_parent>{parent}</socket_parent>'
+            f'<translation>{translation}</translation><orientation>{orientation}</orientation></PhysicalOffsetFrame>')
+
+
+def test_fixture_markers():
+    markers = read_markers(MODEL_FILE)
+    assert markers["cylinder_top"].body == "punching_bag"
+    np.testing.assert_array_equal(markers["cylinder_top"].location, [0, 0.5, 0])
+    np.testing.assert_array_equal(markers["cylinder_bottom"].location, [0, -0.5, 0])
+
+
+def test_marker_on_body_and_3x_body_name():
+    root = model(marker("a", "/bodyset/bag") + '<Marker name="b"><body>bag</body><location>1 2 3</location></Marker>')
+    markers = markers_from_root(root)
+    assert markers["a"].body == "bag" and markers["b"].body == "bag"
+    np.testing.assert_array_equal(markers["b"].location, [1, 2, 3])
+
+
+def test_marker_on_offset_frame():
+    # 90 degrees about Z: offset x -> body y, offset y -> body -x
+    frame = offset_frame("handle", "..", "1 0 0", f"0 0 {np.pi / 2}")
+    markers = markers_from_root(model(marker("a", "/bodyset/bag/handle"), body_components=frame))
+
+    assert markers["a"].body == "bag"
+    np.testing.assert_allclose(markers["a"].location, [1 - 0.2, 0.1, 0.3], atol=1e-12)
+
+
+def test_marker_on_chained_offset_frames():
+    frames = (offset_frame("f1", "..", "0 1 0", f"{np.pi / 2} 0 0") +
+              offset_frame("f2", "/bodyset/bag/f1", "0 0 1", "0 0 0"))
+    markers = markers_from_root(model(marker("a", "/bodyset/bag/f2"), body_components=frames))
+
+    # f1 is rotated 90 degrees about X (z -> -y) and f2 is translated along z in f1
+    R = np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]])
+    np.testing.assert_allclose(markers["a"].location, R @ (np.array([0, 0, 1]) + [0.1, 0.2, 0.3]) + [0, 1, 0],
+                               atol=1e-12)
+
+
+def test_marker_on_ground_offset_frame():
+    frame = offset_frame("ground_offset", "/ground", "0 2 0", "0 0 0")
+    markers = markers_from_root(model(marker("a", "/jointset/weld/ground_offset"), joint_frames=frame))
+
+    assert markers["a"].body == "ground"
+    np.testing.assert_allclose(markers["a"].location, [0.1, 2.2, 0.3])
+
+
+def test_unknown_frame():
+    with pytest.raises(ValueError):
+        markers_from_root(model(marker("a", "/bodyset/bag/missing")))
@@ -0,0 +1,14 @@
+import numpy as np
+from contact_model.parameters import ContactParameters
+
+
+def test_parameters_are_hashable_keys():
+    cache = {ContactParameters(): 1, ContactParameters(sphere_r=0.03): 2}
+    assert cache[ContactParameters()] == 1
+    assert cache[ContactParameters(sphere_loc=(-0.05, 0.015, 0.1), sphere_r=0.03)] == 2
+
+
+def test_sphere_loc_normalises_to_array():
+    params = ContactParameters(sphere_loc=tuple(np.array([[-0.05], [0.015], [0.1]]).reshape(3)))
+    hash(params)
+    np.testing.assert_array_equal(np.asarray(params.sphere_loc).reshape(3), [-0.05, 0.015, 0.1])
@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pytest
+from contact_model.body_kinematics import BodyKinematicsContact
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.parameters import ContactParameters
+from contact_model.placement import (contact_onsets, evaluate_placements, grid_search, load_transforms,
+                                     offset_grid, onset_objective, optimize_placement,
+                                     transforms_from_body_kinematics)
+from utils.geometry import compute_effective_radius
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+@pytest.mark.filterwarnings("error")
+def test_contact_onsets():
+    time = np.arange(4.0)
+    penetration = np.array([[0.01, 0.02, -0.01, 0.01],     # in contact from the first frame
+                            [-0.01, -0.02, -0.01, 0.01],   # crosses halfway between frames 2 and 3
+                            [-0.01, 0.0, 0.0, -0.01],      # never penetrates
+                            [-0.1, -0.1, -0.1, -0.1]])     # constant: no division by d0 - d1 = 0
+    np.testing.assert_array_equal(contact_onsets(penetration, time), [0.0, 2.5, np.nan, np.nan])
+
+
+def test_placements_match_body_kinematics_contact(tmp_path):
+    transforms = transforms_from_body_kinematics(MODEL_FILE, POS_FILE, VEL_FILE)
+    transforms.save(str(tmp_path / "transforms.npz"))
+    transforms = load_transforms(str(tmp_path / "transforms.npz"))
+
+    offsets = np.array([[-0.05, 0.015, 0.1], [0.0, 0.0, 0.12], [-0.03, 0.02, 0.05]])
+    radii = np.array([0.025, 0.03, 0.04])
+    result = evaluate_placements(transforms, offsets, radii, max_elements=200)
+
+    for offset, radius, penetration, rate, force in zip(offsets, radii, result.penetration, result.penetration_rate,
+                                                        result.force):
+        params = ContactParameters(sphere_loc=tuple(offset), sphere_r=float(radius))
+        kin = BodyKinematicsContact(MODEL_FILE, params).evaluate(POS_FILE, VEL_FILE)
+        np.testing.assert_allclose(penetration, kin.penetration, atol=1e-12)
+        np.testing.assert_allclose(rate, kin.penetration_rate, atol=1e-10)
+        np.testing.assert_allclose(force, smooth_hunt_crossley_batch(
+            kin.penetration, kin.penetration_rate, compute_effective_radius(radius, params.cylinder_r), params.k,
+            params.c, params.bc, params.cf), rtol=1e-8, atol=1e-6)
+
+
+def test_searches_recover_the_onset_of_a_known_placement():
+    transforms = transforms_from_body_kinematics(MODEL_FILE, POS_FILE, VEL_FILE)
+    truth = np.array([-0.05, 0.015, 0.1])
+    observed = float(contact_onsets(evaluate_placements(transforms, truth, 0.025).penetration, transforms.time)[0])
+    objective = onset_objective(observed)
+
+    offsets = offset_grid(truth, 0.02, 5)
+    assert offsets.shape == (125, 3)
+    search = grid_search(transforms, offsets, [0.02, 0.025, 0.03], objective, max_elements=1000)
+    assert search.cost.shape == (125, 3)
+    assert search.best_cost < 1e-6
+
+    offset, radius, res = optimize_placement(transforms, objective, search.best_offset, search.best_radius,
+                                             options={"maxiter": 50})
+    assert res.fun <= search.best_cost
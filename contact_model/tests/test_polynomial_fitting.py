@@ -0,0 +1,59 @@
+import numpy as np
+from numpy import ndarray
+from utils.polynomial_fitting import (vandermonde, fit_least_squares, rmse, horner, monomial_exponents,
+                                      design_matrix, PolynomialApproximation)
+
+
+def test_high_degree_fit_matches_lstsq():
+    x: ndarray = np.linspace(-1, 1, 200)
+    y: ndarray = np.sin(3 * x) + np.exp(x)
+    x_mat: ndarray = vandermonde(x, 12)
+
+    expected: ndarray = np.linalg.lstsq(x_mat, y, rcond=None)[0]
+    error: ndarray = rmse(x_mat, y, fit_least_squares(x_mat, y))
+
+    np.testing.assert_allclose(error, np.sqrt(np.mean((x_mat @ expected - y) ** 2)), rtol=1e-6)
+    assert error[0] < 1e-7
+
+
+def test_masked_fits_match_lstsq_on_the_used_terms():
+    rng = np.random.default_rng(0)
+    x: ndarray = rng.uniform(-1, 1, (300, 3))
+    x_mat: ndarray = design_matrix(x, monomial_exponents(3, 3))
+    y: ndarray = rng.normal(0, 1, (300, 6)) + x_mat[:, :6]
+    mask: ndarray = rng.random((6, x_mat.shape[1])) > 0.4
+
+    coefficients: ndarray = fit_least_squares(x_mat, y, mask)
+    for m in range(6):
+        expected: ndarray = np.linalg.lstsq(x_mat[:, mask[m]], y[:, m], rcond=None)[0]
+        np.testing.assert_allclose(coefficients[m, mask[m]], expected, rtol=1e-8, atol=1e-10)
+        assert (coefficients[m, ~mask[m]] == 0).all()
+
+
+def test_horner_matches_polyval():
+    x: ndarray = np.linspace(-2, 2, 50)
+    coefficients: ndarray = np.random.default_rng(1).normal(0, 1, (4, 7))
+
+    np.testing.assert_allclose(horner(x, coefficients[0]), np.polyval(coefficients[0], x))
+    np.testing.assert_allclose(horner(x, coefficients), np.stack([np.polyval(c, x) for c in coefficients], axis=1))
+
+
+def test_approximation_recovers_polynomials_and_gradients():
+    rng = np.random.default_rng(2)
+    x: ndarray = rng.uniform(-1, 1, (400, 2))
+    y: ndarray = np.column_stack([1 + 2 * x[:, 0] - x[:, 0] * x[:, 1] ** 2, 0.5 * x[:, 1] ** 3])
+
+    approx = PolynomialApproximation.fit(x, y, degree=3, spanned=[[True, True], [False, True]], target_error=1e-9)
+    assert (approx.error < 1e-9).all()
+    assert approx.n_terms[1] == 1
+
+    x_new: ndarray = rng.uniform(-1, 1, (20, 2))
+    np.testing.assert_allclose(approx.evaluate(x_new)[:, 1], 0.5 * x_new[:, 1] ** 3, atol=1e-10)
+
+    h: float = 1e-6
+    grad: ndarray = approx.gradient(x_new)
+    for v in range(2):
+        e: ndarray = np.zeros(2)
+        e[v] = h
+        np.testing.assert_allclose(grad[:, :, v], (approx.evaluate(x_new + e) - approx.evaluate(x_new - e)) / (2 * h),
+                                   atol=1e-6)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pytest
+from contact_model.kinematics import ContactKinematics
+from contact_model.results_store import ResultsStore, export_external_loads
+from utils.sto_reader import read_sto_columns
+
+
+def chunk(start: int, frames: int):
+    rng = np.random.default_rng(start)
+    time = (start + np.arange(frames)) / 100.0
+    normal = rng.standard_normal((frames, 3))
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+    return dict(time=time, force=rng.uniform(0, 100, frames), penetration=rng.standard_normal(frames),
+                penetration_rate=rng.standard_normal(frames), contact_point=rng.standard_normal((frames, 3)),
+                normal=normal)
+
+
+def test_append_chunks_and_reopen(tmp_path):
+    directory = str(tmp_path / "results")
+    first, second = chunk(0, 10), chunk(10, 5)
+    with ResultsStore(directory) as store:
+        store.append("P8", **first)
+        store.append("P8", **second)
+        store.append("P9", **chunk(0, 3))
+        store.set_metadata("P8", model="model.osim", k=2300832.0)
+
+    with ResultsStore(directory, "r") as store:
+        assert store.trials() == ["P8", "P9"] and "P8" in store and len(store) == 2
+        data = store.read("P8", ["time", "normal"])
+        np.testing.assert_array_equal(data["time"], np.concatenate([first["time"], second["time"]]))
+        np.testing.assert_array_equal(data["normal"], np.concatenate([first["normal"], second["normal"]]))
+        assert store.metadata("P8") == {"model": "model.osim", "k": 2300832.0}
+        assert store.metadata("P9") == {}
+
+        with pytest.raises(ValueError):
+            store.append("P8", **first)
+        with pytest.raises(KeyError):
+            store.read("P8", ["missing"])
+
+
+def test_appending_never_rewrites_stored_chunks(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append("P8", **chunk(0, 10))
+    first_chunk = os.path.join(str(tmp_path), "P8", "000000.npz")
+    stat = os.stat(first_chunk)
+
+    store.append("P8", **chunk(10, 10))
+    assert os.stat(first_chunk).st_mtime_ns == stat.st_mtime_ns
+    assert not [name for name in os.listdir(os.path.join(str(tmp_path), "P8")) if name.endswith(".tmp")]
+
+
+def test_interrupted_write_keeps_the_store_readable(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append("P8", **chunk(0, 10))
+
+    # a writer killed while writing its chunk leaves a temporary file behind, never a partial chunk
+    with open(os.path.join(str(tmp_path), "P8", "000001.npz.1234.tmp"), "wb") as f:
+        f.write(b"partial")
+
+    data = ResultsStore(str(tmp_path), "r").read("P8")
+    assert len(data["time"]) == 10
+
+
+def test_chunk_validation(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append("P8", **chunk(0, 10))
+
+    with pytest.raises(ValueError):
+        store.append("P8", time=np.arange(3.0))
+    with pytest.raises(ValueError):
+        store.append("P9", time=np.arange(3.0), force=np.arange(4.0))
+    with pytest.raises(ValueError):
+        store.append("P9", time=np.arange(3.0), normal=np.zeros((3, 2)))
+    with pytest.raises(ValueError):
+        store.append("../P9", time=np.arange(3.0))
+    with pytest.raises(FileNotFoundError):
+        ResultsStore(str(tmp_path / "missing"), "r")
+
+
+def test_export_external_loads(tmp_path):
+    frames = 11
+    normal = np.tile([1.0, 0.0, 0.0], (frames, 1))
+    kin = ContactKinematics(*(np.zeros((frames, 3)) for _ in range(3)), np.ones((frames, 3)), np.zeros((frames, 3)),
+                            normal, np.zeros(frames), np.zeros(frames))
+    store = ResultsStore(str(tmp_path / "results"))
+    store.append_kinematics("P8", np.linspace(0, 0.1, frames), kin, np.linspace(0, 10, frames))
+
+    mot_file, = export_external_loads(store, str(tmp_path / "grf"), rate=200.0)
+    assert os.path.exists(mot_file.replace(".mot", ".xml"))
+
+    data, _ = read_sto_columns(mot_file, ["time", "contact_vx", "contact_vy", "contact_px"], cache=False)
+    assert len(data) == 21
+    np.testing.assert_allclose(data[:, 1], -np.linspace(0, 10, 21), atol=1e-6)
+    np.testing.assert_allclose(data[:, 2], 0)
+    np.testing.assert_allclose(data[:, 3], 1)
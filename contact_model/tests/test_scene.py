@@ -0,0 +1,41 @@
+import numpy as np
+from numpy import ndarray
+from utils.geometry import compute_penetrations
+from contact_model.scene import ContactScene, SceneSamples
+
+
+def scene_samples(T: int = 40) -> SceneSamples:
+    rng = np.random.default_rng(0)
+    x: ndarray = np.linspace(-0.4, 0.1, T)
+
+    # sphere 0 moves into cylinder 0 (at the origin), sphere 1 stays far from both cylinders
+    sphere_centre: ndarray = np.stack([np.column_stack([x, np.full(T, 0.5), np.zeros(T)]),
+                                       np.tile([5.0, 0.5, 5.0], (T, 1))], axis=1)
+    cylinder_bottom: ndarray = np.stack([np.zeros((T, 3)), np.tile([-3.0, 0.0, 0.0], (T, 1))], axis=1)
+    cylinder_top: ndarray = cylinder_bottom + [0.0, 1.0, 0.0]
+
+    return SceneSamples(sphere_centre, sphere_centre, rng.normal(0, 1, (T, 2, 3)), rng.normal(0, 1, (T, 2, 3)),
+                        cylinder_bottom, cylinder_top, np.tile([-1.0, 0.0, 0.0], (T, 2, 1)), cylinder_bottom,
+                        rng.normal(0, 1, (T, 2, 3)), rng.normal(0, 1, (T, 2, 3)))
+
+
+def test_broad_phase_culls_distant_pairs():
+    scene = ContactScene().add_sphere("fist", "hand_r", [0, 0, 0], 0.025).add_sphere("far", "hand_l", [0, 0, 0], 0.025)
+    scene.add_cylinder("bag", "bottom", "top", 0.17).add_cylinder("other_bag", "bottom_2", "top_2", 0.17)
+
+    result = scene.evaluate(scene_samples(), 2300832.0, 2.5)
+    assert list(result.pairs) == [("fist", "bag")]
+    assert result.n_narrow < result.n_checks
+
+
+def test_narrow_phase_matches_geometry_kernel():
+    samples: SceneSamples = scene_samples()
+    scene = ContactScene().add_sphere("fist", "hand_r", [0, 0, 0], 0.025).add_cylinder("bag", "bottom", "top", 0.17)
+
+    pair = scene.evaluate(samples, 2300832.0, 2.5).pairs[("fist", "bag")]
+    frames: ndarray = pair.frames
+    d, *_ = compute_penetrations(samples.sphere_centre[frames, 0], samples.cylinder_bottom[frames, 0],
+                                 samples.cylinder_top[frames, 0], samples.cylinder_vel[frames, 0], 0.025, 0.17)
+
+    np.testing.assert_allclose(pair.penetration[frames], d)
+    assert (pair.force[np.setdiff1d(np.arange(len(samples.sphere_centre)), frames)] == 0).all()
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+from contact_model.body_kinematics import BodyKinematicsContact
+from contact_model.parameters import ContactParameters
+from contact_model.screening import contact_windows, gap_lower_bounds, screen_trial
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+def test_contact_windows():
+    candidates = np.zeros(20, dtype=bool)
+    candidates[[3, 4, 10, 19]] = True
+
+    assert contact_windows(candidates, pad=0) == [(3, 5), (10, 11), (19, 20)]
+    assert contact_windows(candidates, pad=2) == [(1, 7), (8, 13), (17, 20)]
+    assert contact_windows(candidates, pad=3) == [(0, 14), (16, 20)]
+    assert contact_windows(np.zeros(5, dtype=bool)) == []
+
+
+def test_bound_without_orientation_is_a_lower_bound():
+    params = ContactParameters()
+    loose = gap_lower_bounds(POS_FILE, MODEL_FILE, params)
+    exact = gap_lower_bounds(POS_FILE, MODEL_FILE, params, use_orientation=True)
+
+    assert loose.shape == exact.shape == (121, )
+    assert np.all(loose <= exact + 1e-12)
+    assert exact.min() < 0
+
+
+def test_screen_keeps_every_contact_frame():
+    params = ContactParameters()
+    indices, report = screen_trial(POS_FILE, MODEL_FILE, params)
+    kin = BodyKinematicsContact(MODEL_FILE, params).evaluate(POS_FILE, VEL_FILE)
+
+    assert report.n_frames == 121 and report.n_candidates == len(indices)
+    assert set(np.flatnonzero(kin.penetration > 0)) <= set(indices.tolist())
+    assert 0 < report.skipped_fraction < 1
+    assert "frames skipped" in str(report)
+
+
+def test_far_sphere_screens_everything_out():
+    params = ContactParameters(sphere_loc=(10.0, 0.0, 0.0))
+    indices, report = screen_trial(POS_FILE, MODEL_FILE, params, use_orientation=True)
+
+    assert len(indices) == 0 and report.windows == []
+    assert report.skipped_fraction == 1.0
@@ -0,0 +1,88 @@
+import numpy as np
+from contact_model.body_kinematics import BodyTrajectory
+from contact_model.parameters import ContactParameters
+from contact_model.sdf import (MeshContact, SignedDistanceField, closest_points_on_triangles, mesh_signed_distances,
+                               winding_numbers)
+
+# unit cube [-0.5, 0.5]^3, 12 triangles (orientation irrelevant for the winding number test)
+VERTICES = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+FACES = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                  [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+
+
+def box_distance(points: np.ndarray) -> np.ndarray:
+    q = np.abs(points) - 0.5
+    return np.linalg.norm(np.maximum(q, 0), axis=1) + np.minimum(q.max(axis=1), 0)
+
+
+def random_points(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-1, 1, (n, 3))
+
+
+def test_closest_points_brute_force():
+    points = random_points(20)
+    a, b, c = VERTICES[FACES[:, 0]], VERTICES[FACES[:, 1]], VERTICES[FACES[:, 2]]
+    closest = closest_points_on_triangles(points, a, b, c)
+
+    # no point of a triangle (dense barycentric sampling) is closer than the closest point
+    uv = np.array([(u, v) for u in np.linspace(0, 1, 21) for v in np.linspace(0, 1, 21) if u + v <= 1])
+    for f in range(len(FACES)):
+        samples = a[f] + uv[:, :1] * (b[f] - a[f]) + uv[:, 1:] * (c[f] - a[f])
+        brute = np.linalg.norm(points[:, None, :] - samples[None], axis=-1).min(axis=1)
+        exact = np.linalg.norm(points - closest[:, f], axis=1)
+        assert np.all(exact <= brute + 1e-12)
+
+
+def test_winding_numbers():
+    inside = random_points(50) * 0.45
+    outside = random_points(100) * 2
+    outside = outside[box_distance(outside) > 0.05]
+    a, b, c = VERTICES[FACES[:, 0]], VERTICES[FACES[:, 1]], VERTICES[FACES[:, 2]]
+
+    np.testing.assert_allclose(np.abs(winding_numbers(inside, a, b, c)), 1, atol=1e-9)
+    np.testing.assert_allclose(winding_numbers(outside, a, b, c), 0, atol=1e-9)
+
+
+def test_signed_distances_of_a_cube():
+    points = random_points(500)
+    distance, gradient = mesh_signed_distances(points, VERTICES, FACES, max_elements=1000)
+
+    np.testing.assert_allclose(distance, box_distance(points), atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(gradient, axis=1), 1)
+
+
+def test_grid_lookup(tmp_path):
+    sdf = SignedDistanceField.bake(VERTICES, FACES, padding=0.2, resolution=41)
+    sdf.save(str(tmp_path / "cube.sdf.npz"))
+    sdf = SignedDistanceField.load(str(tmp_path / "cube.sdf.npz"))
+
+    # trilinear interpolation of a field that is piecewise linear away from the edges
+    points = random_points(200) * 0.65
+    distance, _ = sdf.lookup(points)
+    np.testing.assert_allclose(distance, box_distance(points), atol=0.02)
+
+    # sphere centres above the top face: normal +y, penetration r - (y - 0.5)
+    centres = np.column_stack([np.zeros(5), np.linspace(0.52, 0.6, 5), np.zeros(5)])
+    d, n = sdf.penetrations(centres, 0.05)
+    np.testing.assert_allclose(d, 0.05 - (centres[:, 1] - 0.5), atol=1e-9)
+    np.testing.assert_allclose(n, np.tile([0, 1, 0], (5, 1)), atol=1e-9)
+
+
+def test_mesh_contact_in_ground():
+    sdf = SignedDistanceField.bake(VERTICES, FACES, padding=0.2, resolution=41)
+    params = ContactParameters(sphere_loc=(0, 0, 0), sphere_r=0.05)
+    contact = MeshContact(sdf, np.zeros(3), np.zeros(3), params)
+
+    # cube turned 90 degrees about x, sphere coming down onto it along -z in ground at 1 m/s
+    T = 5
+    R = np.tile([[1, 0, 0], [0, 0, -1], [0, 1, 0]], (T, 1, 1)).astype(float)
+    mesh = BodyTrajectory(np.zeros((T, 3)), R, np.zeros((T, 3)), np.zeros((T, 3)))
+    z = np.linspace(0.6, 0.52, T)
+    sphere = BodyTrajectory(np.column_stack([np.zeros(T), np.zeros(T), z]), np.tile(np.eye(3), (T, 1, 1)),
+                            np.tile([0, 0, -1.0], (T, 1)), np.zeros((T, 3)))
+
+    kin = contact.evaluate_trajectories(sphere, mesh)
+    np.testing.assert_allclose(kin.penetration, 0.05 - (z - 0.5), atol=1e-9)
+    np.testing.assert_allclose(kin.normal, np.tile([0, 0, 1], (T, 1)), atol=1e-9)
+    np.testing.assert_allclose(kin.penetration_rate, 1.0, atol=1e-9)
+    assert np.all(contact.forces(kin)[kin.penetration > 0] > 0)
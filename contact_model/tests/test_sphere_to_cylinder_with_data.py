@@ -1,9 +1,13 @@
 import os
 from numpy import ndarray, array, concatenate, zeros, ones, linspace, float64
 from pandas import Series, DataFrame
-from opensim import Model, Coordinate, Body
+from opensim import Model, Body
 from contact_model.sphere_to_cylinder import compute_x_and_x_dot
+from contact_model.state_replay import StateReplay
+from contact_model.screening import screen_trial
+from contact_model.parameters import ContactParameters
 from contact_model.contact_forces.smooth_forces import smooth_hunt_crossley
+from contact_model.instrumentation import stage
 from osim_utils.read import readStoFile
 from utils.geometry import compute_effective_radius
 from utils.polynomials import fit_cubic, cubic
@@ -15,7 +19,8 @@ import matplotlib.pyplot as plt
 # ----------------------------------------------------------------------------------------------------------------------
 # Load .osim Model and get CoordinateSet and BodySet
 # ----------------------------------------------------------------------------------------------------------------------
-model = Model(r"osim_models\modifiedWrapping_pb.osim")
+model_file: str = r"osim_models\modifiedWrapping_pb.osim"
+model = Model(model_file)
 
 s = model.initSystem()
 coordinateSet = model.getCoordinateSet()
@@ -27,13 +32,10 @@ bodySet = model.getBodySet()
 velData = readStoFile(r"files/P8_BodyKinematics_vel_global.sto")
 
 stateFileName: str = f"files/P8_StatesReporter_states.sto"
-stateData: DataFrame = readStoFile(stateFileName)
+replay: StateReplay = StateReplay(model, stateFileName, s)
 
-time = stateData["time"]
+time: ndarray = replay.time
 T: int = len(time)   # period
-coordinates = stateData.iloc[:, 1::2]
-speeds = stateData.iloc[:, 2::2]
-t_flags = ["tx", "ty", "tz", "t1", "t2", "t3"]
 
 # sphere location in local clavicle reference frame
 sphere_loc: ndarray = array([[-0.05], [0.015], [0.1]])
@@ -59,31 +61,33 @@ c: float = 2.5
 force_arr: ndarray = zeros((T, ), dtype=float64)
 x_arr: ndarray = zeros((T, ), dtype=float64)
 # ----------------------------------------------------------------------------------------------------------------------
-# Double loop: 1) loop through time, 2) at each time point, loop through the coordinate set, read the coordinate value
-# from the IK output and assign that value to the model coordinate
+# Screening: only the frames where the sphere can be near the bag (from the BodyKinematics positions) go through OpenSim.
+# The other frames keep 0 force.
 # ----------------------------------------------------------------------------------------------------------------------
-for n in range(T):
-    print(f"Frame number: {n}")
-    for i, coord in enumerate(coordinateSet):
-        coordName: str = coordinates.columns[i].split("/")[-2]
-        coordValue: float = float(coordinates.iloc[n, i])
-        speedValue: float = float(speeds.iloc[n, i])
-        coordinate: Coordinate = model.getCoordinateSet().get(i)
-        coordinate.setValue(s, coordValue)
-        coordinate.setSpeedValue(s, speedValue)
+params: ContactParameters = ContactParameters(sphere_loc=tuple(sphere_loc.reshape(3)), sphere_r=sphere_r,
+                                              cylinder_r=cylinder_r, k=k, c=c)
+contact_frames, report = screen_trial(r"files/P8_BodyKinematics_pos_global.sto", model_file, params)
+print(report)
 
-    model.realizeVelocity(s)
-    clavicleBody: Body = bodySet.get("rclavicle")
+# ----------------------------------------------------------------------------------------------------------------------
+# Loop through the contact frames: the replay sets all the coordinate values and speeds of the frame at once (columns
+# are matched to the model coordinates by name) and realizes the state to velocity.
+# ----------------------------------------------------------------------------------------------------------------------
+clavicleBody: Body = bodySet.get("rclavicle")
+
+for n, s in replay.frames(contact_frames):
+    print(f"Frame number: {n}")
 
     d, vel = compute_x_and_x_dot(model, sphere_loc, cylinderVel[n][:, None], clavicleBody, sphere_r, cylinder_r, s)
 
-    x_arr[n] = n
+    x_arr[n] = d
 
     print(f"Penetration: {d}")
     print(f"Velocity: {vel}")
 
     R: float = compute_effective_radius(sphere_r, cylinder_r)
-    force = smooth_hunt_crossley(d, vel, R, k, c)
+    with stage("force.smooth_hunt_crossley"):
+        force = smooth_hunt_crossley(d, vel, R, k, c)
     force_arr[n] = force
 
     print(f"Scalar force: {force}")
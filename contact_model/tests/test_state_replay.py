@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("opensim")
+
+from opensim import Model
+from contact_model.state_replay import StateReplay
+from utils.sto_reader import read_sto_columns, write_sto
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+STATES_FILE: str = os.path.join(TESTS_DIR, "files", "P8_StatesReporter_states.sto")
+
+
+def test_every_state_variable_is_matched(fixture_states):
+    replay = StateReplay(Model(MODEL_FILE), fixture_states)
+    assert replay.missing == []
+    assert len(replay) == 121
+    assert replay.coordinate_names[0] == "rclavicle_rx"
+
+
+def test_frames_set_values_and_speeds(fixture_states):
+    model = Model(MODEL_FILE)
+    replay = StateReplay(model, fixture_states)
+    column = "/jointset/ground_punching_bag/punching_bag_ty"
+    data, _ = read_sto_columns(fixture_states, ["time", f"{column}/value", f"{column}/speed"])
+
+    np.testing.assert_array_equal(replay.time, data[:, 0])
+    np.testing.assert_array_equal(replay.column("punching_bag_ty"), data[:, 1])
+    np.testing.assert_array_equal(replay.column("punching_bag_ty", speed=True), data[:, 2])
+
+    coordinate = model.getCoordinateSet().get("punching_bag_ty")
+    for n, s in replay.frames([0, 50, 120]):
+        assert s.getTime() == data[n, 0]
+        assert coordinate.getValue(s) == data[n, 1]
+        assert coordinate.getSpeedValue(s) == data[n, 2]
+
+
+def test_plain_coordinate_names_and_unset_variables(tmp_path):
+    # IK-style file: plain coordinate names, in degrees, only some of the coordinates
+    time = np.linspace(0, 1, 5)
+    ik_file = str(tmp_path / "ik.mot")
+    write_sto(ik_file, np.column_stack([time, np.full(5, 90.0), np.full(5, 0.3)]),
+              ["time", "punching_bag_ry", "punching_bag_tx"], in_degrees=True)
+
+    replay = StateReplay(Model(MODEL_FILE), ik_file)
+    np.testing.assert_allclose(replay.column("punching_bag_ry"), np.pi / 2)
+    np.testing.assert_allclose(replay.column("punching_bag_tx"), 0.3)
+    np.testing.assert_array_equal(replay.column("rclavicle_tx"), 0.0)
+    assert "/jointset/ground_rclavicle/rclavicle_tx/value" in replay.missing
+
+
+def test_states_reporter_file(tmp_path):
+    # the P8 StatesReporter output, on the fixture model with the bag joint renamed as in the P8 model
+    with open(MODEL_FILE) as f:
+        xml = f.read().replace('name="ground_punching_bag"', 'name="customJointPunchBag"')
+    for axis, coordinate in zip(("rx", "ry", "rz", "tx", "ty", "tz"),
+                                ("rotX", "rotY", "rotZ", "tx", "ty", "tz")):
+        xml = xml.replace(f'name="punching_bag_{axis}"', f'name="global_{coordinate}"')
+
+    model_file = str(tmp_path / "punching_bag_p8.osim")
+    with open(model_file, "w") as f:
+        f.write(xml)
+
+    model = Model(model_file)
+    replay = StateReplay(model, STATES_FILE)
+    assert len(replay) == 121
+    assert len(replay.missing) == 12 and all("ground_rclavicle" in name for name in replay.missing)
+
+    columns = [f"/jointset/customJointPunchBag/global_{c}/{v}" for c in ("rotZ", "tx") for v in ("value", "speed")]
+    data, _ = read_sto_columns(STATES_FILE, ["time"] + columns)
+    np.testing.assert_array_equal(replay.time, data[:, 0])
+    np.testing.assert_array_equal(replay.column("global_rotZ"), data[:, 1])
+    np.testing.assert_array_equal(replay.column("global_tx", speed=True), data[:, 4])
+
+    rot_z = model.getCoordinateSet().get("global_rotZ")
+    tx = model.getCoordinateSet().get("global_tx")
+    for n, s in replay.frames([0, 60, 120]):
+        assert rot_z.getValue(s) == data[n, 1] and rot_z.getSpeedValue(s) == data[n, 2]
+        assert tx.getValue(s) == data[n, 3] and tx.getSpeedValue(s) == data[n, 4]
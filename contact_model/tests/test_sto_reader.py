@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from numpy import ndarray
+from utils import sto_reader
+from utils.sto_reader import read_sto_header, read_sto_columns, sidecar_path, write_sto
+
+
+@pytest.fixture
+def sto_file(tmp_path) -> str:
+    data: ndarray = np.column_stack([np.linspace(0, 1, 11), np.arange(11.0), np.full(11, 90.0), np.full(11, 2.0)])
+    file_path: str = str(tmp_path / "trial.mot")
+    write_sto(file_path, data, ["time", "pelvis_tilt", "elbow_flex", "pelvis_tx"], in_degrees=True)
+    return file_path
+
+
+def test_header(sto_file):
+    header = read_sto_header(sto_file)
+    assert (header.n_rows, header.n_columns, header.in_degrees) == (11, 4, True)
+    assert header.columns == ["time", "pelvis_tilt", "elbow_flex", "pelvis_tx"]
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_selected_columns_in_order(sto_file, cache):
+    data, columns = read_sto_columns(sto_file, ["elbow_flex", "time", "elbow_flex"], cache=cache)
+    assert columns == ["elbow_flex", "time", "elbow_flex"]
+    assert data.flags.c_contiguous
+    np.testing.assert_array_equal(data[:, 0], 90.0)
+    np.testing.assert_allclose(data[:, 1], np.linspace(0, 1, 11))
+    np.testing.assert_array_equal(data[:, 2], 90.0)
+
+
+def test_to_radians_skips_translations(sto_file):
+    data, _ = read_sto_columns(sto_file, ["elbow_flex", "pelvis_tx"], to_radians=True)
+    np.testing.assert_allclose(data[:, 0], np.pi / 2)
+    np.testing.assert_array_equal(data[:, 1], 2.0)
+
+
+def test_missing_column(sto_file):
+    with pytest.raises(KeyError):
+        read_sto_columns(sto_file, ["time", "knee_angle_r"])
+
+
+def test_sidecar_is_reused_and_invalidated(sto_file):
+    read_sto_columns(sto_file)
+    first: str = sidecar_path(sto_file)
+    assert os.path.exists(first)
+
+    # same content but different size: the sidecar is not reused, and the stale one is removed
+    data, columns = read_sto_columns(sto_file)
+    write_sto(sto_file, data * 2, columns, in_degrees=True)
+    new_data, _ = read_sto_columns(sto_file)
+
+    np.testing.assert_allclose(new_data, data * 2)
+    assert not os.path.exists(first) or sidecar_path(sto_file) == first
+    assert os.path.exists(sidecar_path(sto_file))
+
+
+def test_unwritable_sidecar_falls_back(sto_file, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(sto_reader.os, "replace", fail)
+    data, _ = read_sto_columns(sto_file, ["time"])
+
+    np.testing.assert_allclose(data[:, 0], np.linspace(0, 1, 11))
+    assert not os.path.exists(sidecar_path(sto_file))
+    assert not [name for name in os.listdir(os.path.dirname(sto_file)) if name.endswith(".tmp")]
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from contact_model.body_kinematics import BodyKinematicsContact
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.parameters import ContactParameters
+from contact_model.streaming import (RingBuffer, StreamingContactEstimator, BodyPoseEvaluator, StateEvaluator,
+                                     backward_derivative, replay_body_kinematics, areplay_body_kinematics)
+from utils.geometry import compute_effective_radius
+
+TESTS_DIR: str = os.path.dirname(__file__)
+MODEL_FILE: str = os.path.join(TESTS_DIR, "osim_models", "punching_bag.osim")
+POS_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_pos_global.sto")
+VEL_FILE: str = os.path.join(TESTS_DIR, "files", "P8_BodyKinematics_vel_global.sto")
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(3, 1)
+    for i in range(5):
+        buffer.append(i)
+
+    assert len(buffer) == 3 and buffer.count == 5
+    assert buffer[0][0] == 4 and buffer[2][0] == 2
+    np.testing.assert_array_equal(buffer.values()[:, 0], [2, 3, 4])
+
+
+def test_backward_derivative_exact_on_quadratics():
+    t = [0.3, 0.25, 0.1]
+    f = [2 * x ** 2 - x + 1 for x in t]
+    assert np.isclose(backward_derivative(t, f), 4 * 0.3 - 1)
+    assert np.isclose(backward_derivative(t[:2], f[:2]), (f[0] - f[1]) / (t[0] - t[1]))
+
+
+def test_stream_matches_batch():
+    params = ContactParameters()
+    contact = BodyKinematicsContact(MODEL_FILE, params)
+    kin = contact.evaluate(POS_FILE, VEL_FILE)
+
+    estimator = StreamingContactEstimator(BodyPoseEvaluator(contact), params, capacity=16)
+    samples = list(estimator.stream(replay_body_kinematics(POS_FILE, VEL_FILE)))
+
+    force = smooth_hunt_crossley_batch(kin.penetration, kin.penetration_rate,
+                                       compute_effective_radius(params.sphere_r, params.cylinder_r), params.k,
+                                       params.c, params.bc, params.cf)
+    np.testing.assert_allclose([s.penetration for s in samples], kin.penetration, atol=1e-12)
+    np.testing.assert_allclose([s.penetration_rate for s in samples], kin.penetration_rate, atol=1e-12)
+    np.testing.assert_allclose([s.force for s in samples], force, rtol=1e-10, atol=1e-9)
+    assert not any(s.rate_estimated for s in samples)
+
+    stats = estimator.latency_stats()
+    assert stats["frames"] == len(samples)
+    assert len(estimator.latency) == 16
+
+
+def test_estimated_rate_without_velocities():
+    contact = BodyKinematicsContact(MODEL_FILE)
+    kin = contact.evaluate(POS_FILE, VEL_FILE)
+
+    estimator = StreamingContactEstimator(BodyPoseEvaluator(contact))
+    samples = list(estimator.stream(replay_body_kinematics(POS_FILE)))
+    assert all(s.rate_estimated for s in samples)
+
+    # away from the first frames, the backward difference of the penetration follows the exact rate
+    rate = np.array([s.penetration_rate for s in samples])
+    in_contact = kin.penetration > 0
+    error = np.abs(rate - kin.penetration_rate)[in_contact]
+    assert np.median(error) < 0.1 * np.abs(kin.penetration_rate[in_contact]).max()
+
+
+def test_async_stream_matches_sync():
+    contact = BodyKinematicsContact(MODEL_FILE)
+
+    async def collect():
+        estimator = StreamingContactEstimator(BodyPoseEvaluator(contact))
+        return [s async for s in estimator.astream(areplay_body_kinematics(POS_FILE, VEL_FILE, realtime=False))]
+
+    samples = asyncio.run(collect())
+    expected = list(StreamingContactEstimator(BodyPoseEvaluator(contact)).stream(
+        replay_body_kinematics(POS_FILE, VEL_FILE)))
+    np.testing.assert_array_equal([s.force for s in samples], [s.force for s in expected])
+
+
+def test_state_evaluator_without_speeds(fixture_states):
+    pytest.importorskip("opensim")
+    from opensim import Model
+    from contact_model.sphere_to_cylinder import ContactPair
+    from contact_model.state_replay import StateReplay
+
+    params = ContactParameters()
+
+    def stream(with_speeds: bool):
+        model = Model(MODEL_FILE)
+        replay = StateReplay(model, fixture_states)
+        pair = ContactPair(model, params.sphere_loc, params.sphere_r, params.cylinder_r)
+        estimator = StreamingContactEstimator(StateEvaluator(model, pair, replay.coordinate_names), params)
+        frames = ((t, (values, speeds if with_speeds else None))
+                  for t, values, speeds in zip(replay.time, replay.values, replay.speeds))
+        return list(estimator.stream(frames))
+
+    exact = stream(True)
+    estimated = stream(False)
+    assert all(s.rate_estimated for s in estimated) and not any(s.rate_estimated for s in exact)
+
+    # the penetration doesn't depend on where the cylinder velocity comes from
+    penetration = np.array([s.penetration for s in exact])
+    np.testing.assert_allclose([s.penetration for s in estimated], penetration, atol=1e-12)
+    assert (penetration <= 0).any()
+
+    in_contact = penetration > 0
+    rate = np.array([s.penetration_rate for s in exact])
+    error = np.abs(np.array([s.penetration_rate for s in estimated]) - rate)[in_contact]
+    assert np.median(error) < 0.1 * np.abs(rate[in_contact]).max()
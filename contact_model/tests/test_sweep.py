@@ -0,0 +1,46 @@
+import numpy as np
+from numpy import ndarray
+from contact_model.contact_forces.smooth_forces import smooth_hunt_crossley
+from contact_model.contact_forces.sweep import sweep_contact_parameters, trapezoid_weights
+
+
+def trial():
+    time: ndarray = np.linspace(0, 0.2, 81)
+    x: ndarray = 0.01 * np.sin(np.pi * time / 0.2) - 0.002
+    x_dot: ndarray = 0.01 * np.pi / 0.2 * np.cos(np.pi * time / 0.2)
+    return time, x, x_dot
+
+
+def test_trapezoid_weights():
+    time: ndarray = np.sort(np.random.default_rng(0).uniform(0, 1, 30))
+    values: ndarray = np.sin(time)
+    np.testing.assert_allclose(values @ trapezoid_weights(time), np.trapezoid(values, time))
+
+
+def test_sweep_matches_scalar_force():
+    time, x, x_dot = trial()
+    k, c, R = [1e5, 2300832.0], [1.0, 2.5, 4.0], [0.02, 0.022]
+
+    for max_elements in (2 ** 22, 100):
+        result = sweep_contact_parameters(x, x_dot, time, k, c, R, max_elements=max_elements)
+        assert result.forces.shape == (12, 81)
+        assert result.grid_shape == (2, 3, 1, 1, 2)
+
+        for p in range(len(result)):
+            values = result.parameters(p)
+            expected: ndarray = np.array([smooth_hunt_crossley(a, b, values["R"], values["k"], values["c"])
+                                          for a, b in zip(x, x_dot)])
+            np.testing.assert_allclose(result.forces[p], expected, rtol=1e-10, atol=1e-9)
+            np.testing.assert_allclose(result.peak[p], expected.max(), rtol=1e-10)
+            np.testing.assert_allclose(result.impulse[p], np.trapezoid(expected, time), rtol=1e-10)
+
+
+def test_sweep_metrics_without_forces():
+    time, x, x_dot = trial()
+    kept = sweep_contact_parameters(x, x_dot, time, [1e5, 1e6], [2.5], [0.02])
+    dropped = sweep_contact_parameters(x, x_dot, time, [1e5, 1e6], [2.5], [0.02], keep_forces=False, max_elements=81)
+
+    assert dropped.forces is None
+    np.testing.assert_allclose(dropped.peak, kept.peak)
+    np.testing.assert_allclose(dropped.impulse, kept.impulse)
+    np.testing.assert_allclose(dropped.duration, kept.duration)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from numpy import ndarray
+from contact_model.contact_forces.batch_forces import smooth_hunt_crossley_batch
+from contact_model.symbolic import penetration_expr, smooth_hunt_crossley_expr
+from utils.geometry import compute_penetrations
+
+casadi = pytest.importorskip("casadi")
+
+from contact_model.symbolic import check_against_numpy, force_jacobian_function, geometry_jacobian_function
+
+
+def test_numpy_expressions_match_numpy_kernels():
+    rng = np.random.default_rng(0)
+    x: ndarray = rng.uniform(-0.01, 0.01, 200)
+    x_dot: ndarray = rng.uniform(-2, 2, 200)
+    np.testing.assert_allclose(smooth_hunt_crossley_expr(x, x_dot, 0.02, 1e6, 2.5, 50.0, 1e-8),
+                               smooth_hunt_crossley_batch(x, x_dot, 0.02, 1e6, 2.5), rtol=1e-10, atol=1e-9)
+
+    sphere_com: ndarray = rng.normal(0, 0.2, (200, 3))
+    cylinder_bottom: ndarray = rng.normal(0, 0.01, (200, 3))
+    cylinder_top: ndarray = cylinder_bottom + [0.0, 1.0, 0.0]
+    cylinder_vel: ndarray = rng.normal(0, 1, (200, 3))
+
+    d, cylinder_edge, sphere_edge, n = penetration_expr(sphere_com.T, cylinder_bottom.T, cylinder_top.T,
+                                                        cylinder_vel.T, 0.025, 0.17)
+    expected = compute_penetrations(sphere_com, cylinder_bottom, cylinder_top, cylinder_vel, 0.025, 0.17)
+
+    np.testing.assert_allclose(d, expected[0], rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(np.stack(n, axis=-1), expected[3], rtol=1e-12, atol=1e-15)
+
+
+def test_casadi_functions_match_numpy():
+    errors = check_against_numpy(500)
+    assert max(errors.values()) < 1e-8, errors
+
+
+def test_force_jacobian_matches_finite_differences():
+    J = force_jacobian_function()
+    p: ndarray = np.array([0.0218, 2300832.0, 2.5, 50.0, 1e-8])
+    x, x_dot, h = 0.004, 0.3, 1e-7
+
+    f, df_dx, df_dx_dot, _ = (np.asarray(out).ravel() for out in J(x, x_dot, p))
+    f_x = smooth_hunt_crossley_batch(np.array([x - h, x + h]), x_dot, *p)
+    f_v = smooth_hunt_crossley_batch(x, np.array([x_dot - h, x_dot + h]), *p)
+
+    np.testing.assert_allclose(df_dx, (f_x[1] - f_x[0]) / (2 * h), rtol=1e-5)
+    np.testing.assert_allclose(df_dx_dot, (f_v[1] - f_v[0]) / (2 * h), rtol=1e-5)
+
+
+def test_geometry_jacobian_matches_finite_differences():
+    J = geometry_jacobian_function()
+    sphere_com: ndarray = np.array([0.15, 0.6, 0.05])
+    bottom: ndarray = np.zeros(3)
+    top: ndarray = np.array([0.0, 1.0, 0.0])
+    vel: ndarray = np.array([-1.0, 0.0, 0.0])
+    radii: ndarray = np.array([0.025, 0.17])
+
+    _, dd_dsphere, _, _ = (np.asarray(out) for out in J(sphere_com, bottom, top, vel, radii))
+
+    h: float = 1e-7
+    for i in range(3):
+        e: ndarray = np.zeros(3)
+        e[i] = h
+        d = [compute_penetrations((sphere_com + s * e)[None], bottom[None], top[None], vel[None], *radii)[0][0]
+             for s in (-1, 1)]
+        np.testing.assert_allclose(dd_dsphere.ravel()[i], (d[1] - d[0]) / (2 * h), atol=1e-6)
@@ -110,6 +110,88 @@ def get_distance_between_edges(Q: ndarray, sphere_com: ndarray, radius_sphere: f
     return d_projected, cylinder_edge, sphere_edge, sphere_direction
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# Batched versions of the 2 functions above. They take (N, 3) stacks (one row per frame/pair) and return one result per
+# row, with exactly the same maths as the per-frame functions.
+# ----------------------------------------------------------------------------------------------------------------------
+def find_point_projections_along_lines(P0: ndarray, P1: ndarray, P2: ndarray) -> ndarray:
+    """
+        Batched version of find_point_projection_along_a_line.
+
+        Args:
+            P0: (N, 3) points that we want to project on the lines.
+            P1: (N, 3) points that represent the bottom endpoints of the lines.
+            P2: (N, 3) points that represent the top endpoints of the lines.
+
+        Returns the (N, 3) projections, relative to P1 as in the per-frame function.
+        """
+
+    r: ndarray = find_vector_between_two_points(P1, P2)
+    r_hat: ndarray = unit_vectors(r)
+    q: ndarray = find_vector_between_two_points(P1, P0)
+
+    t: ndarray = dot_products(q, r)
+    cos_theta: ndarray = t / (norms(q) * norms(r))
+
+    Q: ndarray = q * cos_theta[..., None] * r_hat
+    return Q
+
+
+def get_distances_between_edges(Q: ndarray, sphere_com: ndarray, radius_sphere: ndarray, radius_cylinder: ndarray,
+                                motion_direction: ndarray) -> Tuple[ndarray, ...]:
+    """
+    Batched version of get_distance_between_edges. The 4 motion-direction cases are resolved with a mask rather than
+    with if branches: they only differ by the sign of the directional vector that points from Q at sphere_com.
+
+    :param Q: (N, 3) points along the cylinder longitudinal axis that resulted to be the closest to the spheres.
+    :param sphere_com: (N, 3) sphere centres of mass.
+    :param radius_sphere: sphere radius. Scalar or (N, ).
+    :param radius_cylinder: cylinder radius. Scalar or (N, ).
+    :param motion_direction: (N, 3) direction of motion of the cylinder. Only the sign of its 1st component is used, so
+                             it doesn't need to be normalised.
+    :return: (N, ) penetrations, (N, 3) cylinder edges, (N, 3) sphere edges, (N, 3) normal unit vectors.
+    """
+
+    r: ndarray = sphere_com - Q
+    r_hat: ndarray = unit_vectors(r)
+
+    # sign = +1 where the per-frame function goes to the edge along r_hat, -1 where it goes along -r_hat
+    moving_forward: ndarray = motion_direction[..., 0] > 0
+    same_direction: ndarray = (motion_direction[..., 0] * r_hat[..., 0]) > 0
+    sign: ndarray = np.where(same_direction != moving_forward, 1.0, -1.0)
+
+    sphere_direction: ndarray = r_hat * sign[..., None]
+    cylinder_edge: ndarray = Q + np.asarray(radius_cylinder)[..., None] * sphere_direction
+    sphere_edge: ndarray = sphere_com - np.asarray(radius_sphere)[..., None] * sphere_direction
+
+    d: ndarray = cylinder_edge - sphere_edge
+    d_projected: ndarray = dot_products(d, sphere_direction)
+
+    return d_projected, cylinder_edge, sphere_edge, sphere_direction
+
+
+def compute_penetrations(sphere_com: ndarray, cylinder_bottom: ndarray, cylinder_top: ndarray,
+                         cylinder_vel: ndarray, radius_sphere: ndarray,
+                         radius_cylinder: ndarray) -> Tuple[ndarray, ...]:
+    """
+    Sphere-to-cylinder penetration for N frames at once. This chains the same steps as
+    contact_model.sphere_to_cylinder.compute_x_and_x_dot, given the geometry already expressed in ground.
+
+    :param sphere_com: (N, 3) sphere centres in ground.
+    :param cylinder_bottom: (N, 3) centres of the bottom surface of the cylinder in ground.
+    :param cylinder_top: (N, 3) centres of the top surface of the cylinder in ground.
+    :param cylinder_vel: (N, 3) cylinder velocities in ground.
+    :param radius_sphere: sphere radius. Scalar or (N, ).
+    :param radius_cylinder: cylinder radius. Scalar or (N, ).
+    :return: (N, ) penetrations, (N, 3) cylinder edges, (N, 3) sphere edges, (N, 3) normal unit vectors.
+    """
+
+    Q_relative: ndarray = find_point_projections_along_lines(sphere_com, cylinder_bottom, cylinder_top)
+    Q_global: ndarray = Q_relative + cylinder_bottom
+
+    return get_distances_between_edges(Q_global, sphere_com, radius_sphere, radius_cylinder, cylinder_vel)
+
+
 def compute_effective_radius(r1: float, r2: float) -> float:
     R: float = (r1 * r2) / (r1 + r2)
     return R
\ No newline at end of file
@@ -0,0 +1,109 @@
+import base64
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+from numpy import ndarray, float64, int64
+from typing import List, Tuple
+
+# Triangle meshes from the geometry files referenced by the .osim (.obj, .stl, .vtp), as (V, 3) vertices and (F, 3)
+# vertex indices. Polygons are triangulated as fans.
+
+
+def _fan(polygons: List[List[int]]) -> ndarray:
+    triangles: List[Tuple[int, int, int]] = []
+    for polygon in polygons:
+        for i in range(1, len(polygon) - 1):
+            triangles.append((polygon[0], polygon[i], polygon[i + 1]))
+
+    return np.array(triangles, dtype=int64).reshape(-1, 3)
+
+
+def _weld(corners: ndarray) -> Tuple[ndarray, ndarray]:
+    # (F, 3, 3) triangle corners -> shared vertices and faces
+    vertices, inverse = np.unique(corners.reshape(-1, 3), axis=0, return_inverse=True)
+    return vertices, inverse.reshape(-1, 3).astype(int64)
+
+
+def load_obj(file_path: str) -> Tuple[ndarray, ndarray]:
+    vertices: List[List[float]] = []
+    polygons: List[List[int]] = []
+
+    with open(file_path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == "v":
+                vertices.append([float(v) for v in parts[1:4]])
+            elif parts[0] == "f":
+                # "f 1 2 3", "f 1/1/1 2/2/2 3/3/3", negative indices are relative to the current end
+                indices = [int(p.split("/")[0]) for p in parts[1:]]
+                polygons.append([i - 1 if i > 0 else len(vertices) + i for i in indices])
+
+    return np.array(vertices, dtype=float64).reshape(-1, 3), _fan(polygons)
+
+
+def load_stl(file_path: str) -> Tuple[ndarray, ndarray]:
+    with open(file_path, "rb") as f:
+        data: bytes = f.read()
+
+    # binary files: 80 bytes header, uint32 triangle count, 50 bytes per triangle
+    if len(data) >= 84:
+        n: int = int(np.frombuffer(data, dtype="<u4", count=1, offset=80)[0])
+        if len(data) == 84 + 50 * n:
+            record = np.dtype([("normal", "<f4", 3), ("corners", "<f4", (3, 3)), ("attribute", "<u2")])
+            triangles = np.frombuffer(data, dtype=record, count=n, offset=84)
+            return _weld(triangles["corners"].astype(float64))
+
+    corners: List[List[float]] = [[float(v) for v in line.split()[1:4]]
+                                  for line in data.decode("ascii", errors="replace").splitlines()
+                                  if line.strip().startswith("vertex")]
+
+    return _weld(np.array(corners, dtype=float64).reshape(-1, 3, 3))
+
+
+def _vtk_array(data_array: ET.Element, header_type: str) -> ndarray:
+    dtypes = {"Float32": "<f4", "Float64": "<f8", "Int32": "<i4", "Int64": "<i8", "UInt32": "<u4", "UInt64": "<u8",
+              "Int8": "<i1", "UInt8": "<u1", "Int16": "<i2", "UInt16": "<u2"}
+    dtype: str = dtypes[data_array.get("type")]
+    fmt: str = data_array.get("format", "ascii")
+
+    if fmt == "ascii":
+        return np.array(data_array.text.split(), dtype=dtype)
+    if fmt == "binary":
+        # base64 of a byte count header followed by the raw data
+        raw: bytes = base64.b64decode(data_array.text.strip())
+        offset: int = np.dtype(dtypes[header_type]).itemsize
+        return np.frombuffer(raw, dtype=dtype, offset=offset)
+
+    raise ValueError(f"vtp DataArray format {fmt} is not supported")
+
+
+def load_vtp(file_path: str) -> Tuple[ndarray, ndarray]:
+    root = ET.parse(file_path).getroot()
+    if root.get("compressor"):
+        raise ValueError(f"{file_path}: compressed vtp files are not supported")
+
+    header_type: str = root.get("header_type", "UInt32")
+    piece = root.find("PolyData/Piece")
+
+    vertices: ndarray = _vtk_array(piece.find("Points/DataArray"), header_type).astype(float64).reshape(-1, 3)
+
+    arrays = {a.get("Name"): _vtk_array(a, header_type).astype(int64) for a in piece.findall("Polys/DataArray")}
+    connectivity, offsets = arrays["connectivity"], arrays["offsets"]
+    starts: ndarray = np.concatenate([[0], offsets[:-1]])
+
+    return vertices, _fan([connectivity[s:e].tolist() for s, e in zip(starts, offsets)])
+
+
+def load_mesh(file_path: str) -> Tuple[ndarray, ndarray]:
+    """
+    :return: (V, 3) vertices and (F, 3) triangles (vertex indices).
+    """
+
+    extension: str = os.path.splitext(file_path)[1].lower()
+    loaders = {".obj": load_obj, ".stl": load_stl, ".vtp": load_vtp}
+    if extension not in loaders:
+        raise ValueError(f"mesh format {extension} is not supported. Supported formats: {', '.join(loaders)}")
+
+    return loaders[extension](file_path)
@@ -0,0 +1,243 @@
+import posixpath
+import xml.etree.ElementTree as ET
+import numpy as np
+from numpy import ndarray, array, float64
+from typing import Dict, Iterator, NamedTuple, Tuple
+
+# Static model data read straight from the .osim XML, without OpenSim.
+
+
+class BodyInfo(NamedTuple):
+    mass: float
+    mass_center: ndarray    # in the body frame
+
+
+class MarkerInfo(NamedTuple):
+    body: str
+    location: ndarray       # in the body frame (offset frames between the marker and its body are composed)
+
+
+class CoordinateInfo(NamedTuple):
+    joint: str
+    default_value: float
+    range: ndarray          # [min, max]
+    rotational: bool
+
+
+class MuscleInfo(NamedTuple):
+    type: str
+    max_isometric_force: float
+    optimal_fiber_length: float
+    tendon_slack_length: float
+    pennation_angle_at_optimal: float
+    max_contraction_velocity: float     # in optimal fiber lengths per second
+
+
+class MeshInfo(NamedTuple):
+    body: str
+    mesh_file: str
+    scale_factors: ndarray
+
+
+def _vec3(text: str) -> ndarray:
+    return array([float(v) for v in text.split()], dtype=float64)
+
+
+def _rotation_xyz(angles: ndarray) -> ndarray:
+    # body-fixed X-Y-Z Euler angles (radians), as in PhysicalOffsetFrame orientation
+    ca, sa = np.cos(angles[0]), np.sin(angles[0])
+    cb, sb = np.cos(angles[1]), np.sin(angles[1])
+    cc, sc = np.cos(angles[2]), np.sin(angles[2])
+
+    rx: ndarray = array([[1., 0., 0.], [0., ca, -sa], [0., sa, ca]])
+    ry: ndarray = array([[cb, 0., sb], [0., 1., 0.], [-sb, 0., cb]])
+    rz: ndarray = array([[cc, -sc, 0.], [sc, cc, 0.], [0., 0., 1.]])
+    return rx @ ry @ rz
+
+
+def _named_components(element: ET.Element, path: str = "") -> Iterator[Tuple[str, ET.Element]]:
+    # (absolute path, element) of every named element below element. The Model itself and unnamed list properties
+    # (objects, components, frames) are not part of the path: /bodyset/<body>, /jointset/<joint>/<frame>, /ground...
+    for child in element:
+        name = child.get("name")
+        child_path: str = path if name is None or child.tag == "Model" else f"{path}/{name}"
+        if name is not None and child.tag != "Model":
+            yield child_path, child
+        yield from _named_components(child, child_path)
+
+
+def _frame_to_body(socket: str, owner: str, frames: Dict[str, ET.Element],
+                   depth: int = 0) -> Tuple[str, ndarray, ndarray]:
+    """
+    Body that a frame is fixed to, and the rotation and translation from the frame to the body frame.
+
+    :param socket: connectee path: "/bodyset/punching_bag" (4.x), "punching_bag" (3.x), a path relative to owner, or
+                   the path of a PhysicalOffsetFrame (whose parent is resolved in turn).
+    :param owner: absolute path of the component that has the socket.
+    :param frames: PhysicalOffsetFrames by absolute path.
+    """
+
+    socket = socket.strip()
+    path: str = socket if socket.startswith("/") else posixpath.normpath(f"{owner}/{socket}")
+
+    if path in frames:
+        if depth > len(frames):
+            raise ValueError(f"offset frame {path} is its own parent")
+
+        frame: ET.Element = frames[path]
+        parent = frame.find("socket_parent")
+        body, R, p = _frame_to_body(parent.text, path, frames, depth + 1)
+        translation = frame.find("translation")
+        orientation = frame.find("orientation")
+        offset_p: ndarray = _vec3(translation.text) if translation is not None else np.zeros(3)
+        offset_R: ndarray = _rotation_xyz(_vec3(orientation.text)) if orientation is not None else np.eye(3)
+        return body, R @ offset_R, R @ offset_p + p
+
+    parts = [p for p in path.split("/") if p]
+    if "/" not in socket or (len(parts) == 2 and parts[0] == "bodyset") or parts == ["ground"]:
+        return parts[-1], np.eye(3), np.zeros(3)
+
+    raise ValueError(f"frame {socket} is neither a body, the ground nor a PhysicalOffsetFrame")
+
+
+def read_bodies(model_file: str) -> Dict[str, BodyInfo]:
+    return bodies_from_root(ET.parse(model_file).getroot())
+
+
+def bodies_from_root(root: ET.Element) -> Dict[str, BodyInfo]:
+    bodies: Dict[str, BodyInfo] = {}
+
+    for body in root.iter("Body"):
+        mass = body.find("mass")
+        mass_center = body.find("mass_center")
+        bodies[body.get("name")] = BodyInfo(float(mass.text) if mass is not None else 0.0,
+                                            _vec3(mass_center.text) if mass_center is not None else array([0., 0., 0.]))
+
+    return bodies
+
+
+def read_markers(model_file: str) -> Dict[str, MarkerInfo]:
+    return markers_from_root(ET.parse(model_file).getroot())
+
+
+def markers_from_root(root: ET.Element) -> Dict[str, MarkerInfo]:
+    """
+    Markers by name. Markers on PhysicalOffsetFrames are given on the body the frame is (eventually) fixed to.
+    """
+
+    markers: Dict[str, MarkerInfo] = {}
+    frames: Dict[str, ET.Element] = {}
+    marker_paths: Dict[str, str] = {}
+    for path, element in _named_components(root):
+        if element.tag == "PhysicalOffsetFrame":
+            frames[path] = element
+        elif element.tag == "Marker":
+            marker_paths[element.get("name")] = path
+
+    for marker in root.iter("Marker"):
+        parent = marker.find("socket_parent_frame")
+        if parent is None:
+            parent = marker.find("body")   # 3.x models
+
+        name: str = marker.get("name")
+        body, R, p = _frame_to_body(parent.text, marker_paths.get(name, f"/{name}"), frames)
+        markers[name] = MarkerInfo(body, R @ _vec3(marker.find("location").text) + p)
+
+    return markers
+
+
+def read_meshes(model_file: str) -> Dict[str, MeshInfo]:
+    return meshes_from_root(ET.parse(model_file).getroot())
+
+
+def meshes_from_root(root: ET.Element) -> Dict[str, MeshInfo]:
+    """
+    Mesh geometries attached directly to bodies (socket_frame ".."), by geometry name.
+    """
+
+    meshes: Dict[str, MeshInfo] = {}
+
+    for body in root.iter("Body"):
+        for mesh in body.findall("attached_geometry/Mesh"):
+            frame = mesh.find("socket_frame")
+            if frame is not None and frame.text.strip() != "..":
+                continue
+
+            scale = mesh.find("scale_factors")
+            meshes[mesh.get("name")] = MeshInfo(body.get("name"), mesh.find("mesh_file").text.strip(),
+                                                _vec3(scale.text) if scale is not None else array([1., 1., 1.]))
+
+    return meshes
+
+
+def _float(element: ET.Element, tag: str, default: float) -> float:
+    child = element.find(tag)
+    return float(child.text) if child is not None and child.text else default
+
+
+def _is_rotational(joint: ET.Element, coordinate: str, index: int) -> bool:
+    # CustomJoints say it in the SpatialTransform; the other joints by their type and coordinate order
+    if joint.tag == "CustomJoint":
+        for axis in joint.iter("TransformAxis"):
+            names = axis.find("coordinates")
+            if names is not None and names.text and coordinate in names.text.split():
+                return axis.get("name", "").startswith("rotation")
+        return True
+
+    if joint.tag == "SliderJoint":
+        return False
+    if joint.tag == "FreeJoint":
+        return index < 3
+    if joint.tag == "PlanarJoint":
+        return index == 0
+
+    return True
+
+
+def read_coordinates(model_file: str) -> Dict[str, CoordinateInfo]:
+    return coordinates_from_root(ET.parse(model_file).getroot())
+
+
+def coordinates_from_root(root: ET.Element) -> Dict[str, CoordinateInfo]:
+    """
+    Coordinates in JointSet order, which is the order of the model CoordinateSet.
+    """
+
+    coordinates: Dict[str, CoordinateInfo] = {}
+
+    joint_set = root.find("Model/JointSet/objects")
+    for joint in (joint_set if joint_set is not None else []):
+        for i, coordinate in enumerate(joint.findall("coordinates/Coordinate")):
+            name: str = coordinate.get("name")
+            limits = coordinate.find("range")
+            coordinates[name] = CoordinateInfo(joint.get("name"), _float(coordinate, "default_value", 0.0),
+                                               _vec3(limits.text) if limits is not None else array([-np.inf, np.inf]),
+                                               _is_rotational(joint, name, i))
+
+    return coordinates
+
+
+def read_muscles(model_file: str) -> Dict[str, MuscleInfo]:
+    return muscles_from_root(ET.parse(model_file).getroot())
+
+
+def muscles_from_root(root: ET.Element) -> Dict[str, MuscleInfo]:
+    """
+    Muscles of the ForceSet (every element whose type ends with "Muscle"), in ForceSet order. Missing properties take
+    the OpenSim defaults.
+    """
+
+    muscles: Dict[str, MuscleInfo] = {}
+
+    force_set = root.find("Model/ForceSet/objects")
+    for force in (force_set if force_set is not None else []):
+        if not force.tag.endswith("Muscle"):
+            continue
+
+        muscles[force.get("name")] = MuscleInfo(force.tag, _float(force, "max_isometric_force", 1000.0),
+                                                _float(force, "optimal_fiber_length", 0.1),
+                                                _float(force, "tendon_slack_length", 0.2),
+                                                _float(force, "pennation_angle_at_optimal", 0.0),
+                                                _float(force, "max_contraction_velocity", 10.0))
+
+    return muscles
@@ -0,0 +1,301 @@
+from numpy import (
+    arange, array, asarray, concatenate, empty, eye, float64, int64, ones, sqrt, zeros, where, newaxis, inf, abs
+)
+from numpy.typing import NDArray
+from numpy.linalg import qr, solve, pinv, LinAlgError
+from itertools import combinations_with_replacement
+from typing import Optional, Tuple
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Design matrices
+# ----------------------------------------------------------------------------------------------------------------------
+def monomial_exponents(n_vars: int, degree: int) -> NDArray[int64]:
+    """
+    Exponents of all the monomials in n_vars variables with total degree <= degree, ordered by degree (constant term
+    first). Shape (P, n_vars).
+    """
+
+    rows = [zeros(n_vars, dtype=int64)]
+    for d in range(1, degree + 1):
+        for combination in combinations_with_replacement(range(n_vars), d):
+            exponent = zeros(n_vars, dtype=int64)
+            for v in combination:
+                exponent[v] += 1
+            rows.append(exponent)
+
+    return array(rows, dtype=int64)
+
+
+def vandermonde(x: NDArray[float64], degree: int) -> NDArray[float64]:
+    """
+    Univariate Vandermonde matrix with columns x^degree, ..., x, 1: the same ordering as fit_quadratic/fit_cubic.
+    Shape (S, degree + 1).
+    """
+
+    x = asarray(x, dtype=float64)
+    x_mat: NDArray[float64] = empty((len(x), degree + 1), dtype=float64)
+    x_mat[:, degree] = 1.0
+    for p in range(degree - 1, -1, -1):
+        x_mat[:, p] = x_mat[:, p + 1] * x
+
+    return x_mat
+
+
+def _power_table(x: NDArray[float64], max_power: int) -> NDArray[float64]:
+    # (max_power + 1, S, n_vars) table of x ** k, built by repeated multiplication instead of pow
+    table: NDArray[float64] = empty((max_power + 1,) + x.shape, dtype=float64)
+    table[0] = 1.0
+    for k in range(1, max_power + 1):
+        table[k] = table[k - 1] * x
+
+    return table
+
+
+def design_matrix(x: NDArray[float64], exponents: NDArray[int64]) -> NDArray[float64]:
+    """
+    Multivariate design matrix: column p is prod_v x[:, v] ** exponents[p, v].
+
+    :param x: (S, n_vars) samples.
+    :param exponents: (P, n_vars) monomial exponents, e.g. from monomial_exponents.
+    :return: (S, P) matrix.
+    """
+
+    x = asarray(x, dtype=float64).reshape(len(x), -1)
+    table: NDArray[float64] = _power_table(x, int(exponents.max(initial=0)))
+
+    x_mat: NDArray[float64] = ones((x.shape[0], len(exponents)), dtype=float64)
+    for v in range(x.shape[1]):
+        x_mat *= table[exponents[:, v], :, v].T
+
+    return x_mat
+
+
+def mask_for_dofs(exponents: NDArray[int64], spanned: NDArray) -> NDArray:
+    """
+    (M, P) mask of the terms each output is allowed to use: only the monomials of the variables it spans (e.g. the
+    coordinates a muscle crosses).
+
+    :param exponents: (P, n_vars) monomial exponents.
+    :param spanned: (M, n_vars) boolean, True where output m depends on variable v.
+    """
+
+    uses: NDArray = exponents > 0
+    return ~(uses[newaxis] & ~asarray(spanned, dtype=bool)[:, newaxis]).any(axis=-1)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Batched least squares
+# ----------------------------------------------------------------------------------------------------------------------
+def fit_least_squares(x_mat: NDArray[float64], y: NDArray[float64],
+                      mask: Optional[NDArray] = None) -> NDArray[float64]:
+    """
+    Solve M least-squares fits y[:, m] ~ x_mat @ coefficients[m] in one call. All the fits share the same samples;
+    mask selects which columns each fit can use.
+
+    The column-scaled design matrix is QR-factorised once (x = Q R), which reduces every fit to a (P, P) problem on R
+    and Q^T y: the cost of the M solves doesn't depend on the number of samples, and unlike the normal equations the
+    condition number is not squared.
+
+    :param x_mat: (S, P) design matrix.
+    :param y: (S, ) or (S, M) targets.
+    :param mask: (M, P) boolean, True where the term is used. None uses every term for every fit.
+    :return: (M, P) coefficients, 0 where masked out.
+    """
+
+    y = asarray(y, dtype=float64)
+    if y.ndim == 1:
+        y = y[:, newaxis]
+
+    M: int = y.shape[1]
+    S, P = x_mat.shape
+    mask = ones((M, P), dtype=bool) if mask is None else asarray(mask, dtype=bool)
+    m: NDArray[float64] = mask.astype(float64)
+
+    scale: NDArray[float64] = sqrt((x_mat * x_mat).sum(axis=0))
+    scale = where(scale > 0, scale, 1.0)
+    x_scaled: NDArray[float64] = x_mat / scale
+
+    if S < P:
+        # under-determined: minimum norm solutions
+        coefficients: NDArray[float64] = (pinv(x_scaled[newaxis] * m[:, newaxis, :]) @ y.T[..., newaxis])[..., 0]
+        return coefficients * m / scale
+
+    q, r = qr(x_scaled)                             # (S, P), (P, P)
+    qty: NDArray[float64] = (q.T @ y).T             # (M, P)
+
+    try:
+        if mask.all():
+            coefficients = solve(r, qty.T).T
+        else:
+            # masked fits: min |Q^T y - R[:, used] b|, with an identity row per masked term so that its coefficient is
+            # exactly 0. One batched QR of the (M, 2P, P) stack.
+            a: NDArray[float64] = concatenate([r[newaxis] * m[:, newaxis, :],
+                                               eye(P)[newaxis] * (1.0 - m)[:, newaxis, :]], axis=1)
+            b: NDArray[float64] = concatenate([qty, zeros((M, P), dtype=float64)], axis=1)
+            q_m, r_m = qr(a)
+            coefficients = solve(r_m, q_m.transpose(0, 2, 1) @ b[..., newaxis])[..., 0]
+
+    except LinAlgError:
+        a = concatenate([r[newaxis] * m[:, newaxis, :], eye(P)[newaxis] * (1.0 - m)[:, newaxis, :]], axis=1)
+        b = concatenate([qty, zeros((M, P), dtype=float64)], axis=1)
+        coefficients = (pinv(a) @ b[..., newaxis])[..., 0]
+
+    return coefficients * m / scale
+
+
+def rmse(x_mat: NDArray[float64], y: NDArray[float64], coefficients: NDArray[float64]) -> NDArray[float64]:
+    """
+    Root mean square error of every fit. (M, ).
+    """
+
+    y = asarray(y, dtype=float64).reshape(len(x_mat), -1)
+    res: NDArray[float64] = x_mat @ coefficients.T - y
+    return sqrt((res * res).mean(axis=0))
+
+
+def prune_terms(x_mat: NDArray[float64], y: NDArray[float64], target_error: float, mask: Optional[NDArray] = None,
+                min_terms: int = 1) -> Tuple[NDArray[float64], NDArray, NDArray[float64]]:
+    """
+    Backward elimination, batched over fits: at every iteration each fit tries to drop its least important term (the
+    smallest |coefficient| * column norm), all the candidate fits are solved at once, and a fit keeps the reduced set of
+    terms only if its RMSE stays below target_error. A fit stops pruning the first time a removal is rejected.
+
+    :param x_mat: (S, P) design matrix.
+    :param y: (S, M) targets.
+    :param target_error: maximum RMSE allowed.
+    :param mask: (M, P) initial terms. None starts from all the terms.
+    :param min_terms: never go below this number of terms.
+    :return: coefficients (M, P), mask (M, P), rmse (M, ).
+    """
+
+    y = asarray(y, dtype=float64).reshape(len(x_mat), -1)
+    M: int = y.shape[1]
+    mask = ones((M, x_mat.shape[1]), dtype=bool) if mask is None else asarray(mask, dtype=bool).copy()
+
+    coefficients: NDArray[float64] = fit_least_squares(x_mat, y, mask)
+    error: NDArray[float64] = rmse(x_mat, y, coefficients)
+
+    col_norm: NDArray[float64] = sqrt((x_mat * x_mat).sum(axis=0))
+    active: NDArray = (error <= target_error) & (mask.sum(axis=1) > min_terms)
+
+    while active.any():
+        importance: NDArray[float64] = where(mask, abs(coefficients) * col_norm, inf)
+        weakest = importance.argmin(axis=1)
+
+        trial_mask: NDArray = mask.copy()
+        rows = arange(M)[active]
+        trial_mask[rows, weakest[active]] = False
+
+        trial_coefficients: NDArray[float64] = fit_least_squares(x_mat, y[:, active], trial_mask[active])
+        trial_error: NDArray[float64] = rmse(x_mat, y[:, active], trial_coefficients)
+
+        accept: NDArray = trial_error <= target_error
+        accepted_rows = rows[accept]
+        mask[accepted_rows] = trial_mask[accepted_rows]
+        coefficients[accepted_rows] = trial_coefficients[accept]
+        error[accepted_rows] = trial_error[accept]
+
+        active[rows[~accept]] = False
+        active &= mask.sum(axis=1) > min_terms
+
+    return coefficients, mask, error
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Evaluation
+# ----------------------------------------------------------------------------------------------------------------------
+def horner(x: NDArray[float64], coefficients: NDArray[float64]) -> NDArray[float64]:
+    """
+    Univariate polynomials (highest power first, as fit_cubic) evaluated with Horner's scheme.
+
+    :param x: (S, ) samples.
+    :param coefficients: (D + 1, ) or (M, D + 1) coefficients.
+    :return: (S, ) or (S, M) values.
+    """
+
+    x = asarray(x, dtype=float64)
+    coefficients = asarray(coefficients, dtype=float64)
+    if coefficients.ndim == 1:
+        y: NDArray[float64] = zeros(x.shape, dtype=float64)
+        for a in coefficients:
+            y = y * x + a
+        return y
+
+    y = zeros((len(x), len(coefficients)), dtype=float64)
+    for p in range(coefficients.shape[1]):
+        y *= x[:, newaxis]
+        y += coefficients[:, p]
+
+    return y
+
+
+class PolynomialApproximation:
+    """
+    M multivariate polynomials in n_vars variables (e.g. muscle-tendon lengths of M muscles as a function of the
+    coordinates), sharing one set of candidate monomials.
+    """
+
+    def __init__(self, exponents: NDArray[int64], coefficients: NDArray[float64], mask: NDArray,
+                 error: NDArray[float64]):
+        self.exponents: NDArray[int64] = exponents
+        self.coefficients: NDArray[float64] = coefficients
+        self.mask: NDArray = mask
+        self.error: NDArray[float64] = error
+
+    @classmethod
+    def fit(cls, x: NDArray[float64], y: NDArray[float64], degree: int, spanned: Optional[NDArray] = None,
+            target_error: Optional[float] = None, min_terms: int = 1) -> "PolynomialApproximation":
+        """
+        :param x: (S, n_vars) samples.
+        :param y: (S, M) targets.
+        :param degree: maximum total degree.
+        :param spanned: (M, n_vars) variables each output depends on (see mask_for_dofs). None: all of them.
+        :param target_error: if given, prune terms while the RMSE stays below it.
+        :param min_terms: minimum number of terms kept by the pruning.
+        """
+
+        x = asarray(x, dtype=float64).reshape(len(x), -1)
+        y = asarray(y, dtype=float64).reshape(len(x), -1)
+
+        exponents: NDArray[int64] = monomial_exponents(x.shape[1], degree)
+        x_mat: NDArray[float64] = design_matrix(x, exponents)
+        mask: Optional[NDArray] = None if spanned is None else mask_for_dofs(exponents, spanned)
+
+        if target_error is None:
+            mask = ones((y.shape[1], len(exponents)), dtype=bool) if mask is None else mask
+            coefficients: NDArray[float64] = fit_least_squares(x_mat, y, mask)
+            error: NDArray[float64] = rmse(x_mat, y, coefficients)
+        else:
+            coefficients, mask, error = prune_terms(x_mat, y, target_error, mask, min_terms)
+
+        return cls(exponents, coefficients, mask, error)
+
+    @property
+    def n_terms(self) -> NDArray[int64]:
+        return self.mask.sum(axis=1)
+
+    def evaluate(self, x: NDArray[float64]) -> NDArray[float64]:
+        """
+        (S, M) values of all the polynomials at all the samples.
+        """
+
+        x = asarray(x, dtype=float64).reshape(len(x), -1)
+        return design_matrix(x, self.exponents) @ self.coefficients.T
+
+    def gradient(self, x: NDArray[float64]) -> NDArray[float64]:
+        """
+        (S, M, n_vars) partial derivatives of all the polynomials (e.g. moment arms are -dL/dq).
+        """
+
+        x = asarray(x, dtype=float64).reshape(len(x), -1)
+        n_vars: int = x.shape[1]
+        grad: NDArray[float64] = empty((len(x), len(self.coefficients), n_vars), dtype=float64)
+
+        for v in range(n_vars):
+            exponents: NDArray[int64] = self.exponents.copy()
+            factor: NDArray[float64] = exponents[:, v].astype(float64)
+            exponents[:, v] = where(exponents[:, v] > 0, exponents[:, v] - 1, 0)
+            grad[:, :, v] = design_matrix(x, exponents) @ (self.coefficients * factor).T
+
+        return grad
@@ -1,5 +1,5 @@
 from numpy import (
-    array, float64, abs, eye, all
+    array, float64, abs, eye, any
 )
 from numpy.typing import NDArray
 from numpy.linalg import inv
@@ -18,7 +18,7 @@ def compute_coefficients(x_mat: NDArray[float64], y: NDArray[float64]) -> NDArra
     identity: NDArray[float64] = eye(shape)
     diff = abs(x_inv @ x_mat - identity)
 
-    if all(diff > tol):
+    if any(diff > tol):
         raise ValueError("x_inv and x_mat product is not close enough to identity matrix.")
 
     coefficients: NDArray[float64] = x_inv @ y
@@ -0,0 +1,222 @@
+import os
+import re
+import numpy as np
+from numpy import ndarray, float64
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+# translational coordinates are never converted from degrees to radians
+t_flags: Tuple[str, ...] = ("tx", "ty", "tz", "t1", "t2", "t3")
+
+SIDECAR_SUFFIX: str = ".npy"
+
+
+class StoHeader(NamedTuple):
+    name: str
+    n_rows: int
+    n_columns: int
+    in_degrees: bool
+    header_lines: int   # number of lines up to and including "endheader"
+    columns: List[str]
+
+
+def read_sto_header(file_path: str) -> StoHeader:
+    """
+    Parse the header of an OpenSim .sto/.mot file: nRows, nColumns, inDegrees and the column labels that follow
+    "endheader".
+
+    :param file_path: path to the .sto/.mot file.
+    :return: StoHeader
+    """
+
+    name: str = ""
+    n_rows: int = -1
+    n_columns: int = -1
+    in_degrees: bool = False
+
+    with open(file_path, "r") as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+
+            if n == 0:
+                name = line
+
+            if line == "endheader":
+                columns: List[str] = f.readline().rstrip("\r\n").split("\t")
+                break
+
+            key, _, value = line.partition("=")
+            if key == "nRows":
+                n_rows = int(value)
+            elif key == "nColumns":
+                n_columns = int(value)
+            elif key == "inDegrees":
+                in_degrees = value.strip().lower() == "yes"
+
+        else:
+            raise ValueError(f"{file_path} has no 'endheader' line")
+
+    if n_columns < 0:
+        n_columns = len(columns)
+
+    elif len(columns) != n_columns:
+        raise ValueError(f"{file_path}: header says nColumns={n_columns} but {len(columns)} labels were found")
+
+    return StoHeader(name, n_rows, n_columns, in_degrees, n + 1, columns)
+
+
+def is_rotational(column: str) -> bool:
+    """
+    Whether a column holds an angle (or angular velocity). BodyKinematics files label orientations as <body>_Ox/Oy/Oz;
+    coordinate columns (plain names or state paths such as /jointset/<joint>/<coord>/value) are rotational unless the
+    coordinate name ends with one of the translational flags.
+    """
+
+    if column == "time":
+        return False
+
+    if column[-3:] in ("_Ox", "_Oy", "_Oz"):
+        return True
+
+    if column[-2:] in ("_X", "_Y", "_Z"):
+        return False
+
+    parts: List[str] = [p for p in column.split("/") if p]
+    coord_name: str = parts[-2] if len(parts) > 1 and parts[-1] in ("value", "speed") else parts[-1]
+
+    return not coord_name.endswith(t_flags)
+
+
+def sidecar_path(file_path: str) -> str:
+    """
+    Path of the .npy sidecar of a .sto/.mot file. The size and modification time of the file are part of the name, so
+    an edited file never matches an old sidecar.
+    """
+
+    stat: os.stat_result = os.stat(file_path)
+    return f"{file_path}.{stat.st_size}-{stat.st_mtime_ns}{SIDECAR_SUFFIX}"
+
+
+def _remove_stale_sidecars(file_path: str, keep: str):
+    directory, name = os.path.split(os.path.abspath(file_path))
+    pattern: re.Pattern = re.compile(rf"{re.escape(name)}\.\d+-\d+{re.escape(SIDECAR_SUFFIX)}")
+    for entry in os.listdir(directory):
+        if pattern.fullmatch(entry) and entry != os.path.basename(keep):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+
+def _parse_numeric_block(file_path: str, header: StoHeader, usecols: Optional[Sequence[int]] = None) -> ndarray:
+    """
+    (nRows, nColumns) numeric block, or only the usecols columns of it. np.loadtxt parses the text in C, one line at a
+    time, so only the output array is held in memory.
+    """
+
+    try:
+        data: ndarray = np.loadtxt(file_path, dtype=float64, skiprows=header.header_lines + 1, usecols=usecols,
+                                   ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"{file_path}: malformed numeric block ({e})") from e
+
+    n_columns: int = header.n_columns if usecols is None else len(usecols)
+    if data.size and data.shape[1] != n_columns:
+        raise ValueError(f"{file_path}: numeric block has {data.shape[1]} columns, expected {n_columns}")
+
+    return data.reshape(-1, n_columns)
+
+
+def load_numeric_block(file_path: str, header: Optional[StoHeader] = None, cache: bool = True) -> ndarray:
+    """
+    The whole (nRows, nColumns) numeric block of a .sto/.mot file. The first load parses the text and, if cache is
+    True, saves a .npy sidecar next to the file (see sidecar_path); the next loads memory-map the sidecar instead of
+    parsing the text. If the sidecar can't be written (e.g. read-only directory) the parsed block is returned as is.
+    """
+
+    if header is None:
+        header = read_sto_header(file_path)
+
+    if not cache:
+        return _parse_numeric_block(file_path, header)
+
+    path: str = sidecar_path(file_path)
+
+    if os.path.exists(path):
+        try:
+            data: ndarray = np.load(path, mmap_mode="r")
+            if data.ndim == 2 and data.shape[1] == header.n_columns:
+                return data
+        except (OSError, ValueError):
+            pass
+
+    data = _parse_numeric_block(file_path, header)
+
+    # write next to the target and rename, so that a concurrent reader never sees half a file
+    tmp_path: str = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return data
+
+    _remove_stale_sidecars(file_path, path)
+    return data
+
+
+def read_sto_columns(file_path: str, columns: Optional[Sequence[str]] = None, to_radians: bool = False,
+                     cache: bool = True) -> Tuple[ndarray, List[str]]:
+    """
+    Load only the requested columns of a .sto/.mot file into a contiguous float64 array.
+
+    :param file_path: path to the .sto/.mot file.
+    :param columns: column labels to load, in the order they should come out. None loads every column.
+    :param to_radians: if the file is inDegrees=yes, convert the rotational columns (see is_rotational) to radians.
+    :param cache: use/write the .npy sidecar (see load_numeric_block). Without it only the requested columns are
+                  parsed.
+    :return: (nRows, len(columns)) array and the list of column labels.
+    """
+
+    header: StoHeader = read_sto_header(file_path)
+
+    if columns is None:
+        columns = header.columns
+
+    lookup = {label: i for i, label in enumerate(header.columns)}
+    missing: List[str] = [label for label in columns if label not in lookup]
+    if missing:
+        raise KeyError(f"{file_path} has no columns {missing}")
+
+    idx: List[int] = [lookup[label] for label in columns]
+    if cache:
+        data: ndarray = np.ascontiguousarray(load_numeric_block(file_path, header)[:, idx], dtype=float64)
+    else:
+        # parse the needed columns only (once each, then reordered/duplicated)
+        unique: List[int] = sorted(set(idx))
+        block: ndarray = _parse_numeric_block(file_path, header, unique)
+        data = np.ascontiguousarray(block[:, [unique.index(i) for i in idx]], dtype=float64)
+
+    if to_radians and header.in_degrees:
+        rotational: ndarray = np.array([is_rotational(label) for label in columns], dtype=bool)
+        data[:, rotational] *= np.pi / 180
+
+    return data, list(columns)
+
+
+def write_sto(file_path: str, data: ndarray, columns: Sequence[str], name: str = "", in_degrees: bool = False):
+    """
+    Write a (nRows, nColumns) array as an OpenSim .sto/.mot file with the standard header.
+    """
+
+    data = np.asarray(data, dtype=float64)
+    if data.ndim != 2 or data.shape[1] != len(columns):
+        raise ValueError(f"data must have shape (nRows, {len(columns)}). Current array has: {data.shape}")
+
+    with open(file_path, "w") as f:
+        f.write(f"{name or os.path.basename(file_path)}\nversion=1\nnRows={data.shape[0]}\nnColumns={data.shape[1]}\n"
+                f"inDegrees={'yes' if in_degrees else 'no'}\nendheader\n")
+        f.write("\t".join(columns) + "\n")
+        np.savetxt(f, data, fmt="%.10g", delimiter="\t")
@@ -59,4 +59,36 @@ def dot_product(vec1: ndarray, vec2: ndarray) -> ndarray:
         vec2 = np.expand_dims(vec2, axis=-1)
 
     p = vec1.T @ vec2
-    return p
\ No newline at end of file
+    return p
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Batched versions: every function below works on stacks of 3D vectors with shape (N, 3) and never loops in Python
+# ----------------------------------------------------------------------------------------------------------------------
+def norms(vectors: ndarray) -> ndarray:
+    """
+    Row-wise euclidean norm of a (N, 3) stack of vectors. Returns a (N, ) array.
+    """
+    return np.sqrt(np.einsum("...i,...i->...", vectors, vectors))
+
+
+def unit_vectors(vectors: ndarray) -> ndarray:
+    """
+    Row-wise unit vectors of a (N, 3) stack of vectors.
+    """
+    return vectors / norms(vectors)[..., None]
+
+
+def dot_products(vec1: ndarray, vec2: ndarray) -> ndarray:
+    """
+
+    Args:
+        - vec1: (N, 3) stack of vectors that are going to be projected
+        - vec2: (N, 3) stack of vectors that are going to get projected on
+
+    Returns a (N, ) array with one scalar projection per row.
+    """
+
+    if vec1.shape[-1] != vec2.shape[-1]:
+        raise ValueError(f"Vectors of shape {vec1.shape} and {vec2.shape} do not have the same length")
+
+    return np.einsum("...i,...i->...", vec1, vec2)